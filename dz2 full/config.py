@@ -1,4 +1,10 @@
 PRIVATE_KEY = ''
 PROXY = None
 POLYGON_RPC = "https://polygon.drpc.org"
-SLIPPAGE = 0.5
\ No newline at end of file
+SLIPPAGE = 0.5
+
+# мультикошельковый режим (--keys)
+WALLET_CONCURRENCY = 8
+
+# eth_createAccessList: список прикладывается, только если он уменьшает газ
+USE_ACCESS_LIST = True
@@ -1,84 +1,190 @@
 import argparse
 import asyncio
+import json
+import sys
+import threading
+import time
+
 import config
 
 from src.client import AsyncEvmClient
-from src.l2pass import L2PassMinter
-from src.quickswap import QuickSwap
 
 
 def build_parser():
     p = argparse.ArgumentParser()
+    p.add_argument("--keys", type=str, default=None,
+                   help="file with one private key per line: run the command for every wallet")
+    p.add_argument("--concurrency", type=int, default=getattr(config, "WALLET_CONCURRENCY", 8),
+                   help="max wallets in flight with --keys")
     sub = p.add_subparsers(dest="cmd", required=True)
 
     l2 = sub.add_parser("l2pass")
     l2.add_argument("--qty", type=int, default=1)
     l2.add_argument("--value", type=str, default="1")
     l2.add_argument("--template-tx", type=str, default=None)
+    l2.add_argument("--at", type=str, default=None,
+                    help="pre-sign now, broadcast at this time (unix ts or HH:MM[:SS] local)")
+    l2.add_argument("--fee-levels", type=str, default="1,1.5,2,3",
+                    help="priority fee multipliers to pre-sign with --at")
+    l2.add_argument("--fee-level", type=float, default=None,
+                    help="variant to broadcast (default: the cheapest one covering the fee market at trigger)")
+    l2.add_argument("--gas", type=int, default=None,
+                    help="gas limit for --at: skip eth_estimateGas (mint may revert before the drop starts)")
 
     sw = sub.add_parser("swap")
     sw.add_argument("--from", dest="from_token", required=True)
     sw.add_argument("--to", dest="to_token", required=True)
     sw.add_argument("--amount", required=True, type=str)
     sw.add_argument("--slippage", type=float, default=getattr(config, "SLIPPAGE", 0.5))
+    sw.add_argument("--dex", choices=("v2", "v3"), default="v2",
+                    help="v3: QuickSwap V3 (Algebra) pool with a local quote mirror")
+
+    # воркер для run-plan из mod3_2: JSON-строки {"id", "argv"} на stdin
+    sub.add_parser("serve")
 
     return p
 
 
+def parse_at(value: str) -> float:
+    # unix timestamp или время сегодня по локальным часам
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = [int(x) for x in value.split(":")]
+    h, m, sec = (parts + [0, 0])[:3]
+    now = time.localtime()
+    return time.mktime((now.tm_year, now.tm_mon, now.tm_mday, h, m, sec, 0, 0, -1))
+
+
+async def execute(client, args) -> tuple[str, dict]:
+    if args.cmd == "l2pass":
+        from src.l2pass import L2PassMinter
+
+        minter = L2PassMinter(client)
+
+        print("L2PASS: mint start...")
+        if args.at:
+            levels = [float(x) for x in args.fee_levels.split(",")]
+            q = minter.prepare_mint(quantity=args.qty, value_pol=args.value, levels=levels, gas=args.gas)
+            at = parse_at(args.at)
+            print(f"L2PASS: {len(q.variants)} variants signed for nonce {q.snapshot.nonce}, firing in {at - time.time():.1f}s")
+            txh, dt = await q.fire_at(at, args.fee_level)
+            print(f"L2PASS: sent {dt * 1000:.1f} ms after trigger (re-signed {q.prepared - 1}x)")
+        elif args.template_tx:
+            txh = await minter.mint_from_template_tx(args.template_tx)
+        else:
+            txh = await minter.mint(quantity=args.qty, value_pol=args.value)
+
+    elif args.cmd == "swap":
+        if args.dex == "v3":
+            from src.quickswap_v3 import QuickSwapV3 as QuickSwap
+        else:
+            from src.quickswap import QuickSwap
+
+        qs = QuickSwap(client)
+
+        print(f"SWAP {args.dex}: {args.from_token} -> {args.to_token}, amount={args.amount}, slippage={args.slippage}%")
+        txh = await qs.swap(args.from_token, args.to_token, args.amount, args.slippage)
+
+    else:
+        raise RuntimeError(f"unknown cmd: {args.cmd}")
+
+    if not txh:
+        raise RuntimeError("Tx hash is empty. Transaction was not sent.")
+
+    # нормализуем вывод
+    if not txh.startswith("0x"):
+        txh = "0x" + txh
+
+    receipt = await client.wait_receipt(txh)
+    return txh, receipt
+
+
+async def serve(client) -> None:
+    # ответы пишем в настоящий stdout, все print адаптеров уходят в stderr
+    out = sys.stdout
+    sys.stdout = sys.stderr
+    out_lock = threading.Lock()
+    parser = build_parser()
+
+    def reply(msg: dict) -> None:
+        with out_lock:
+            out.write(json.dumps(msg) + "\n")
+            out.flush()
+
+    async def handle(req: dict) -> None:
+        try:
+            args = parser.parse_args(req["argv"])
+            if args.cmd == "serve":
+                raise ValueError("serve cannot be nested")
+            txh, receipt = await asyncio.to_thread(asyncio.run, execute(client, args))
+            reply({"id": req["id"], "tx": txh, "status": receipt.get("status")})
+        except (Exception, SystemExit) as e:
+            reply({"id": req["id"], "error": f"{type(e).__name__}: {e}"})
+
+    loop = asyncio.get_running_loop()
+    tasks = []
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            break
+        if line.strip():
+            tasks.append(asyncio.create_task(handle(json.loads(line))))
+    await asyncio.gather(*tasks)
+
+
+async def run_wallets_mode(args) -> None:
+    from src.shared import SharedRpc
+    from src.wallets import load_keys, run_wallets, summary
+
+    if args.cmd == "serve":
+        raise SystemExit("--keys is not supported for serve")
+    keys = load_keys(args.keys)
+    shared = SharedRpc(config.POLYGON_RPC, getattr(config, "PROXY", None))
+
+    async def job(key: str):
+        async with AsyncEvmClient(config.POLYGON_RPC, key, 137, getattr(config, "PROXY", None), shared,
+                                  access_list=getattr(config, "USE_ACCESS_LIST", False)) as client:
+            txh, receipt = await execute(client, args)
+            return txh, receipt.get("status")
+
+    t = time.perf_counter()
+    results = await run_wallets(keys, job, args.concurrency)
+    print(summary(results, time.perf_counter() - t))
+    print(shared.access_lists.report())
+    if not all(r.ok for r in results):
+        sys.exit(1)
+
+
 async def run():
     args = build_parser().parse_args()
-
-    print("CMD:", args.cmd)
-    print("ARGS:", args)
+    if args.keys:
+        await run_wallets_mode(args)
+        return
 
     client = AsyncEvmClient(
         rpc_url=config.POLYGON_RPC,
         private_key=config.PRIVATE_KEY,
         chain_id=137,
         proxy=getattr(config, "PROXY", None),
+        access_list=getattr(config, "USE_ACCESS_LIST", False),
     )
 
     async with client:
         if client.w3 is None:
             raise RuntimeError("Web3 not initialized (client.w3 is None)")
 
-        if args.cmd == "l2pass":
-            minter = L2PassMinter(client)
-
-            print("L2PASS: mint start...")
-            if args.template_tx:
-                txh = await minter.mint_from_template_tx(args.template_tx)
-            else:
-                txh = await minter.mint(quantity=args.qty, value_pol=args.value)
-
-            if not txh:
-                raise RuntimeError("Tx hash is empty. Transaction was not sent.")
-
-            # нормализуем вывод
-            if not txh.startswith("0x"):
-                txh = "0x" + txh
-
-            receipt = await client.wait_receipt(txh)
-            print("tx:", txh)
-            print("status:", receipt.get("status"))
+        if args.cmd == "serve":
+            await serve(client)
             return
 
-        if args.cmd == "swap":
-            qs = QuickSwap(client)
-
-            print(f"SWAP: {args.from_token} -> {args.to_token}, amount={args.amount}, slippage={args.slippage}%")
-            txh = await qs.swap(args.from_token, args.to_token, args.amount, args.slippage)
+        print("CMD:", args.cmd)
+        print("ARGS:", args)
 
-            if not txh:
-                raise RuntimeError("Tx hash is empty. Transaction was not sent.")
-
-            if not txh.startswith("0x"):
-                txh = "0x" + txh
-
-            receipt = await client.wait_receipt(txh)
-            print("tx:", txh)
-            print("status:", receipt.get("status"))
-            return
+        txh, receipt = await execute(client, args)
+        print("tx:", txh)
+        print("status:", receipt.get("status"))
 
 
 if __name__ == "__main__":
@@ -18,3 +18,49 @@ UNISWAP_V2_ROUTER_ABI = [
      "inputs":[{"name":"amountIn","type":"uint256"},{"name":"amountOutMin","type":"uint256"},{"name":"path","type":"address[]"},{"name":"to","type":"address"},{"name":"deadline","type":"uint256"}],
      "outputs":[{"name":"amounts","type":"uint256[]"}]},
 ]
+
+ALGEBRA_FACTORY_ABI = [
+    {"name":"poolByPair","type":"function","stateMutability":"view",
+     "inputs":[{"name":"","type":"address"},{"name":"","type":"address"}],
+     "outputs":[{"name":"","type":"address"}]},
+]
+
+ALGEBRA_POOL_ABI = [
+    {"name":"token0","type":"function","stateMutability":"view","inputs":[],"outputs":[{"name":"","type":"address"}]},
+    {"name":"token1","type":"function","stateMutability":"view","inputs":[],"outputs":[{"name":"","type":"address"}]},
+    {"name":"globalState","type":"function","stateMutability":"view","inputs":[],
+     "outputs":[{"name":"price","type":"uint160"},{"name":"tick","type":"int24"},{"name":"fee","type":"uint16"},
+                {"name":"timepointIndex","type":"uint16"},{"name":"communityFeeToken0","type":"uint8"},
+                {"name":"communityFeeToken1","type":"uint8"},{"name":"unlocked","type":"bool"}]},
+    {"name":"liquidity","type":"function","stateMutability":"view","inputs":[],"outputs":[{"name":"","type":"uint128"}]},
+    {"name":"tickTable","type":"function","stateMutability":"view",
+     "inputs":[{"name":"","type":"int16"}],"outputs":[{"name":"","type":"uint256"}]},
+    {"name":"ticks","type":"function","stateMutability":"view",
+     "inputs":[{"name":"","type":"int24"}],
+     "outputs":[{"name":"liquidityTotal","type":"uint128"},{"name":"liquidityDelta","type":"int128"},
+                {"name":"outerFeeGrowth0Token","type":"uint256"},{"name":"outerFeeGrowth1Token","type":"uint256"},
+                {"name":"outerTickCumulative","type":"int56"},{"name":"outerSecondsPerLiquidity","type":"uint160"},
+                {"name":"outerSecondsSpent","type":"uint32"},{"name":"initialized","type":"bool"}]},
+]
+
+# не view: quoter исполняет swap и откатывает его, только через eth_call
+ALGEBRA_QUOTER_ABI = [
+    {"name":"quoteExactInputSingle","type":"function","stateMutability":"nonpayable",
+     "inputs":[{"name":"tokenIn","type":"address"},{"name":"tokenOut","type":"address"},
+               {"name":"amountIn","type":"uint256"},{"name":"limitSqrtPrice","type":"uint160"}],
+     "outputs":[{"name":"amountOut","type":"uint256"},{"name":"fee","type":"uint16"}]},
+]
+
+ALGEBRA_ROUTER_ABI = [
+    {"name":"exactInputSingle","type":"function","stateMutability":"payable",
+     "inputs":[{"name":"params","type":"tuple","components":[
+         {"name":"tokenIn","type":"address"},{"name":"tokenOut","type":"address"},{"name":"recipient","type":"address"},
+         {"name":"deadline","type":"uint256"},{"name":"amountIn","type":"uint256"},
+         {"name":"amountOutMinimum","type":"uint256"},{"name":"limitSqrtPrice","type":"uint160"}]}],
+     "outputs":[{"name":"amountOut","type":"uint256"}]},
+    {"name":"unwrapWNativeToken","type":"function","stateMutability":"payable",
+     "inputs":[{"name":"amountMinimum","type":"uint256"},{"name":"recipient","type":"address"}],
+     "outputs":[]},
+    {"name":"multicall","type":"function","stateMutability":"payable",
+     "inputs":[{"name":"data","type":"bytes[]"}],"outputs":[{"name":"results","type":"bytes[]"}]},
+]
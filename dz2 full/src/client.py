@@ -3,7 +3,10 @@ from __future__ import annotations
 from typing import Any
 from eth_account import Account
 from web3 import Web3
-from web3.providers.rpc import HTTPProvider
+
+from .access_list import AccessListPlan
+from .shared import SharedRpc
+from .wallets import NonceAllocator
 
 
 class TxError(RuntimeError):
@@ -11,34 +14,42 @@ class TxError(RuntimeError):
 
 
 class AsyncEvmClient:
-    def __init__(self, rpc_url: str, private_key: str, chain_id: int, proxy: str | None = None):
+    def __init__(self, rpc_url: str, private_key: str, chain_id: int, proxy: str | None = None,
+                 shared: SharedRpc | None = None, access_list: bool = False):
         self.rpc_url = rpc_url
         self.private_key = private_key
         self.chain_id = chain_id
         self.proxy = proxy
+        self.access_list = access_list
 
         self.account = Account.from_key(private_key)
         self.address = self.account.address
 
+        self.shared = shared
         self.w3: Web3 | None = None
+        self.nonces = NonceAllocator(self._pending_nonce)
+        # tx hash -> план access list, по квитанции считаем реальную экономию
+        self._al_sent: dict[str, AccessListPlan] = {}
 
     async def __aenter__(self) -> "AsyncEvmClient":
-        request_kwargs: dict[str, Any] = {}
-        if self.proxy:
-            # requests ожидает proxies, не proxy
-            request_kwargs["proxies"] = {"http": self.proxy, "https": self.proxy}
-
-        self.w3 = Web3(HTTPProvider(self.rpc_url, request_kwargs=request_kwargs))
+        if self.shared is None:
+            self.shared = SharedRpc(self.rpc_url, self.proxy)
+        self.w3 = self.shared.w3
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
         self.w3 = None
+        self.nonces.reset()
 
     def _require_w3(self) -> Web3:
         if self.w3 is None:
             raise RuntimeError("Client not initialized")
         return self.w3
 
+    def _pending_nonce(self) -> int:
+        w3 = self._require_w3()
+        return w3.eth.get_transaction_count(self.address, "pending")
+
     async def get_nonce(self) -> int:
         w3 = self._require_w3()
         return w3.eth.get_transaction_count(self.address)
@@ -46,33 +57,29 @@ class AsyncEvmClient:
     async def sign_and_send(self, to: str, data: str = "0x", value: int = 0, gas_multiplier: float = 1.15) -> str:
         w3 = self._require_w3()
 
-        nonce = await self.get_nonce()
         tx: dict[str, Any] = {
             "chainId": self.chain_id,
             "from": self.address,
             "to": w3.to_checksum_address(to),
-            "nonce": nonce,
             "data": data,
             "value": value,
         }
 
-        # EIP-1559 если доступно
-        try:
-            block = w3.eth.get_block("latest")
-            base_fee = block["baseFeePerGas"]
-            prio = w3.eth.max_priority_fee
-            tx["maxPriorityFeePerGas"] = int(prio)
-            tx["maxFeePerGas"] = int(base_fee * 2 + prio)
-            tx["type"] = 2
-        except Exception:
-            tx["gasPrice"] = w3.eth.gas_price
+        tx.update(self.shared.fees.fees())
 
+        plan: AccessListPlan | None = None
         try:
+            # access list только для type 2 и только если он уменьшает газ
+            if self.access_list and tx.get("type") == 2:
+                plan = self.shared.access_lists.plan(w3, tx)
+                if plan.access_list:
+                    tx["accessList"] = plan.access_list
             gas_est = w3.eth.estimate_gas(tx)
         except Exception as e:
             raise TxError(f"estimate_gas failed: {e}") from e
         tx["gas"] = int(gas_est * gas_multiplier)
 
+        tx["nonce"] = self.nonces.allocate()
         signed = Account.sign_transaction(tx, self.private_key)
 
         raw = getattr(signed, "rawTransaction", None) or getattr(signed, "raw_transaction", None)
@@ -82,6 +89,7 @@ class AsyncEvmClient:
         try:
             tx_hash_bytes = w3.eth.send_raw_transaction(raw)
         except Exception as e:
+            self.nonces.release(tx["nonce"])
             raise TxError(f"send_raw_transaction failed: {e}") from e
 
         # web3 может вернуть HexBytes или bytes
@@ -90,6 +98,8 @@ class AsyncEvmClient:
         if not txh or txh == "None":
             raise TxError("send_raw_transaction returned empty tx hash")
 
+        if plan is not None and plan.access_list:
+            self._al_sent[txh.lower().removeprefix("0x")] = plan
         return txh
 
     async def wait_receipt(self, tx_hash: str, timeout: int = 180) -> dict[str, Any]:
@@ -98,6 +108,12 @@ class AsyncEvmClient:
             r = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
         except Exception as e:
             raise TxError(f"wait_receipt failed: {e}") from e
+        plan = self._al_sent.pop(str(tx_hash).lower().removeprefix("0x"), None)
+        if plan is not None:
+            price = int(r.get("effectiveGasPrice") or 0)
+            self.shared.access_lists.record(plan.saved, int(r["gasUsed"]), price)
+            print(f"[access list] gasUsed={r['gasUsed']} (estimate {plan.gas_with} with list, "
+                  f"{plan.gas_without} without): estimated saving {plan.saved} gas ({plan.saved * price / 1e18:.8f} POL)")
         return dict(r)
 
     async def get_tx(self, tx_hash: str) -> dict[str, Any]:
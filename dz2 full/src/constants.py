@@ -13,3 +13,8 @@ POL = Token("POL", None, 18)
 QUICKSWAP_V2_ROUTER = "0xa5E0829CaCEd8fFDD4De3c43696c57F7D7A678ff"
 
 TOKENS_BY_NAME = {"POL": POL, "USDC": USDC, "WPOL": WPOL}
+
+# QuickSwap V3 (Algebra v1)
+QUICKSWAP_V3_FACTORY = "0x411b0fAcC3489691f28ad58c47006AF5E3Ab3A28"
+QUICKSWAP_V3_ROUTER = "0xf5b509bB0909a69B1c207E495f687a596C168E12"
+QUICKSWAP_V3_QUOTER = "0xa15F0D7377B2A0C0c10db057f641beD21028FC89"
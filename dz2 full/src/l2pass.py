@@ -1,5 +1,6 @@
 from __future__ import annotations
 from .client import AsyncEvmClient
+from .presign import PresignQueue
 from .utils import to_wei_amount
 
 class L2PassMinter:
@@ -17,7 +18,7 @@ class L2PassMinter:
 
     def _contract(self):
         w3 = self.client._require_w3()
-        return w3.eth.contract(address=w3.to_checksum_address(self.CONTRACT), abi=self.ABI)
+        return self.client.shared.contracts.contract(address=w3.to_checksum_address(self.CONTRACT), abi=self.ABI)
 
     async def mint(self, quantity: int=1, value_pol: str="1") -> str:
         c = self._contract()
@@ -25,6 +26,15 @@ class L2PassMinter:
         value = to_wei_amount(value_pol, 18)
         return await self.client.sign_and_send(to=self.CONTRACT, data=data, value=value)
 
+    def prepare_mint(self, quantity: int=1, value_pol: str="1", levels=(1.0, 1.5, 2.0, 3.0),
+                     gas: int | None = None) -> PresignQueue:
+        # mint на старте дропа: подписываем заранее под несколько уровней комиссии
+        c = self._contract()
+        data = c.encode_abi("mint", args=[int(quantity)])
+        q = PresignQueue(self.client, self.CONTRACT, data, to_wei_amount(value_pol, 18), levels=tuple(levels), gas=gas)
+        q.prepare()
+        return q
+
     async def mint_from_template_tx(self, template_tx_hash: str) -> str:
         tx = await self.client.get_tx(template_tx_hash)
         to = tx.get("to")
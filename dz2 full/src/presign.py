@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from eth_account import Account
+
+from .client import AsyncEvmClient, TxError
+
+# base fee может вырасти на 12.5% за блок (EIP-1559)
+BASE_FEE_STEP = 1.125
+# наблюдение рынка комиссий старше этого (около блока Polygon) для выбора варианта не годится
+MARKET_MAX_AGE = 2.0
+# как часто до триггера в фоне перечитывается рынок комиссий
+MARKET_POLL = 1.0
+
+
+@dataclass
+class Variant:
+    level: float
+    tx: dict[str, Any]
+    raw: bytes
+    tx_hash: str
+
+
+@dataclass
+class Snapshot:
+    nonce: int
+    block: int
+    base_fee: int | None
+    tip: int
+    gas_price: int | None
+    prepared_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class Market:
+    base_fee: int | None
+    tip: int
+    gas_price: int | None
+    at: float = field(default_factory=time.monotonic)
+
+
+class PresignQueue:
+    # Заранее подписанные варианты одной tx (тот же nonce, разная комиссия).
+    # В момент триггера отправляется готовый raw без единого запроса на подготовку.
+    # gas задан — eth_estimateGas не вызывается (до старта дропа mint может ревертиться).
+
+    def __init__(
+        self,
+        client: AsyncEvmClient,
+        to: str,
+        data: str = "0x",
+        value: int = 0,
+        levels: tuple[float, ...] = (1.0, 1.5, 2.0, 3.0),
+        gas_multiplier: float = 1.2,
+        blocks_ahead: int = 3,
+        gas: int | None = None,
+    ):
+        self.client = client
+        self.to = to
+        self.data = data
+        self.value = int(value)
+        self.levels = tuple(sorted(levels))
+        self.gas_multiplier = gas_multiplier
+        # сколько блоков роста base fee должны выдержать все варианты
+        self.blocks_ahead = blocks_ahead
+        self.gas = gas
+        self.snapshot: Snapshot | None = None
+        # последнее наблюдение рынка комиссий (prepare / проверки свежести / фоновый опрос)
+        self.market: Market | None = None
+        self.variants: list[Variant] = []
+        self.prepared = 0
+
+    def _fees(self) -> tuple[int, int | None, int, int | None]:
+        w3 = self.client._require_w3()
+        block = w3.eth.get_block("latest")
+        base_fee = block.get("baseFeePerGas")
+        if base_fee is None:
+            number, base_fee, tip, gas_price = block["number"], None, 0, int(w3.eth.gas_price)
+        else:
+            number, base_fee, tip, gas_price = block["number"], int(base_fee), int(w3.eth.max_priority_fee), None
+        self.market = Market(base_fee, tip, gas_price)
+        return number, base_fee, tip, gas_price
+
+    def prepare(self) -> list[Variant]:
+        w3 = self.client._require_w3()
+        number, base_fee, tip, gas_price = self._fees()
+        nonce = self.client._pending_nonce()
+
+        base: dict[str, Any] = {
+            "chainId": self.client.chain_id,
+            "from": self.client.address,
+            "to": w3.to_checksum_address(self.to),
+            "data": self.data,
+            "value": self.value,
+        }
+        if self.gas is not None:
+            gas = int(self.gas)
+        else:
+            try:
+                gas = int(w3.eth.estimate_gas(base) * self.gas_multiplier)
+            except Exception as e:
+                raise TxError(f"estimate_gas failed (set the gas limit explicitly): {e}") from e
+
+        variants = []
+        for level in self.levels:
+            tx = dict(base, nonce=nonce, gas=gas)
+            tx.pop("from")
+            if base_fee is None:
+                tx["gasPrice"] = int(gas_price * level)
+            else:
+                prio = int(tip * level)
+                tx["maxPriorityFeePerGas"] = prio
+                tx["maxFeePerGas"] = int(base_fee * BASE_FEE_STEP ** self.blocks_ahead) + prio
+                tx["type"] = 2
+            signed = Account.sign_transaction(tx, self.client.private_key)
+            raw = getattr(signed, "rawTransaction", None) or getattr(signed, "raw_transaction", None)
+            h = signed.hash.hex()
+            variants.append(Variant(level, tx, bytes(raw), h if h.startswith("0x") else "0x" + h))
+
+        self.snapshot = Snapshot(nonce, number, base_fee, tip, gas_price)
+        self.variants = variants
+        self.prepared += 1
+        return variants
+
+    def stale_reason(self) -> str | None:
+        # nonce ушел (кошелек отправил другую tx) или рынок вышел за подписанные комиссии
+        snap = self.snapshot
+        if snap is None or not self.variants:
+            return "not prepared"
+        if self.client._pending_nonce() != snap.nonce:
+            return "nonce moved"
+        _, base_fee, tip, gas_price = self._fees()
+        top = self.variants[-1].tx
+        if base_fee is not None:
+            if base_fee * BASE_FEE_STEP > top["maxFeePerGas"] - top["maxPriorityFeePerGas"]:
+                return f"base fee {base_fee} above signed cap"
+            if tip > top["maxPriorityFeePerGas"] or tip * 2 < self.variants[0].tx["maxPriorityFeePerGas"]:
+                return f"priority fee moved ({snap.tip} -> {tip})"
+        elif gas_price is not None:
+            if gas_price > top["gasPrice"] or gas_price * 2 < self.variants[0].tx["gasPrice"]:
+                return f"gas price moved ({snap.gas_price} -> {gas_price})"
+        return None
+
+    def refresh(self) -> bool:
+        reason = self.stale_reason()
+        if reason is None:
+            return False
+        print(f"[presign] re-signing: {reason}")
+        self.prepare()
+        return True
+
+    def _covers(self, v: Variant, m: Market) -> bool:
+        # вариант проходит в следующий блок при текущем рынке
+        if m.base_fee is None:
+            return m.gas_price is not None and v.tx.get("gasPrice", 0) >= m.gas_price
+        prio = v.tx.get("maxPriorityFeePerGas", 0)
+        return prio >= m.tip and v.tx.get("maxFeePerGas", 0) - prio >= m.base_fee * BASE_FEE_STEP
+
+    def pick(self, level: float | None = None) -> Variant:
+        if not self.variants:
+            raise TxError("nothing prepared")
+        if level is None:
+            # самый дешевый вариант, который покрывает рынок в момент триггера, иначе самый дорогой.
+            # Только по уже известному наблюдению: запросов к узлу в момент триггера нет
+            if self.market is None or time.monotonic() - self.market.at > MARKET_MAX_AGE:
+                print("[presign] no fresh fee market observation, using the top variant")
+                return self.variants[-1]
+            for v in self.variants:
+                if self._covers(v, self.market):
+                    return v
+            return self.variants[-1]
+        # ближайший подписанный уровень не ниже запрошенного
+        for v in self.variants:
+            if v.level >= level:
+                return v
+        return self.variants[-1]
+
+    def fire(self, level: float | None = None) -> tuple[str, float]:
+        # отправка готовых байтов; возвращает (hash, задержку отправки в секундах)
+        v = self.pick(level)
+        w3 = self.client._require_w3()
+        if level is None:
+            print(f"[presign] fee level {v.level} by the market at trigger")
+        t = time.perf_counter()
+        try:
+            w3.eth.send_raw_transaction(v.raw)
+        except Exception as e:
+            raise TxError(f"send_raw_transaction failed: {e}") from e
+        dt = time.perf_counter() - t
+        # nonce занят мимо аллокатора клиента
+        self.client.nonces.reset()
+        self.variants = []
+        return v.tx_hash, dt
+
+    async def _watch_market(self, every: float) -> None:
+        # наблюдение рынка обновляется между триггерами в отдельном потоке, event loop не ждет узел
+        while True:
+            try:
+                await asyncio.to_thread(self._fees)
+            except Exception as e:
+                print(f"[presign] fee market poll failed: {e}")
+            await asyncio.sleep(every)
+
+    async def fire_at(self, at: float, level: float | None = None, poll: float = 1.0) -> tuple[str, float]:
+        # до момента at поддерживаем варианты свежими, в момент at — отправляем
+        if not self.variants:
+            self.prepare()
+        watcher = asyncio.create_task(self._watch_market(MARKET_POLL)) if level is None else None
+        try:
+            while True:
+                left = at - time.time()
+                if left <= 0:
+                    break
+                await asyncio.sleep(min(poll, left))
+                if at - time.time() > poll / 2:
+                    self.refresh()
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+        return self.fire(level)
@@ -13,14 +13,14 @@ class QuickSwap:
 
     def _router(self):
         w3 = self.client._require_w3()
-        return w3.eth.contract(
+        return self.client.shared.contracts.contract(
             address=w3.to_checksum_address(QUICKSWAP_V2_ROUTER),
             abi=UNISWAP_V2_ROUTER_ABI,
         )
 
     def _erc20(self, token_addr: str):
         w3 = self.client._require_w3()
-        return w3.eth.contract(
+        return self.client.shared.contracts.contract(
             address=w3.to_checksum_address(token_addr),
             abi=ERC20_ABI,
         )
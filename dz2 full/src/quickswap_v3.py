@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from src.abi import ALGEBRA_FACTORY_ABI, ALGEBRA_ROUTER_ABI
+from src.algebra import AlgebraPool
+from src.constants import QUICKSWAP_V3_FACTORY, QUICKSWAP_V3_ROUTER, TOKENS_BY_NAME, WPOL
+from src.quickswap import QuickSwap
+from src.utils import apply_slippage, now_ts, to_wei_amount
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+
+class QuickSwapV3(QuickSwap):
+    # swap через пулы концентрированной ликвидности (Algebra): одна пара — один пул,
+    # котировка из локального зеркала пула (src/algebra.py), общего для всех кошельков
+
+    def _router(self):
+        w3 = self.client._require_w3()
+        return self.client.shared.contracts.contract(
+            address=w3.to_checksum_address(QUICKSWAP_V3_ROUTER), abi=ALGEBRA_ROUTER_ABI,
+        )
+
+    def pool(self, token_a: str, token_b: str) -> AlgebraPool:
+        w3 = self.client._require_w3()
+        factory = self.client.shared.contracts.contract(
+            address=w3.to_checksum_address(QUICKSWAP_V3_FACTORY), abi=ALGEBRA_FACTORY_ABI,
+        )
+        key = tuple(sorted((token_a.lower(), token_b.lower())))
+        pools = self.client.shared.algebra_pools
+        p = pools.get(key)
+        if p is None:
+            addr = factory.functions.poolByPair(w3.to_checksum_address(key[0]), w3.to_checksum_address(key[1])).call()
+            if addr == ZERO_ADDRESS:
+                raise ValueError(f"No QuickSwap V3 pool for {key[0]}/{key[1]}")
+            p = pools.setdefault(key, AlgebraPool(w3, addr))
+        return p
+
+    def _encode_swap(self, token_in: str, token_out: str, amount_in: int, out_min: int, to_native: bool) -> str:
+        w3 = self.client._require_w3()
+        router = self._router()
+        # за POL: WPOL остается в роутере и выводится unwrapWNativeToken в том же multicall
+        recipient = w3.to_checksum_address(QUICKSWAP_V3_ROUTER) if to_native else self.client.address
+        swap = router.encode_abi("exactInputSingle", args=[(
+            w3.to_checksum_address(token_in), w3.to_checksum_address(token_out), recipient,
+            now_ts() + 600, amount_in, out_min, 0,
+        )])
+        if not to_native:
+            return swap
+        unwrap = router.encode_abi("unwrapWNativeToken", args=[out_min, self.client.address])
+        return router.encode_abi("multicall", args=[[bytes.fromhex(swap[2:]), bytes.fromhex(unwrap[2:])]])
+
+    async def swap(self, from_token_name: str, to_token_name: str, amount: str, slippage: float) -> str:
+        from_t = TOKENS_BY_NAME[from_token_name.upper()]
+        to_t = TOKENS_BY_NAME[to_token_name.upper()]
+
+        if from_t.address is None and to_t.address is None:
+            raise ValueError("POL -> POL swap is not meaningful")
+
+        # POL идет через WPOL: роутер сам оборачивает value
+        token_in = from_t.address or WPOL.address
+        token_out = to_t.address or WPOL.address
+        amount_in = to_wei_amount(amount, from_t.decimals)
+
+        if from_t.address is not None:
+            await self._ensure_approval(token_in, QUICKSWAP_V3_ROUTER, amount_in)
+
+        pool = self.pool(token_in, token_out)
+        quote = pool.quote(token_in, amount_in)
+        out_min = apply_slippage(quote, slippage)
+        print(f"SWAP V3: pool={pool.address} quote={quote} min={out_min} ({pool.report()})")
+
+        data = self._encode_swap(token_in, token_out, amount_in, out_min, to_native=to_t.address is None)
+        value = amount_in if from_t.address is None else 0
+        return await self.client.sign_and_send(to=QUICKSWAP_V3_ROUTER, data=data, value=value)
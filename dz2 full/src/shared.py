@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from typing import Any
+
+from web3 import Web3
+from web3.providers.rpc import HTTPProvider
+
+from .access_list import AccessListCache
+from .wallets import ContractCache, TtlValue
+
+
+class FeeOracle(TtlValue):
+    # поля комиссии с коротким TTL, общие для всех кошельков
+
+    def __init__(self, w3: Web3, ttl: float = 2.0):
+        super().__init__(self._fetch, ttl)
+        self.w3 = w3
+
+    def _fetch(self) -> dict[str, int]:
+        # EIP-1559 если доступно
+        try:
+            block = self.w3.eth.get_block("latest")
+            base_fee = block["baseFeePerGas"]
+            prio = int(self.w3.eth.max_priority_fee)
+            return {"maxPriorityFeePerGas": prio, "maxFeePerGas": int(base_fee * 2 + prio), "type": 2}
+        except Exception:
+            return {"gasPrice": int(self.w3.eth.gas_price)}
+
+    def fees(self) -> dict[str, int]:
+        return dict(self.get())
+
+
+class SharedRpc:
+    # провайдер, оракул комиссии, кэш контрактов, access list и зеркала пулов на все кошельки
+
+    def __init__(self, rpc_url: str, proxy: str | None = None):
+        request_kwargs: dict[str, Any] = {}
+        if proxy:
+            request_kwargs["proxies"] = {"http": proxy, "https": proxy}
+
+        self.rpc_url = rpc_url
+        self.w3 = Web3(HTTPProvider(rpc_url, request_kwargs=request_kwargs))
+        self.fees = FeeOracle(self.w3)
+        self.contracts = ContractCache(self.w3.eth.contract)
+        self.access_lists = AccessListCache()
+        # зеркала пулов QuickSwap V3 (src/algebra.py) по паре токенов
+        self.algebra_pools: dict[tuple[str, ...], Any] = {}
@@ -0,0 +1,24 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+# Режим нескольких кошельков общий с mod3_2 (mod3_2/src/wallets.py). Оба проекта — свой пакет src,
+# поэтому модуль подгружается по пути, а не импортом пакета.
+_PATH = Path(__file__).resolve().parents[2] / "mod3_2" / "src" / "wallets.py"
+_NAME = "mod3_2_wallets"
+
+_wallets = sys.modules.get(_NAME)
+if _wallets is None:
+    _spec = importlib.util.spec_from_file_location(_NAME, _PATH)
+    _wallets = importlib.util.module_from_spec(_spec)
+    # dataclasses ищут модуль класса в sys.modules
+    sys.modules[_NAME] = _wallets
+    _spec.loader.exec_module(_wallets)
+
+WalletResult = _wallets.WalletResult
+load_keys = _wallets.load_keys
+run_wallets = _wallets.run_wallets
+summary = _wallets.summary
+TtlValue = _wallets.TtlValue
+ContractCache = _wallets.ContractCache
+NonceAllocator = _wallets.NonceAllocator
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+from src.algebra import MirrorMiss, PoolState, TickInfo, swap_exact_input
+
+# снимки пулов QuickSwap V3: состояние и ответы Quoter на одном блоке (tests/record_algebra.py)
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+class CountingTicks(dict):
+    # swap_exact_input читает ticks.get только при пересечении инициализированного тика
+    def __init__(self, *args: Any):
+        super().__init__(*args)
+        self.crossed: list[int] = []
+
+    def get(self, key, default=None):
+        self.crossed.append(key)
+        return super().get(key, default)
+
+
+def fixture_paths() -> list[Path]:
+    return sorted(FIXTURES.glob("algebra_*.json"))
+
+
+def load(path: Path) -> dict[str, Any]:
+    return json.loads(path.read_text())
+
+
+def state_of(fx: dict[str, Any], fee: int | None = None) -> PoolState:
+    gs = fx["global_state"]
+    return PoolState(
+        price=gs["price"], tick=gs["tick"], fee=gs["fee"] if fee is None else fee,
+        liquidity=fx["liquidity"], block=fx["block"],
+        rows={int(r): int(v, 16) for r, v in fx["tick_table"].items()},
+        ticks=CountingTicks({int(t): TickInfo(*v) for t, v in fx["ticks"].items()}),
+    )
+
+
+def dump(state: PoolState, pool: str, token0: str, token1: str, quotes: list[dict[str, Any]]) -> dict[str, Any]:
+    return {
+        "pool": pool,
+        "token0": token0,
+        "token1": token1,
+        "block": state.block,
+        "global_state": {"price": state.price, "tick": state.tick, "fee": state.fee},
+        "liquidity": state.liquidity,
+        "tick_table": {str(r): hex(v) for r, v in sorted(state.rows.items())},
+        "ticks": {str(t): [i.liquidity_total, i.liquidity_delta] for t, i in sorted(state.ticks.items())},
+        "quotes": quotes,
+    }
+
+
+def crossings(fx: dict[str, Any], zero_to_one: bool, amount: int, fee: int | None = None) -> tuple[int, int]:
+    # -> (amountOut по зеркалу, сколько инициализированных тиков пересек swap)
+    state = state_of(fx, fee)
+    out = swap_exact_input(state, zero_to_one, amount)
+    return out, len(state.ticks.crossed)
+
+
+def ladder(fx: dict[str, Any], zero_to_one: bool, max_crossings: int = 4) -> list[int]:
+    # суммы входа: первая, дающая 0, 1, 2, ... пересечений, пока swap не уйдет за загруженные строки
+    picked: dict[int, int] = {}
+    amount = 1000
+    while amount < 10**36 and len(picked) <= max_crossings:
+        try:
+            _, n = crossings(fx, zero_to_one, amount)
+        except MirrorMiss:
+            break
+        picked.setdefault(n, amount)
+        amount = amount * 3 // 2
+    return [picked[n] for n in sorted(picked)]
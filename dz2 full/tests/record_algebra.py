@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+# Снимок пула QuickSwap V3 для tests/test_algebra.py:
+#   python tests/record_algebra.py [--pair WPOL USDC] [--block N] [--rpc URL]
+# globalState, liquidity, строки tickTable вокруг цены, их тики и ответы Quoter
+# (amountOut, fee) на лестнице сумм в обе стороны — все на одном блоке.
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from web3 import Web3
+
+import config
+from src.abi import ALGEBRA_FACTORY_ABI
+from src.algebra import AlgebraPool
+from src.constants import QUICKSWAP_V3_FACTORY, TOKENS_BY_NAME
+
+from tests.algebra_fixtures import FIXTURES, dump, ladder
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--pair", nargs=2, default=["WPOL", "USDC"])
+    p.add_argument("--block", type=int, default=None)
+    p.add_argument("--rpc", default=config.POLYGON_RPC)
+    args = p.parse_args()
+
+    w3 = Web3(Web3.HTTPProvider(args.rpc))
+    a, b = (Web3.to_checksum_address(TOKENS_BY_NAME[t.upper()].address) for t in args.pair)
+    factory = w3.eth.contract(address=Web3.to_checksum_address(QUICKSWAP_V3_FACTORY), abi=ALGEBRA_FACTORY_ABI)
+    pool = AlgebraPool(w3, factory.functions.poolByPair(a, b).call())
+    state = pool.load(args.block)
+    fx = dump(state, pool.address, pool.token0, pool.token1, [])
+
+    for zto in (True, False):
+        token_in = pool.token0 if zto else pool.token1
+        for amount in ladder(fx, zto):
+            out, fee = pool.quoter_amount_out(token_in, amount, state.block)
+            fx["quotes"].append({"zero_to_one": zto, "amount_in": amount, "amount_out": out, "fee": fee})
+
+    FIXTURES.mkdir(exist_ok=True)
+    path = FIXTURES / f"algebra_{pool.address.lower()}_{state.block}.json"
+    path.write_text(json.dumps(fx, indent=1) + "\n")
+    print(f"{path}: {len(fx['ticks'])} ticks, {len(fx['quotes'])} quotes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import random
+from fractions import Fraction
+
+import pytest
+
+from src.algebra import (
+    FEE_DENOMINATOR, MAX_SQRT_RATIO, MAX_TICK, MIN_SQRT_RATIO, MIN_TICK, Q96, TICK_SPACING, PoolState, TickInfo,
+    move_price, next_tick_in_row, sqrt_ratio_at_tick, swap_exact_input, tick_at_sqrt_ratio,
+)
+
+from tests.algebra_fixtures import CountingTicks, crossings, fixture_paths, load, state_of
+
+FIXTURE_PATHS = fixture_paths()
+
+
+@pytest.fixture(params=FIXTURE_PATHS or [None], ids=lambda p: p.stem if p else "missing")
+def fx(request):
+    # сверка с Quoter — приемочная проверка зеркала: без снимков тест падает, а не пропускается
+    if request.param is None:
+        pytest.fail("no recorded pools in tests/fixtures: run tests/record_algebra.py")
+    return load(request.param)
+
+
+# ---- TickMath ----------------------------------------------------------------
+
+# значения getSqrtRatioAtTick из тестов TickMath Uniswap v3 (в Algebra v1 библиотека та же)
+@pytest.mark.parametrize("tick, expected", [
+    (MIN_TICK, MIN_SQRT_RATIO),
+    (MIN_TICK + 1, 4295343490),
+    (0, 1 << 96),
+    (50, 79426470787362580746886972461),
+    (-50, 79030349367926598376800521322),
+    (738203, 847134979253254120489401328389043031315994541),
+    (MAX_TICK - 1, 1461373636630004318706518188784493106690254656249),
+    (MAX_TICK, MAX_SQRT_RATIO),
+])
+def test_sqrt_ratio_at_tick(tick, expected):
+    assert sqrt_ratio_at_tick(tick) == expected
+
+
+def test_sqrt_ratio_at_tick_out_of_range():
+    with pytest.raises(ValueError):
+        sqrt_ratio_at_tick(MAX_TICK + 1)
+    with pytest.raises(ValueError):
+        sqrt_ratio_at_tick(MIN_TICK - 1)
+
+
+def test_global_state_tick_matches_price(fx):
+    gs = fx["global_state"]
+    assert sqrt_ratio_at_tick(gs["tick"]) <= gs["price"] < sqrt_ratio_at_tick(gs["tick"] + 1)
+    assert tick_at_sqrt_ratio(gs["price"]) == gs["tick"]
+
+
+# ---- TickTable -----------------------------------------------------------------
+
+def _brute_next(rows: dict[int, int], tick: int, lte: bool) -> tuple[int, bool]:
+    # перебор битов строки: ближайший инициализированный тик в той же строке, иначе край строки
+    compressed = tick // TICK_SPACING + (0 if lte else 1)
+    row_n = compressed >> 8
+    row = rows[row_n]
+    bits = range(compressed, (row_n << 8) - 1, -1) if lte else range(compressed, (row_n << 8) + 256)
+    for c in bits:
+        if row >> (c & 0xFF) & 1:
+            return min(max(c * TICK_SPACING, MIN_TICK), MAX_TICK), True
+    edge = row_n << 8 if lte else (row_n << 8) + 255
+    return min(max(edge * TICK_SPACING, MIN_TICK), MAX_TICK), False
+
+
+def test_next_tick_in_row_random_rows():
+    rnd = random.Random(7)
+    rows = {r: rnd.getrandbits(256) & rnd.getrandbits(256) & rnd.getrandbits(256) for r in range(-3, 3)}
+    rows[-1] = 0
+    rows[1] = 1 << 255
+    state = PoolState(price=0, tick=0, fee=0, liquidity=0, block=0, rows=rows)
+    for _ in range(2000):
+        tick = rnd.randrange(-2 * 256 * TICK_SPACING, 2 * 256 * TICK_SPACING)
+        for lte in (True, False):
+            assert next_tick_in_row(state, tick, lte) == _brute_next(rows, tick, lte), (tick, lte)
+
+
+def test_next_tick_in_row_recorded_table(fx):
+    state = state_of(fx)
+    rows = state.rows
+    lo, hi = min(rows) << 8, (max(rows) << 8) + 255
+    ticks = [t for t in map(int, fx["ticks"]) if lo < t // TICK_SPACING < hi]
+    probes = {fx["global_state"]["tick"]} | {t + d for t in ticks for d in (-1, 0, 1)}
+    for tick in sorted(probes):
+        for lte in (True, False):
+            if ((tick // TICK_SPACING + (0 if lte else 1)) >> 8) in rows:
+                assert next_tick_in_row(state, tick, lte) == _brute_next(rows, tick, lte), (tick, lte)
+    # каждый записанный тик отмечен в tickTable
+    for t in ticks:
+        c = t // TICK_SPACING
+        assert rows[c >> 8] >> (c & 0xFF) & 1
+
+
+# ---- PriceMovementMath -----------------------------------------------------------
+
+@pytest.mark.parametrize("zero_to_one", [True, False])
+def test_move_price_exact_input(zero_to_one):
+    price, liquidity, fee = sqrt_ratio_at_tick(100), 10**21, 500
+    target = sqrt_ratio_at_tick(100 - 600 if zero_to_one else 100 + 600)
+    # до цели не дошли: весь вход потрачен (input + комиссия), цена между текущей и целью
+    new, inp, out, fee_amount = move_price(zero_to_one, price, target, liquidity, 10**15, fee)
+    assert inp + fee_amount == 10**15 and out > 0
+    assert (target < new < price) if zero_to_one else (price < new < target)
+    # дошли: цена ровно на цели, остаток входа не тратится
+    new, inp, out, fee_amount = move_price(zero_to_one, price, target, liquidity, 10**30, fee)
+    assert new == target and inp + fee_amount < 10**30
+
+
+def test_move_price_matches_quoter_within_range(fx):
+    # swap без пересечений — один шаг movePriceTowardsTarget до следующего тика строки
+    gs = fx["global_state"]
+    checked = 0
+    for q in fx["quotes"]:
+        out, n = crossings(fx, q["zero_to_one"], q["amount_in"], q["fee"])
+        if n:
+            continue
+        state = state_of(fx, q["fee"])
+        nxt, _ = next_tick_in_row(state, gs["tick"], q["zero_to_one"])
+        new, _, step_out, _ = move_price(q["zero_to_one"], gs["price"], sqrt_ratio_at_tick(nxt),
+                                         fx["liquidity"], q["amount_in"], q["fee"])
+        if new == sqrt_ratio_at_tick(nxt):
+            continue
+        assert step_out == q["amount_out"] == out
+        checked += 1
+    assert checked
+
+
+@pytest.mark.parametrize("zero_to_one", [True, False])
+def test_move_price_against_exact_math(zero_to_one):
+    # внутри диапазона: выход — floor точной величины L * Δ(√P) (или L * Δ(1/√P)) по новой цене,
+    # а новая цена не дальше точной (округление в пользу пула)
+    rnd = random.Random(11)
+    for _ in range(300):
+        price = sqrt_ratio_at_tick(rnd.randrange(-200_000, 200_000))
+        liquidity = rnd.randrange(10**15, 10**24)
+        fee = rnd.randrange(100, 3000)
+        amount = rnd.randrange(10**3, 10**18)
+        target = MIN_SQRT_RATIO + 1 if zero_to_one else MAX_SQRT_RATIO - 1
+        new, inp, out, fee_amount = move_price(zero_to_one, price, target, liquidity, amount, fee)
+        assert new != target and inp + fee_amount == amount
+        net = Fraction(amount * (FEE_DENOMINATOR - fee), FEE_DENOMINATOR)
+        if zero_to_one:
+            exact = Fraction(liquidity * Q96 * price) / (liquidity * Q96 + net * price)
+            assert exact <= new
+            assert out == int(Fraction(liquidity * (price - new), Q96))
+        else:
+            exact = price + net * Q96 / liquidity
+            assert new <= exact
+            assert out == int(liquidity * Q96 * Fraction(new - price, new * price))
+
+
+# ---- swap ------------------------------------------------------------------------
+
+def test_swap_exact_input_matches_quoter(fx):
+    assert fx["quotes"]
+    for q in fx["quotes"]:
+        out, _ = crossings(fx, q["zero_to_one"], q["amount_in"], q["fee"])
+        assert out == q["amount_out"], q
+
+
+@pytest.mark.parametrize("zero_to_one", [True, False])
+def test_swap_exact_input_multi_tick_crossing(fx, zero_to_one):
+    # лестница снимка обязана пересекать несколько инициализированных тиков в каждую сторону
+    multi = [q for q in fx["quotes"] if q["zero_to_one"] == zero_to_one
+             and crossings(fx, zero_to_one, q["amount_in"], q["fee"])[1] >= 2]
+    assert multi
+    for q in multi:
+        assert crossings(fx, zero_to_one, q["amount_in"], q["fee"])[0] == q["amount_out"]
+
+
+def _synthetic(initialized: list[int], liquidity_delta: int) -> PoolState:
+    rows: dict[int, int] = {}
+    for t in initialized:
+        c = t // TICK_SPACING
+        rows[c >> 8] = rows.get(c >> 8, 0) | 1 << (c & 0xFF)
+    for r in range(-3, 3):
+        rows.setdefault(r, 0)
+    return PoolState(price=sqrt_ratio_at_tick(30), tick=30, fee=400, liquidity=10**22, block=0, rows=rows,
+                     ticks=CountingTicks({t: TickInfo(10**22, liquidity_delta) for t in initialized}))
+
+
+@pytest.mark.parametrize("zero_to_one", [True, False])
+def test_swap_crossing_empty_ticks_is_seamless(zero_to_one):
+    # тики с нулевым liquidityDelta только дробят swap на шаги — выход тот же с точностью до округления
+    ticks = list(range(-10 * TICK_SPACING, 11 * TICK_SPACING, TICK_SPACING))
+    for amount, min_crossed in ((10**17, 0), (10**20, 2), (10**21, 10)):
+        split = _synthetic(ticks, 0)
+        out = swap_exact_input(split, zero_to_one, amount)
+        n = len(split.ticks.crossed)
+        assert n >= min_crossed
+        # разница — только округление (input вверх, output вниз) на каждом шаге
+        assert 0 <= swap_exact_input(_synthetic([], 0), zero_to_one, amount) - out <= 2 * (n + 1)
+
+
+@pytest.mark.parametrize("zero_to_one", [True, False])
+def test_swap_crossing_applies_liquidity_delta(zero_to_one):
+    # за тиками ликвидность падает: выход меньше, чем при той же ликвидности
+    ticks = [-2 * TICK_SPACING, -TICK_SPACING, TICK_SPACING, 2 * TICK_SPACING]
+    delta = 4 * 10**21 if zero_to_one else -4 * 10**21
+    same = swap_exact_input(_synthetic(ticks, 0), zero_to_one, 10**20)
+    thinner = _synthetic(ticks, delta)
+    out = swap_exact_input(thinner, zero_to_one, 10**20)
+    assert len(thinner.ticks.crossed) >= 2
+    assert out < same
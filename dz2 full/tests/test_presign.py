@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+from src import presign
+from src.presign import Market, PresignQueue, Variant
+
+
+class NoRpcClient:
+    def _require_w3(self):
+        raise AssertionError("RPC at trigger time")
+
+
+def _queue() -> PresignQueue:
+    q = PresignQueue(NoRpcClient(), "0x" + "11" * 20, gas=100_000)
+    q.variants = [
+        Variant(level, {"maxPriorityFeePerGas": int(10 * level), "maxFeePerGas": 200 + int(10 * level)}, b"", f"0x{i}")
+        for i, level in enumerate((1.0, 2.0, 4.0))
+    ]
+    return q
+
+
+def test_pick_uses_cached_market():
+    q = _queue()
+    q.market = Market(base_fee=100, tip=15, gas_price=None)
+    assert q.pick().level == 2.0
+
+
+def test_pick_without_fresh_market_takes_top_variant():
+    q = _queue()
+    assert q.pick().level == 4.0
+    q.market = Market(base_fee=100, tip=5, gas_price=None, at=time.monotonic() - presign.MARKET_MAX_AGE - 1)
+    assert q.pick().level == 4.0
+
+
+def test_market_is_polled_in_background(monkeypatch):
+    q = _queue()
+    calls = []
+
+    def fees():
+        calls.append(time.monotonic())
+        q.market = Market(base_fee=100, tip=15, gas_price=None)
+
+    q._fees = fees
+    q.refresh = lambda: False
+    fired = []
+    q.fire = lambda level: fired.append(q.pick(level)) or ("0x", 0.0)
+    monkeypatch.setattr(presign, "MARKET_POLL", 0.05)
+    asyncio.run(q.fire_at(time.time() + 0.3, poll=0.1))
+    assert len(calls) >= 3
+    assert fired[0].level == 2.0
@@ -6,6 +6,8 @@ from eth_account import Account
 from web3 import Web3
 from web3.providers.rpc import HTTPProvider
 
+from src.zksync_fee import ZKSYNC_CHAIN_IDS, ZkFeeEstimator
+
 
 class TxError(RuntimeError):
     pass
@@ -23,9 +25,10 @@ class AsyncEvmClient:
         self.address = self.account.address
 
         self.w3: Web3 | None = None
+        self.zk_fees: ZkFeeEstimator | None = None
 
     async def __aenter__(self) -> "AsyncEvmClient":
-                for k in ["HTTP_PROXY", "HTTPS_PROXY", "http_proxy", "https_proxy", "ALL_PROXY", "all_proxy", "NO_PROXY", "no_proxy"]:
+        for k in ["HTTP_PROXY", "HTTPS_PROXY", "http_proxy", "https_proxy", "ALL_PROXY", "all_proxy", "NO_PROXY", "no_proxy"]:
             os.environ.pop(k, None)
 
         request_kwargs: dict[str, Any] = {"timeout": 30}
@@ -40,6 +43,8 @@ class AsyncEvmClient:
         if not self.w3.is_connected():
             raise RuntimeError(f"RPC not connected: {self.rpc_url}")
 
+        if self.chain_id in ZKSYNC_CHAIN_IDS:
+            self.zk_fees = ZkFeeEstimator(self.w3)
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
@@ -79,17 +84,25 @@ class AsyncEvmClient:
             "value": int(value),
         }
 
-
-        try:
-            tx["gasPrice"] = int(w3.eth.gas_price)
-        except Exception:
-            tx["gasPrice"] = 1_000_000_000  # 1 gwei
-
-        try:
-            gas_est = w3.eth.estimate_gas(tx)
-        except Exception as e:
-            raise TxError(f"estimate_gas failed: {e}") from e
-        tx["gas"] = int(gas_est * gas_multiplier)
+        if self.zk_fees is not None:
+            # zkSync: газ (с учетом pubdata) и цена одним запросом
+            try:
+                fee = self.zk_fees.estimate(tx)
+            except Exception as e:
+                raise TxError(f"zks_estimateFee failed: {e}") from e
+            tx["gasPrice"] = fee.max_fee_per_gas
+            tx["gas"] = int(fee.gas_limit * gas_multiplier)
+        else:
+            try:
+                tx["gasPrice"] = int(w3.eth.gas_price)
+            except Exception as e:
+                raise TxError(f"gas_price failed: {e}") from e
+
+            try:
+                gas_est = w3.eth.estimate_gas(tx)
+            except Exception as e:
+                raise TxError(f"estimate_gas failed: {e}") from e
+            tx["gas"] = int(gas_est * gas_multiplier)
 
         signed = Account.sign_transaction(tx, self.private_key)
 
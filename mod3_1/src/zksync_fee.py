@@ -0,0 +1,20 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+# Оценка комиссии zkSync общая с mod3_2 (mod3_2/src/zkfee.py). Оба проекта — свой пакет src,
+# поэтому модуль подгружается по пути, а не импортом пакета.
+_PATH = Path(__file__).resolve().parents[2] / "mod3_2" / "src" / "zkfee.py"
+_NAME = "mod3_2_zkfee"
+
+_zkfee = sys.modules.get(_NAME)
+if _zkfee is None:
+    _spec = importlib.util.spec_from_file_location(_NAME, _PATH)
+    _zkfee = importlib.util.module_from_spec(_spec)
+    # dataclasses ищут модуль класса в sys.modules
+    sys.modules[_NAME] = _zkfee
+    _spec.loader.exec_module(_zkfee)
+
+ZKSYNC_CHAIN_IDS = _zkfee.ZKSYNC_CHAIN_IDS
+ZkFee = _zkfee.ZkFee
+ZkFeeEstimator = _zkfee.ZkFeeEstimator
@@ -0,0 +1,136 @@
+# Scaling benchmark for the sharded multi-wallet executor.
+# Поднимает локальный mock JSON-RPC узел (tx сразу "в блоке"), генерирует
+# кошельки и прогоняет перевод самому себе с 1, 2, 4... процессами.
+#
+#   python bench_shard.py --wallets 400 --processes 1 2 4 --rate 0
+import argparse
+import json
+import multiprocessing as mp
+import os
+import socket
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from eth_account import Account
+from eth_utils import keccak
+
+from src.shard import run_sharded
+from src.wallets import summary
+
+CHAIN_ID = 324
+
+
+class MockNodeHandler(BaseHTTPRequestHandler):
+    receipts: dict[str, dict] = {}
+
+    def log_message(self, *a):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        reqs = body if isinstance(body, list) else [body]
+        out = [{"jsonrpc": "2.0", "id": r.get("id"), "result": self.handle_rpc(r["method"], r.get("params", []))}
+               for r in reqs]
+        data = json.dumps(out if isinstance(body, list) else out[0]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def handle_rpc(self, method, params):
+        if method == "eth_chainId":
+            return hex(CHAIN_ID)
+        if method == "web3_clientVersion":
+            return "bench-mock"
+        if method == "eth_gasPrice":
+            return hex(10**8)
+        if method == "eth_blockNumber":
+            return "0x64"
+        if method == "eth_estimateGas":
+            return hex(21000)
+        if method == "eth_getTransactionCount":
+            # у каждого кошелька одна tx
+            return "0x0"
+        if method == "eth_sendRawTransaction":
+            h = "0x" + keccak(bytes.fromhex(params[0][2:])).hex()
+            self.receipts[h] = {
+                "transactionHash": h, "status": "0x1", "blockNumber": "0x65", "blockHash": "0x" + "00" * 32,
+                "transactionIndex": "0x0", "from": "0x" + "00" * 20, "to": "0x" + "00" * 20,
+                "cumulativeGasUsed": "0x5208", "gasUsed": "0x5208", "logs": [], "logsBloom": "0x" + "00" * 256,
+                "contractAddress": None, "effectiveGasPrice": hex(10**8), "type": "0x0",
+            }
+            return h
+        if method == "eth_getTransactionReceipt":
+            return self.receipts.get(params[0].lower())
+        return None
+
+
+def serve_node(port: int) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockNodeHandler)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def start_node(port: int) -> mp.Process:
+    node = mp.Process(target=serve_node, args=(port,), daemon=True)
+    node.start()
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return node
+
+
+def make_bench_job(argv: list[str]):
+    from src.client import AsyncEvmClient
+    from src.shared import SharedRpc
+
+    rpc_url = argv[0]
+    shared = SharedRpc(rpc_url)
+    shared.connect()
+
+    async def job(key: str):
+        async with AsyncEvmClient(rpc_url, key, CHAIN_ID, shared=shared) as client:
+            txh = await client.sign_and_send(client.address, "0x", 0)
+            r = await client.wait_receipt(txh)
+            return txh, r.get("status")
+
+    return job, shared
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--wallets", type=int, default=400)
+    p.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--concurrency", type=int, default=32, help="wallets in flight per process")
+    p.add_argument("--rate", type=float, default=0, help="shared RPC budget, req/s (0 — unlimited)")
+    p.add_argument("--port", type=int, default=18545)
+    args = p.parse_args()
+
+    rpc_url = f"http://127.0.0.1:{args.port}"
+    node = start_node(args.port)
+    keys = [Account.create().key.hex() for _ in range(args.wallets)]
+    print(f"cpus={os.cpu_count()} wallets={args.wallets}")
+
+    base = None
+    try:
+        for n in args.processes:
+            t = time.perf_counter()
+            results, used = run_sharded("bench_shard:make_bench_job", [rpc_url], keys, n,
+                                        args.concurrency * n, {rpc_url: args.rate} if args.rate else {})
+            wall = time.perf_counter() - t
+            tput = len(results) / wall
+            base = base or tput
+            print(f"== processes={n}  rpc requests={sum(used.values())}  speedup x{tput / base:.2f}")
+            print(summary(results, wall))
+    finally:
+        node.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# Signing throughput benchmark: текущий путь (Account.sign_transaction в
+# event loop) против Signer: нативный бэкенд, пул потоков/процессов, batch.
+#
+#   python bench_signer.py --n 2000
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from eth_account import Account
+
+from src.signer import HAS_NATIVE, Signer, shared_pool
+
+
+def make_txs(n: int, sender: str) -> list[dict]:
+    return [
+        {
+            "chainId": 324,
+            "from": sender,
+            "to": Account.create().address,
+            "data": "0x" + os.urandom(68).hex(),
+            "value": 0,
+            "nonce": i,
+            "gasPrice": 25_000_000 + i,
+            "gas": 250_000,
+        }
+        for i in range(n)
+    ]
+
+
+def rate(n: int, dt: float) -> str:
+    return f"{n / dt:10.0f} sig/s  ({dt * 1000 / n:.3f} ms/sig)"
+
+
+async def run_async(signer: Signer, txs: list[dict], in_flight: int) -> None:
+    sem = asyncio.Semaphore(in_flight)
+
+    async def one(tx):
+        async with sem:
+            await signer.sign_tx_async(tx)
+
+    await asyncio.gather(*[one(tx) for tx in txs])
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--n", type=int, default=2000)
+    p.add_argument("--in-flight", type=int, default=64)
+    args = p.parse_args()
+
+    acct = Account.create()
+    key = acct.key.hex()
+    txs = make_txs(args.n, acct.address)
+    print(f"cpus={os.cpu_count()} native={HAS_NATIVE} n={args.n}")
+
+    t = time.perf_counter()
+    ref = []
+    for tx in txs:
+        ref.append(bytes(Account.sign_transaction({k: v for k, v in tx.items() if k != "from"}, key).raw_transaction))
+    base = time.perf_counter() - t
+    print(f"{'Account.sign_transaction':<28}{rate(args.n, base)}")
+
+    inline = Signer(key, pool="inline")
+    t = time.perf_counter()
+    out = [inline.sign_tx(tx).raw for tx in txs]
+    dt = time.perf_counter() - t
+    assert out == ref, "signer output differs from eth_account"
+    print(f"{'Signer inline':<28}{rate(args.n, dt)}  x{base / dt:.1f}")
+
+    for kind in ("thread", "process"):
+        s = Signer(key, pool=kind)
+        s.sign_batch(txs[: os.cpu_count() or 1])  # прогрев пула
+        t = time.perf_counter()
+        asyncio.run(run_async(s, txs, args.in_flight))
+        dt = time.perf_counter() - t
+        print(f"{'Signer async/' + kind:<28}{rate(args.n, dt)}  x{base / dt:.1f}")
+
+        t = time.perf_counter()
+        out = [x.raw for x in s.sign_batch(txs)]
+        dt = time.perf_counter() - t
+        assert out == ref
+        print(f"{'Signer batch/' + kind:<28}{rate(args.n, dt)}  x{base / dt:.1f}")
+        shared_pool(kind).shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
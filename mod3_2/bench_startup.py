@@ -0,0 +1,53 @@
+# Cold-start regression benchmark.
+# Для каждой команды запускает свежий интерпретатор (импорт клиента + ленивый
+# импорт адаптера, без RPC) и завершается с кодом 1, если медиана > бюджета.
+#
+#   python bench_startup.py --runs 5 --budget 2.0
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import config
+
+from src.registry import COMMANDS
+
+HERE = Path(__file__).resolve().parent
+
+PROBE = (
+    "import sys\n"
+    "import src.client\n"
+    "from src import registry\n"
+    "registry.load_module(registry.get_command(sys.argv[1]))\n"
+)
+
+
+def cold_start(cmd: str) -> float:
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", PROBE, cmd], cwd=HERE, check=True)
+    return time.perf_counter() - t0
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--budget", type=float, default=getattr(config, "STARTUP_BUDGET_S", 2.0))
+    p.add_argument("commands", nargs="*", default=list(COMMANDS))
+    args = p.parse_args()
+
+    failed = False
+    for cmd in args.commands:
+        times = [cold_start(cmd) for _ in range(args.runs)]
+        med = statistics.median(times)
+        ok = med <= args.budget
+        failed |= not ok
+        print(f"{cmd:<22} median={med * 1000:8.1f} ms  max={max(times) * 1000:8.1f} ms  {'OK' if ok else 'OVER BUDGET'}")
+
+    print(f"budget={args.budget:.3f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
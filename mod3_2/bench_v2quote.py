@@ -0,0 +1,92 @@
+# V2 quoting benchmark: цикл get_amount_out (koi_zksync) против пакетных
+# quote_grid / quote_paths (src/v2quote.py). Результаты сверяются бит в бит.
+# Если установлен numpy, для сравнения считается та же сетка на объектных
+# массивах (арифметика та же — Python int, быстрее она не становится).
+#
+#   python bench_v2quote.py --amounts 1000 --pools 50
+import argparse
+import random
+import sys
+import time
+
+from src.koi_zksync import get_amount_out
+from src.v2quote import Hop, quote_grid, quote_paths
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+def make_hops(n: int, rnd: random.Random) -> list[Hop]:
+    # резервы uint112, как в парах V2
+    return [Hop(rnd.randrange(10**6, 2**112), rnd.randrange(10**6, 2**112)) for _ in range(n)]
+
+
+def grid_numpy(amounts: list[int], hops: list[Hop]) -> list[list[int]]:
+    a = np.array([x * 997 for x in amounts], dtype=object)[None, :]
+    rin = np.array([[h.reserve_in * 1000] for h in hops], dtype=object)
+    rout = np.array([[h.reserve_out] for h in hops], dtype=object)
+    return (a * rout // (rin + a)).tolist()
+
+
+def rate(n: int, dt: float) -> str:
+    return f"{n / dt:12.0f} quotes/s  ({dt * 1e6 / n:.3f} us/quote)"
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--amounts", type=int, default=1000)
+    p.add_argument("--pools", type=int, default=50)
+    p.add_argument("--hops", type=int, default=2, help="hops per path for the multi-hop case")
+    p.add_argument("--seed", type=int, default=1)
+    args = p.parse_args()
+
+    rnd = random.Random(args.seed)
+    amounts = [rnd.randrange(1, 10**24) for _ in range(args.amounts)]
+    hops = make_hops(args.pools, rnd)
+    n = len(amounts) * len(hops)
+    print(f"amounts={len(amounts)} pools={len(hops)} numpy={np is not None}")
+
+    t = time.perf_counter()
+    ref = [[get_amount_out(a, h.reserve_in, h.reserve_out) for a in amounts] for h in hops]
+    base = time.perf_counter() - t
+    print(f"{'loop get_amount_out':<28}{rate(n, base)}")
+
+    t = time.perf_counter()
+    out = quote_grid(amounts, hops)
+    dt = time.perf_counter() - t
+    assert out == ref, "quote_grid differs from get_amount_out"
+    print(f"{'quote_grid':<28}{rate(n, dt)}  x{base / dt:.1f}")
+
+    if np is not None:
+        t = time.perf_counter()
+        out = grid_numpy(amounts, hops)
+        dt = time.perf_counter() - t
+        assert out == ref, "numpy object grid differs from get_amount_out"
+        print(f"{'numpy object arrays':<28}{rate(n, dt)}  x{base / dt:.1f}")
+
+    paths = [make_hops(args.hops, rnd) for _ in range(args.pools)]
+    n = len(amounts) * len(paths) * args.hops
+    t = time.perf_counter()
+    ref = []
+    for path in paths:
+        row = []
+        for a in amounts:
+            for h in path:
+                a = get_amount_out(a, h.reserve_in, h.reserve_out)
+            row.append(a)
+        ref.append(row)
+    base = time.perf_counter() - t
+    print(f"{'loop get_amount_out, ' + str(args.hops) + ' hops':<28}{rate(n, base)}")
+
+    t = time.perf_counter()
+    out = quote_paths(amounts, paths)
+    dt = time.perf_counter() - t
+    assert out == ref, "quote_paths differs from get_amount_out"
+    print(f"{'quote_paths':<28}{rate(n, dt)}  x{base / dt:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
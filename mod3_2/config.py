@@ -2,4 +2,56 @@ PRIVATE_KEY = ''
 PROXY = None
 POLYGON_RPC = "wss://polygon-bor-rpc.publicnode.com"
 ZKSYNC_RPC = "https://rpc.ankr.com/zksync_era"
-SLIPPAGE = 0.5
\ No newline at end of file
+SLIPPAGE = 0.5
+STARTUP_BUDGET_S = 3.0
+JOURNAL_PATH = "tx_journal.sqlite3"
+
+# замена зависших tx, с (None — выключено; например 30)
+STUCK_AFTER_S = None
+FEE_BUMP_PCT = 10
+FEE_BUMP_MAX_GWEI = 1.0
+FEE_BUMP_MAX = 5
+
+# мультикошельковый режим (--keys)
+WALLET_CONCURRENCY = 8
+WALLET_PROCESSES = 1
+# общий лимит запросов в секунду на RPC для всех процессов (None — без лимита)
+RPC_RATE_LIMIT = None
+# подпись tx: auto (coincurve -> потоки, иначе процессы) | thread | process | inline
+SIGNER_POOL = "auto"
+# дополнительные узлы для рассылки raw tx (вместе с ZKSYNC_RPC), [] — только основной
+BROADCAST_RPCS = []
+# лимитер на узел: rate — запросов/с (None — без лимита), окно одновременных запросов
+# подстраивается само (AIMD) в пределах min_limit..max_limit
+RPC_LIMITS = {"rate": 25, "start": 4, "max_limit": 32, "retries": 4, "breaker_failures": 5, "breaker_cooldown": 10}
+# кэш eth_call по блокам, МБ
+CALL_CACHE_MB = 32
+# проверенные адреса контрактов (hash кода) и как часто перепроверять, с
+VERIFIED_CONTRACTS_PATH = "contracts.verified.json"
+CONTRACT_RECHECK_S = 7 * 86400
+# zkSync: газ и комиссия одним zks_estimateFee (цены кэшируются по форме маршрута на ZK_FEE_TTL_S секунд);
+# ZKSYNC_EIP712 = True — отправлять tx типа 0x71 с gasPerPubdata из оценки
+ZKSYNC_FEE_PROFILE = True
+ZKSYNC_EIP712 = False
+ZK_FEE_TTL_S = 30
+
+# библиотека шаблонов (templates refresh): роутер -> селекторы swap-функций
+TEMPLATE_ROUTERS = {
+    # SyncSwap Router
+    "0x2da10A1e27bF85cEdD8FFb1AbBe97e53391C0295": ["0x0ae6a646", "0x2cc4081e"],
+}
+TEMPLATE_SCAN_BLOCKS = 5000
+
+# watch: опрос новых блоков, с; полная переподпись набора не реже чем раз в WATCH_REARM_S
+WATCH_POLL_S = 0.5
+WATCH_REARM_S = 30
+
+# spread: токены (символы из src/tokens.py), сумма пробы для котировок в единицах токена,
+# дополнительные пулы по DEX (Koi USDC.e/WETH и пулы SpaceFi/SyncSwap из фабрик находятся сами)
+SPREAD_TOKENS = ["WETH", "USDC_E", "USDT"]
+SPREAD_PROBES = {"USDC_E": "100", "USDT": "100", "WETH": "0.05"}
+SPREAD_POOLS = {}
+
+# twap: число частей и окно по умолчанию, с
+TWAP_SLICES = 5
+TWAP_WINDOW_S = 600
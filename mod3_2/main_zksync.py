@@ -1,128 +1,602 @@
+import time
+
+_T0 = time.perf_counter()
+
 import argparse
 import asyncio
-import config
+import sys
+from dataclasses import asdict
+from pathlib import Path
 
-from src.client import AsyncEvmClient
-from src.koi_zksync import KoiFinance
-from src.spacefi import SpaceFi
-from src.maverick import Maverick, MaverickTemplate
-from src.syncswap_zksync import SyncSwap, SyncSwapTemplate
+import config
 
-MAV_TEMPLATE_USDCE_TO_MAV = "0xdae9aaf83c341094fda352b6a678a7bdce552226dc3be6a9692747eace16f6ce"
-SYNC_TEMPLATE_USDCE_TO_ETH = "0xdf0c47e4bf5fd96a4a03f9777e5b91ced2bcfa43a8ad08141346d8041900782e"
+from src.startup import StartupProfile
+from src.registry import COMMANDS, build_adapter, call_adapter, get_command, verify_contracts
 
 
 def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser()
+    p.add_argument("--startup-profile", action="store_true", help="print import/init time breakdown")
+    p.add_argument("--startup-budget", type=float, default=None,
+                   help="fail (exit 3) if startup takes longer than this many seconds")
+    p.add_argument("--simulate", action="store_true",
+                   help="run the tx sequence via eth_call with state overrides, send nothing")
+    p.add_argument("--intent", type=str, default=None,
+                   help="idempotency key: a finished intent is skipped, an interrupted one is resumed")
+    p.add_argument("--keys", type=str, default=None,
+                   help="file with one private key per line: run the command for every wallet")
+    p.add_argument("--concurrency", type=int, default=getattr(config, "WALLET_CONCURRENCY", 8),
+                   help="max wallets in flight with --keys")
+    p.add_argument("--processes", type=int, default=getattr(config, "WALLET_PROCESSES", 1),
+                   help="with --keys: split wallets across this many worker processes")
     sub = p.add_subparsers(dest="cmd", required=True)
 
-    koi = sub.add_parser("koi_usdc_e_to_eth")
-    koi.add_argument("--amount", required=True, type=str)
-    koi.add_argument("--slippage", type=float, default=getattr(config, "SLIPPAGE", 1.0))
+    for name, cmd in COMMANDS.items():
+        s = sub.add_parser(name)
+        if cmd.all_flag:
+            s.add_argument("--amount", type=str, default=None)
+            s.add_argument("--all", action="store_true")
+        else:
+            s.add_argument("--amount", required=True, type=str)
+        s.add_argument("--slippage", type=float, default=getattr(config, "SLIPPAGE", 1.0))
 
-    koi2 = sub.add_parser("koi_eth_to_usdc_e")
-    koi2.add_argument("--amount", required=True, type=str)
-    koi2.add_argument("--slippage", type=float, default=getattr(config, "SLIPPAGE", 1.0))
+    rp = sub.add_parser("run-plan", help="execute a YAML/JSON plan of steps in one process")
+    rp.add_argument("plan")
+    rp.add_argument("--concurrency", dest="plan_concurrency", type=int, default=None)
 
-    s1 = sub.add_parser("eth_to_usdt")
-    s1.add_argument("--amount", required=True, type=str)
-    s1.add_argument("--slippage", type=float, default=getattr(config, "SLIPPAGE", 1.0))
+    sr = sub.add_parser("simulate-routes", help="simulate several commands concurrently and pick the best")
+    sr.add_argument("routes", nargs="+", choices=list(COMMANDS))
+    sr.add_argument("--amount", type=str, default=None)
+    sr.add_argument("--all", action="store_true")
+    sr.add_argument("--slippage", type=float, default=getattr(config, "SLIPPAGE", 1.0))
+    sr.add_argument("--out", type=str, default="ETH", help="output asset to compare: ETH (incl. WETH) or token address")
 
-    s2 = sub.add_parser("usdc_e_to_eth")
-    s2.add_argument("--amount", type=str, default=None)
-    s2.add_argument("--all", action="store_true")
-    s2.add_argument("--slippage", type=float, default=getattr(config, "SLIPPAGE", 1.0))
+    tp = sub.add_parser("templates", help="index router txs into the swap template library")
+    tp.add_argument("action", choices=("refresh", "list"))
+    tp.add_argument("--blocks", type=int, default=getattr(config, "TEMPLATE_SCAN_BLOCKS", 5000),
+                    help="scan at most this many latest blocks")
+    tp.add_argument("--library", type=str, default=None, help="library file (default: templates.library.json)")
 
-    m1 = sub.add_parser("mav_usdc_e_to_eth")
-    m1.add_argument("--amount", type=str, default=None)
-    m1.add_argument("--all", action="store_true")
-    m1.add_argument("--slippage", type=float, default=getattr(config, "SLIPPAGE", 1.0))
+    wp = sub.add_parser("watch", help="fire a pre-signed command when a pool price crosses a threshold")
+    wp.add_argument("command", choices=list(COMMANDS))
+    wp.add_argument("--amount", type=str, default=None)
+    wp.add_argument("--all", action="store_true")
+    wp.add_argument("--slippage", type=float, default=getattr(config, "SLIPPAGE", 1.0))
+    wp.add_argument("--pool", required=True, help="V2 pair or SyncSwap pool whose Sync events drive the price")
+    side = wp.add_mutually_exclusive_group(required=True)
+    side.add_argument("--above", type=float, default=None)
+    side.add_argument("--below", type=float, default=None)
+    wp.add_argument("--invert", action="store_true", help="price as token0 per token1 instead of token1 per token0")
+    wp.add_argument("--rearm-pct", type=float, default=None,
+                    help="re-sign when the price drifts this many %% from the signed one (default: slippage / 2)")
+    wp.add_argument("--poll", type=float, default=getattr(config, "WATCH_POLL_S", 0.5))
+    wp.add_argument("--record", type=str, default=None, help="write observed blocks and Sync logs to this file")
+    wp.add_argument("--replay", type=str, default=None, help="drive the watch from a --record file instead of the RPC")
 
-    m2 = sub.add_parser("mav_usdc_e_to_mav")
-    m2.add_argument("--amount", type=str, default=None)
-    m2.add_argument("--all", action="store_true")
-    m2.add_argument("--slippage", type=float, default=getattr(config, "SLIPPAGE", 1.0))
+    spp = sub.add_parser("spread", help="stream cross-DEX quotes and spreads from event-mirrored pools as JSON lines")
+    spp.add_argument("--tokens", type=str, default=",".join(getattr(config, "SPREAD_TOKENS", ["WETH", "USDC_E", "USDT"])),
+                     help="comma-separated symbols from src/tokens.py")
+    spp.add_argument("--min-bps", type=float, default=0.0, help="emit updates with at least this spread")
+    spp.add_argument("--blocks", type=int, default=None, help="stop after this many blocks")
+    spp.add_argument("--poll", type=float, default=getattr(config, "WATCH_POLL_S", 0.5))
+    spp.add_argument("--record", type=str, default=None, help="write observed blocks and Sync logs to this file")
+    spp.add_argument("--replay", type=str, default=None, help="drive the monitor from a --record file instead of the RPC")
 
-    ss = sub.add_parser("sync_usdc_e_to_eth")
-    ss.add_argument("--amount", type=str, default=None)
-    ss.add_argument("--all", action="store_true")
-    ss.add_argument("--slippage", type=float, default=getattr(config, "SLIPPAGE", 1.0))
+    tw = sub.add_parser("twap", help="split a swap into slices over a time or block window")
+    tw.add_argument("command", choices=list(COMMANDS))
+    tw.add_argument("--amount", type=str, default=None)
+    tw.add_argument("--all", action="store_true")
+    tw.add_argument("--slippage", type=float, default=getattr(config, "SLIPPAGE", 1.0))
+    tw.add_argument("--slices", type=int, default=getattr(config, "TWAP_SLICES", 5))
+    window = tw.add_mutually_exclusive_group()
+    window.add_argument("--over", type=float, default=None, help="spread the slices over this many seconds")
+    window.add_argument("--blocks", type=int, default=None, help="spread the slices over this many blocks")
+    tw.add_argument("--order", type=str, default=None,
+                    help="order name; by default derived from the command, amount and window")
+    tw.add_argument("--cancel", action="store_true", help="cancel the order: slices not yet sent are skipped")
+    tw.add_argument("--status", action="store_true", help="print the order report and exit")
 
     return p
 
 
-async def run() -> None:
-    args = build_parser().parse_args()
+def make_journal():
+    from src.journal import TxJournal
 
-    async with AsyncEvmClient(
-        rpc_url=getattr(config, "ZKSYNC_RPC", "https://mainnet.era.zksync.io"),
-        private_key=config.PRIVATE_KEY,
-        chain_id=324,
-        proxy=getattr(config, "PROXY", None),
-    ) as client:
-
-        if args.cmd == "eth_to_usdt":
-            m = SpaceFi(client)
-            txh = await m.eth_to_usdt(args.amount, args.slippage)
-            r = await client.wait_receipt(txh)
-            print("tx:", txh)
-            print("status:", r.get("status"))
-            return
+    journal_path = getattr(config, "JOURNAL_PATH", None)
+    return TxJournal(journal_path) if journal_path else None
 
-        if args.cmd == "usdc_e_to_eth":
-            m = SpaceFi(client)
-            txh = await m.usdc_e_to_eth(args.amount, args.slippage, is_all_balance=args.all)
-            r = await client.wait_receipt(txh)
-            print("tx:", txh)
-            print("status:", r.get("status"))
-            return
 
-        if args.cmd == "mav_usdc_e_to_eth":
-            m = Maverick(client)
-            txh = await m.usdc_e_to_eth(args.amount, args.slippage, is_all_balance=args.all)
-            r = await client.wait_receipt(txh)
-            print("tx:", txh)
-            print("status:", r.get("status"))
-            return
+def make_shared():
+    from src.shared import SharedRpc
+    from src.verified import ContractRegistry
 
-        if args.cmd == "koi_usdc_e_to_eth":
-            m = KoiFinance(client)
-            txh = await m.swap_usdc_e_to_eth(args.amount, args.slippage)
-            r = await client.wait_receipt(txh)
-            print("tx:", txh)
-            print("status:", r.get("status"))
-            return
+    return SharedRpc(
+        getattr(config, "ZKSYNC_RPC", "https://mainnet.era.zksync.io"),
+        getattr(config, "PROXY", None),
+        broadcast=getattr(config, "BROADCAST_RPCS", None),
+        limits=getattr(config, "RPC_LIMITS", None),
+        cache_mb=getattr(config, "CALL_CACHE_MB", 32),
+        verified=ContractRegistry(
+            getattr(config, "VERIFIED_CONTRACTS_PATH", "contracts.verified.json"),
+            getattr(config, "CONTRACT_RECHECK_S", 7 * 86400),
+        ),
+        zk_fee_ttl=getattr(config, "ZK_FEE_TTL_S", 30),
+    )
 
-        if args.cmd == "koi_eth_to_usdc_e":
-            m = KoiFinance(client)
-            txh = await m.swap_eth_to_usdc_e(args.amount, args.slippage)
-            r = await client.wait_receipt(txh)
-            print("tx:", txh)
-            print("status:", r.get("status"))
-            return
 
-        if args.cmd == "mav_usdc_e_to_mav":
-            m = Maverick(
-                client,
-                template=MaverickTemplate(
-                    tx_hash=MAV_TEMPLATE_USDCE_TO_MAV,
-                    template_amount_in=1,
-                ),
-            )
-            txh = await m.usdc_e_swap_from_template(args.amount, args.slippage, is_all_balance=args.all)
-            r = await client.wait_receipt(txh)
-            print("tx:", txh)
+def make_client(private_key: str | None = None, shared=None, journal=None, signer_pool: str = "thread",
+                profile: StartupProfile | None = None):
+    profile = profile or StartupProfile()
+    with profile.phase("import src.client"):
+        from src.client import AsyncEvmClient
+        from src.replacer import BumpPolicy
+        from src.signer import Signer
+        from src.zkfee import ZkProfile
+
+    with profile.phase("client init"):
+        max_gwei = getattr(config, "FEE_BUMP_MAX_GWEI", None)
+        policy = BumpPolicy(
+            stuck_after=getattr(config, "STUCK_AFTER_S", 30),
+            bump_pct=getattr(config, "FEE_BUMP_PCT", 10),
+            max_gas_price=int(max_gwei * 10**9) if max_gwei else None,
+            max_bumps=getattr(config, "FEE_BUMP_MAX", 5),
+        )
+        return AsyncEvmClient(
+            rpc_url=getattr(config, "ZKSYNC_RPC", "https://mainnet.era.zksync.io"),
+            private_key=private_key or config.PRIVATE_KEY,
+            chain_id=324,
+            proxy=getattr(config, "PROXY", None),
+            journal=journal if journal is not None else make_journal(),
+            bump_policy=policy if getattr(config, "STUCK_AFTER_S", None) else None,
+            shared=shared or make_shared(),
+            signer=Signer(private_key or config.PRIVATE_KEY, pool=signer_pool),
+            zk_profile=ZkProfile(eip712=getattr(config, "ZKSYNC_EIP712", False))
+            if getattr(config, "ZKSYNC_FEE_PROFILE", True) else None,
+        )
+
+
+async def execute(client, args, intent_id: str | None = None, max_age: float | None = None,
+                  adapter=None) -> tuple[str, dict]:
+    from src.journal import intent_scope
+
+    cmd = get_command(args.cmd)
+    journal = client.journal if intent_id else None
+    if journal is not None:
+        done = journal.intent_done(intent_id, max_age)
+        if done is not None:
+            print(f"[journal] intent {intent_id} already done: {done} (use another --intent to repeat)")
+            return done, {"status": 1, "skipped": True}
+
+    m = adapter or build_adapter(client, cmd)
+    if journal is None:
+        txh = await call_adapter(m, cmd, args.amount, args.slippage, getattr(args, "all", False))
+        return txh, await client.wait_receipt(txh)
+
+    with intent_scope(intent_id):
+        txh = await call_adapter(m, cmd, args.amount, args.slippage, getattr(args, "all", False))
+        r = await client.wait_receipt(txh)
+    journal.mark_intent(intent_id, "done" if r.get("status") == 1 else "failed", txh)
+    return txh, r
+
+
+async def run_plan(args) -> None:
+    from src.plan import LOCAL_PROJECT, PlanRunner, load_plan
+
+    plan = load_plan(args.plan)
+    if args.plan_concurrency:
+        plan.concurrency = args.plan_concurrency
+    parser = build_parser()
+    # аргументы локальных шагов проверяем до отправки первой транзакции
+    for step in plan.steps:
+        if step.project == LOCAL_PROJECT:
+            parser.parse_args(step.argv())
+
+    from src.journal import make_intent_id
+
+    plan_key = str(Path(args.plan).resolve())
+
+    async with make_client() as client:
+
+        async def execute_local(step):
+            step_args = parser.parse_args(step.argv())
+            if step_args.cmd == "run-plan":
+                raise ValueError("run-plan cannot be nested")
+            # шаги — задачи текущего loop (client привязан к нему), intent у каждой задачи свой,
+            # nonce раздает общий client.nonces
+            intent_id = make_intent_id("plan", plan_key, step.id)
+            txh, r = await execute(client, step_args, intent_id)
+            return {"tx": txh, "receipt_status": r.get("status")}
+
+        ok = await PlanRunner(plan, execute_local).run()
+    if not ok:
+        sys.exit(1)
+
+
+async def simulate_routes(args) -> None:
+    from src.simulate import Simulation
+    from src.tokens import WETH
+
+    async def simulate_one(client, route: str):
+        sim = Simulation(owner=client.address)
+        with sim.activate():
+            try:
+                await execute(client, parse_route(route))
+                return route, sim, None
+            except Exception as e:
+                return route, sim, e
+
+    def parse_route(route: str):
+        argv = [route, "--slippage", str(args.slippage)]
+        if args.amount is not None:
+            argv += ["--amount", args.amount]
+        if args.all and get_command(route).all_flag:
+            argv.append("--all")
+        return build_parser().parse_args(argv)
+
+    def score(sim) -> int:
+        if args.out.upper() == "ETH":
+            return sim.native_out(WETH)
+        from web3 import Web3
+        return sim.deltas.get(Web3.to_checksum_address(args.out), 0)
+
+    async with make_client() as client:
+        # каждый маршрут — своя задача текущего loop со своей симуляцией (contextvar копируется в задачу)
+        results = await asyncio.gather(*[simulate_one(client, r) for r in args.routes])
+
+    best = None
+    for route, sim, err in results:
+        print(f"== {route}: {'FAILED ' + str(err) if err else 'ok'}")
+        print(sim.report())
+        if err is not None:
+            continue
+        if score(sim) <= 0:
+            # выход маршрута не смоделирован (вызов, эффекты которого simulate.py не разбирает)
+            print(f"  excluded from scoring: no {args.out} output in the simulation")
+            continue
+        if best is None or score(sim) > score(best[1]):
+            best = (route, sim)
+
+    if best is None:
+        print("no route succeeded")
+        sys.exit(1)
+    print(f"best route: {best[0]} ({args.out} out={score(best[1])})")
+
+
+async def templates(args) -> None:
+    from src.template_index import DEFAULT_LIBRARY_PATH, TemplateIndexer, TemplateLibrary
+
+    library = TemplateLibrary(args.library or DEFAULT_LIBRARY_PATH)
+    if args.action == "refresh":
+        indexer = TemplateIndexer(make_shared().w3, library, 324, getattr(config, "TEMPLATE_ROUTERS", {}))
+        t = time.perf_counter()
+        blocks, txs = await asyncio.to_thread(indexer.refresh, args.blocks)
+        print(f"templates: scanned {blocks} blocks, {txs} router txs in {time.perf_counter() - t:.1f}s")
+    print(library.report(324))
+
+
+async def watch(args) -> None:
+    from src.watch import Condition, LogSource, PriceWatch, ReplaySource, load_pools
+
+    cmd = get_command(args.command)
+    if args.amount is None and not (args.all and cmd.all_flag):
+        raise SystemExit(f"watch {args.command}: --amount is required")
+
+    async with make_client() as client:
+        verify_contracts(client.shared, client.chain_id, cmd)
+        m = build_adapter(client, cmd)
+        head, pools = await asyncio.to_thread(load_pools, client.w3, [args.pool])
+        if args.replay:
+            source = ReplaySource(args.replay)
+            head, reserves = source.initial()
+            for addr, (r0, r1) in reserves.items():
+                if addr in pools:
+                    pools[addr].reserve0, pools[addr].reserve1 = r0, r1
+        else:
+            source = LogSource(client.w3, list(pools), head, args.poll, args.record)
+            source.write({"block": head, "reserves": {a: [p.reserve0, p.reserve1] for a, p in pools.items()}})
+
+        cond = Condition(next(iter(pools)), "above" if args.above is not None else "below",
+                         args.above if args.above is not None else args.below, args.invert)
+        w = PriceWatch(
+            client, pools, cond,
+            lambda: call_adapter(m, cmd, args.amount, args.slippage, args.all and cmd.all_flag),
+            rearm_pct=args.rearm_pct if args.rearm_pct is not None else args.slippage / 2,
+            max_age=getattr(config, "WATCH_REARM_S", 30),
+            dry=args.simulate,
+        )
+        print(f"[watch] {cond}: {w.price():.8g} at block {head}")
+        result = await w.watch(source)
+        flags = (" re-armed" if result["rearmed"] else "") + (" fallback" if result["fallback"] else "")
+        flags += " partial" if result["error"] else ""
+        print(f"[watch] block {result['block']}: price {result['price']:.8g} -> {len(result['hashes'])} tx, "
+              f"trigger-to-broadcast {result['latency_ms']:.1f} ms{flags} (armed {w.rearms}x)")
+        if args.simulate:
+            print(result["sim"].report())
+            return
+        for h in result["hashes"]:
+            print("tx:", h)
+        if result["hashes"]:
+            r = await client.wait_receipt(result["hashes"][-1])
             print("status:", r.get("status"))
+        else:
+            print("[watch] nothing was sent")
+        if result["error"]:
+            print(f"[watch] not sent: {result['error']}")
+            sys.exit(1)
+
+
+async def spread(args) -> None:
+    from web3 import Web3
+
+    from src.spread import TOKENS_BY_SYMBOL, SpreadMonitor, discover, venues_of
+    from src.watch import LogSource, ReplaySource
+
+    try:
+        tokens = [TOKENS_BY_SYMBOL[s.strip().upper()] for s in args.tokens.split(",") if s.strip()]
+    except KeyError as e:
+        raise SystemExit(f"unknown token {e.args[0]} (known: {', '.join(TOKENS_BY_SYMBOL)})") from None
+
+    probes = {TOKENS_BY_SYMBOL[s]: a for s, a in getattr(config, "SPREAD_PROBES", {}).items()}
+    shared = None
+    if args.replay:
+        # пулы, токены, info и комиссии SyncSwap — из заголовка записи, узел не нужен
+        source = ReplaySource(args.replay)
+        header = source.header()
+        if "pools" not in header:
+            raise SystemExit(f"{args.replay}: no pool metadata in the first line (record it with spread --record)")
+        monitor = SpreadMonitor(Web3(), venues_of(header), probes)
+        head = monitor.load(header)
+    else:
+        shared = make_shared()
+        shared.connect()
+        w3 = shared.w3
+        venues = await asyncio.to_thread(discover, w3, tokens, getattr(config, "SPREAD_POOLS", None))
+        monitor = SpreadMonitor(w3, venues, probes)
+        head = await asyncio.to_thread(monitor.load)
+        source = LogSource(w3, list(monitor.pools), head, args.poll, args.record)
+        if args.record:
+            source.write(await asyncio.to_thread(monitor.header, head))
+    print(monitor.report(), file=sys.stderr)
+
+    t = time.perf_counter()
+    blocks = await monitor.run(source, head, min_bps=args.min_bps, max_blocks=args.blocks)
+    print(f"spread: {blocks} blocks in {time.perf_counter() - t:.1f}s", file=sys.stderr)
+    if shared is not None:
+        print(shared.calls.report(), file=sys.stderr)
+
+
+async def twap(args) -> None:
+    from web3 import Web3
+
+    from src import tokens
+    from src.journal import intent_scope, make_intent_id
+    from src.registry import load_module
+    from src.simulate import Simulation
+    from src.twap import TwapOrder, TwapScheduler
+    from src.utils import from_wei, to_wei
+
+    cmd = get_command(args.command)
+    if args.slices < 1:
+        raise SystemExit("--slices must be >= 1")
+    if args.all and not cmd.all_flag:
+        raise SystemExit(f"twap {cmd.name}: --all is not supported for this command")
+    if args.amount is None and not args.all:
+        raise SystemExit(f"twap {cmd.name}: --amount or --all is required")
+    journal = make_journal()
+    if journal is None:
+        raise SystemExit("twap needs JOURNAL_PATH: slices are resumed from the tx journal")
+
+    async with make_client(journal=journal) as client:
+        w3 = client.w3
+        asset_in = None if cmd.token_in == "ETH" else Web3.to_checksum_address(getattr(tokens, cmd.token_in))
+        asset_out = None if cmd.token_out == "ETH" else Web3.to_checksum_address(getattr(tokens, cmd.token_out))
+        over = args.over if args.over is not None else (0.0 if args.blocks else getattr(config, "TWAP_WINDOW_S", 600))
+        order_id = make_intent_id("twap", client.chain_id, client.address, args.order or "",
+                                  *(() if args.order else (cmd.name, args.amount or "all", args.slices, over, args.blocks or 0)))
+
+        params = journal.load_order(order_id)
+        if args.cancel or args.status:
+            if params is None:
+                raise SystemExit(f"no twap order {order_id}")
+            s = TwapScheduler(journal, TwapOrder(**params), None, None)
+            if args.cancel:
+                s.cancel()
+                print(f"twap {order_id}: cancelled")
+            print(s.report(s.results()))
             return
 
-        if args.cmd == "sync_usdc_e_to_eth":
-            m = SyncSwap(client, template=SyncSwapTemplate(tx_hash=SYNC_TEMPLATE_USDCE_TO_ETH))
-            txh = await m.swap_usdc_e_to_eth(args.amount, args.slippage, is_all_balance=args.all)
-            r = await client.wait_receipt(txh)
-            print("tx:", txh)
-            print("status:", r.get("status"))
+        verify_contracts(client.shared, client.chain_id, cmd)
+        m = build_adapter(client, cmd)
+
+        def decimals(asset) -> int:
+            return 18 if asset is None else tokens.decimals(w3, asset)
+
+        def balance(asset) -> int:
+            return int(w3.eth.get_balance(client.address)) if asset is None else tokens.balance_of(w3, asset, client.address)
+
+        dec_in, dec_out = await asyncio.gather(asyncio.to_thread(decimals, asset_in), asyncio.to_thread(decimals, asset_out))
+
+        def amount_str(wei: int) -> str:
+            return format(from_wei(wei, dec_in), "f")
+
+        async def simulate_out(wei: int) -> int:
+            # котировка части: команда целиком через симуляцию на текущем состоянии пулов,
+            # выход — amountOut из результата вызова свапа (src/simulate.py)
+            sim = Simulation(owner=client.address)
+            with sim.activate():
+                await call_adapter(m, cmd, amount_str(wei), args.slippage, False)
+            out = sim.native_out(tokens.WETH) if asset_out is None else sim.deltas.get(asset_out, 0)
+            if out <= 0:
+                raise RuntimeError(f"twap {cmd.name}: simulation gives no {cmd.token_out} output\n{sim.report()}")
+            return out
+
+        async def ensure_allowance(total: int):
+            # один approve на весь ордер, пока считается базовая котировка: части идут без approve
+            if cmd.spender is None or asset_in is None:
+                return None
+            spender = getattr(load_module(cmd), cmd.spender)
+            if tokens.allowance(w3, asset_in, client.address, spender) >= total:
+                return None
+            with intent_scope(make_intent_id("twap", order_id, "approve")):
+                return await client.sign_and_send(to=asset_in, data=tokens.encode_approve(w3, asset_in, spender, 2**256 - 1))
+
+        if params is None:
+            total = balance(asset_in) if args.all else to_wei(args.amount, dec_in)
+            if total <= 0:
+                raise SystemExit("amount is zero")
+            approve_tx, baseline = await asyncio.gather(ensure_allowance(total), simulate_out(total))
+            order = TwapOrder(order_id, cmd.name, total, args.slices, over, args.blocks or 0, args.slippage,
+                              cmd.token_in, cmd.token_out, dec_in, dec_out, baseline)
+            journal.save_order(order_id, asdict(order))
+            print(f"twap {order_id}: {amount_str(total)} {cmd.token_in} in {args.slices} slices, "
+                  f"single-shot quote {baseline}")
+        else:
+            order = TwapOrder(**params)
+            approve_tx = await ensure_allowance(order.total)
+        if approve_tx:
+            await client.wait_receipt(approve_tx)
+
+        async def send(wei: int, intent_id: str):
+            slice_args = argparse.Namespace(cmd=cmd.name, amount=amount_str(wei), slippage=order.slippage, all=False)
+            return await execute(client, slice_args, intent_id, adapter=m)
+
+        s = TwapScheduler(
+            journal, order, send, lambda: balance(asset_out), quote=simulate_out,
+            block_number=lambda: int(w3.eth.block_number),
+        )
+        results = await s.run()
+        print(s.report(results))
+        if any(r.status == "failed" for r in results):
+            sys.exit(1)
+
+
+def make_wallet_job(argv: list[str]):
+    # job(key) для одного кошелька; в режиме --processes вызывается в каждом воркере
+    from src.journal import make_intent_id
+    from src.simulate import Simulation
+
+    args = build_parser().parse_args(argv)
+    cmd = get_command(args.cmd)
+    # один провайдер, оракул газа, кэш контрактов и журнал на все кошельки процесса
+    shared = make_shared()
+    shared.connect()
+    verify_contracts(shared, 324, cmd)
+    journal = make_journal()
+
+    async def job(key: str):
+        async with make_client(key, shared, journal, getattr(config, "SIGNER_POOL", "auto")) as client:
+            if args.simulate:
+                sim = Simulation(owner=client.address)
+                with sim.activate():
+                    m = build_adapter(client, cmd)
+                    txh = await call_adapter(m, cmd, args.amount, args.slippage, getattr(args, "all", False))
+                return txh, 1
+            # один --intent на весь запуск, но у каждого кошелька свой ключ; без него — без intent
+            intent_id = make_intent_id(args.intent, client.address) if args.intent else None
+            txh, r = await execute(client, args, intent_id)
+            return txh, r.get("status")
+
+    return job, shared
+
+
+async def run_wallets_mode(args, argv: list[str]) -> None:
+    from src.wallets import load_keys, run_wallets, summary
+
+    if args.cmd in ("run-plan", "simulate-routes", "templates", "watch", "spread", "twap"):
+        raise SystemExit(f"--keys is not supported for {args.cmd}")
+    keys = load_keys(args.keys)
+
+    t = time.perf_counter()
+    if args.processes > 1:
+        from src.shard import run_sharded
+
+        rate = getattr(config, "RPC_RATE_LIMIT", None)
+        rpc = getattr(config, "ZKSYNC_RPC", "https://mainnet.era.zksync.io")
+        results, used = await asyncio.to_thread(
+            run_sharded, "main_zksync:make_wallet_job", argv, keys, args.processes, args.concurrency,
+            {rpc: rate} if rate else {},
+        )
+        for endpoint, n in used.items():
+            print(f"rpc {endpoint}: {n} requests")
+    else:
+        job, shared = make_wallet_job(argv)
+        results = await run_wallets(keys, job, args.concurrency)
+        if shared.broadcaster is not None:
+            print(shared.broadcaster.report())
+        from src.limiter import all_limiters
+
+        for lim in all_limiters():
+            print("limiter", lim.report())
+        print(shared.coalescer.report())
+        print(shared.calls.report())
+        print(shared.zk_fees.report())
+    print(summary(results, time.perf_counter() - t))
+    if not all(r.ok for r in results):
+        sys.exit(1)
+
+
+async def run() -> None:
+    profile = StartupProfile(_T0)
+    args = build_parser().parse_args()
+    if args.keys:
+        await run_wallets_mode(args, sys.argv[1:])
+        return
+    if args.cmd == "run-plan":
+        await run_plan(args)
+        return
+    if args.cmd == "simulate-routes":
+        await simulate_routes(args)
+        return
+    if args.cmd == "templates":
+        await templates(args)
+        return
+    if args.cmd == "watch":
+        await watch(args)
+        return
+    if args.cmd == "spread":
+        await spread(args)
+        return
+    if args.cmd == "twap":
+        await twap(args)
+        return
+    cmd = get_command(args.cmd)
+
+    client = make_client(profile=profile)
+
+    with profile.phase("rpc connect"):
+        await client.__aenter__()
+
+    try:
+        m = build_adapter(client, cmd, profile)
+        verify_contracts(client.shared, client.chain_id, cmd, profile)
+
+        if args.startup_profile:
+            print(profile.report())
+        budget = args.startup_budget
+        if budget is not None and profile.total() > budget:
+            print(f"startup {profile.total():.3f}s exceeds budget {budget:.3f}s", file=sys.stderr)
+            sys.exit(3)
+
+        if args.simulate:
+            from src.simulate import Simulation
+
+            sim = Simulation(owner=client.address)
+            try:
+                with sim.activate():
+                    await call_adapter(m, cmd, args.amount, args.slippage, getattr(args, "all", False))
+            finally:
+                print(sim.report())
             return
 
+        # без --intent каждый запуск — новая сделка (повтор той же команды — осознанный)
+        txh, r = await execute(client, args, args.intent, adapter=m)
+        print("tx:", txh)
+        print("status:", r.get("status"))
+        if client.shared.broadcaster is not None:
+            print(client.shared.broadcaster.report())
+    finally:
+        await client.__aexit__(None, None, None)
+
 
 if __name__ == "__main__":
-    asyncio.run(run())
\ No newline at end of file
+    asyncio.run(run())
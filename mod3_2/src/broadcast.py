@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import requests
+
+from .limiter import CircuitOpenError, limiter_for
+
+# ответы узлов, означающие "эта tx у меня уже есть" — не ошибка
+KNOWN_ERRORS = ("already known", "known transaction", "already imported", "alreadyknown", "tx already in mempool")
+
+
+class BroadcastError(RuntimeError):
+    pass
+
+
+@dataclass
+class EndpointStats:
+    sent: int = 0
+    accepted: int = 0
+    known: int = 0
+    errors: int = 0
+    first: int = 0
+    latencies: list[float] = field(default_factory=list)
+    last_error: Optional[str] = None
+
+
+def is_known(msg: str) -> bool:
+    m = msg.lower()
+    return any(k in m for k in KNOWN_ERRORS)
+
+
+class Broadcaster:
+    # Отправляет один и тот же raw tx во все endpoints параллельно.
+    # Hash возвращается по первому успешному ответу, остальные досчитываются в фоне.
+    # Hash берется из ответа узла (для zkSync 0x71 он не равен keccak(raw)),
+    # при ответе "already known" — переданный tx_hash подписанта.
+
+    def __init__(self, endpoints: list[str], proxy: str | None = None, timeout: float = 10.0,
+                 limits: dict | None = None):
+        self.endpoints = list(dict.fromkeys(endpoints))
+        self.limiters = {e: limiter_for(e, **(limits or {})) for e in self.endpoints}
+        self.timeout = timeout
+        self.proxies = {"http": proxy, "https": proxy} if proxy else None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {e: EndpointStats() for e in self.endpoints}
+        self._pool = ThreadPoolExecutor(max_workers=max(4, len(self.endpoints) * 4), thread_name_prefix="bcast")
+
+    def _session(self) -> requests.Session:
+        s = getattr(self._local, "session", None)
+        if s is None:
+            s = self._local.session = requests.Session()
+        return s
+
+    def _post(self, endpoint: str, raw_hex: str) -> tuple[str, Optional[str], float]:
+        # -> (outcome, tx_hash | error, latency); outcome: ok | known | error
+        body = {"jsonrpc": "2.0", "id": next(self._ids), "method": "eth_sendRawTransaction", "params": [raw_hex]}
+        t = time.perf_counter()
+        try:
+            # общий с чтениями лимитер узла: открытый breaker — узел пропускаем
+            with self.limiters[endpoint].slot() as s:
+                r = self._session().post(endpoint, json=body, timeout=self.timeout, proxies=self.proxies)
+                s.throttled = r.status_code == 429
+                data = r.json()
+        except CircuitOpenError as e:
+            return "error", str(e), 0.0
+        except Exception as e:
+            return "error", f"{type(e).__name__}: {e}", time.perf_counter() - t
+        dt = time.perf_counter() - t
+        if "error" in data:
+            err = data["error"]
+            msg = err.get("message", str(err)) if isinstance(err, dict) else str(err)
+            return ("known" if is_known(msg) else "error"), msg, dt
+        return "ok", data.get("result"), dt
+
+    def send(self, raw: bytes, tx_hash: Optional[str] = None) -> str:
+        raw_hex = "0x" + bytes(raw).hex()
+        done = threading.Event()
+        state: dict[str, Any] = {"left": len(self.endpoints), "errors": [], "won": None, "hash": None}
+
+        def on_done(endpoint: str, outcome: str, detail: Optional[str], dt: float) -> None:
+            with self._lock:
+                st = self.stats[endpoint]
+                st.sent += 1
+                if outcome == "error":
+                    st.errors += 1
+                    st.last_error = detail
+                    state["errors"].append(f"{endpoint}: {detail}")
+                else:
+                    st.latencies.append(dt)
+                    if outcome == "ok":
+                        st.accepted += 1
+                    else:
+                        st.known += 1
+                    if state["won"] is None:
+                        state["won"] = endpoint
+                        st.first += 1
+                    if outcome == "ok" and state["hash"] is None and detail:
+                        state["hash"] = detail
+                state["left"] -= 1
+                if state["won"] is not None or state["left"] == 0:
+                    done.set()
+
+        for e in self.endpoints:
+            fut = self._pool.submit(self._post, e, raw_hex)
+            fut.add_done_callback(lambda f, e=e: on_done(e, *f.result()))
+
+        # узел, повисший дольше своего timeout (например, в очереди лимитера), не держит отправку
+        if not done.wait(self.timeout * 2):
+            with self._lock:
+                if state["won"] is None:
+                    raise BroadcastError(f"no endpoint answered in {self.timeout * 2:.0f}s; " + "; ".join(state["errors"]))
+        with self._lock:
+            if state["won"] is None:
+                # все узлы отказали: ошибку отдаем как есть (nonce too low и т.п.)
+                raise BroadcastError("; ".join(state["errors"]))
+            result = state["hash"] or tx_hash
+        if result is None:
+            raise BroadcastError(f"{state['won']}: tx already known, hash unknown (pass tx_hash)")
+        return result
+
+    def report(self) -> str:
+        lines = ["broadcast:"]
+        with self._lock:
+            for e, st in self.stats.items():
+                lat = sorted(st.latencies)
+                p50 = lat[len(lat) // 2] * 1000 if lat else 0.0
+                lines.append(
+                    f"  {e}: sent={st.sent} ok={st.accepted} known={st.known} err={st.errors} "
+                    f"first={st.first} p50={p50:.0f}ms" + (f" last_error={st.last_error}" if st.last_error else "")
+                )
+        return "\n".join(lines)
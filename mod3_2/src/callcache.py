@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+LATEST_TAGS = ("latest", "pending", None)
+
+
+class CallCache:
+    # Слой RpcProvider: кэш eth_call по (блок, from, to, value, calldata).
+    # "latest" привязывается к номеру текущей головы и сбрасывается с новым блоком,
+    # вызовы на конкретный блок кэшируются навсегда (LRU по памяти).
+
+    def __init__(self, max_bytes: int = 32 * 2**20, head_ttl: float = 1.0):
+        self.max_bytes = max_bytes
+        self.head_ttl = head_ttl
+        self._lock = threading.Lock()
+        self._pinned: OrderedDict[tuple, tuple[Any, int]] = OrderedDict()
+        self._latest: dict[tuple, Any] = {}
+        self._bytes = 0
+        self.head: Optional[int] = None
+        self._head_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # ---- head tracking --------------------------------------------------
+
+    def observe_block(self, number: int) -> None:
+        # новая голова: все, что читалось как latest, устарело
+        with self._lock:
+            self._head_at = time.monotonic()
+            if self.head is None or number > self.head:
+                if self._latest:
+                    self.invalidations += 1
+                self.head = number
+                self._latest.clear()
+
+    def invalidate_latest(self) -> None:
+        # своя tx отправлена — состояние изменится, даже если номер блока тот же
+        with self._lock:
+            if self._latest:
+                self.invalidations += 1
+            self._latest.clear()
+
+    def _current_head(self, nxt) -> Optional[int]:
+        with self._lock:
+            fresh = self.head is not None and time.monotonic() - self._head_at < self.head_ttl
+            head = self.head
+        if fresh:
+            return head
+        resp = nxt("eth_blockNumber", [])
+        if "result" not in resp:
+            return None
+        self.observe_block(int(resp["result"], 16))
+        return self.head
+
+    # ---- storage --------------------------------------------------------
+
+    def _get(self, key: tuple, pinned: bool) -> Any:
+        with self._lock:
+            if pinned:
+                hit = self._pinned.get(key)
+                if hit is None:
+                    return None
+                self._pinned.move_to_end(key)
+                return hit[0]
+            return self._latest.get(key)
+
+    def _put(self, key: tuple, value: Any, pinned: bool, head: Optional[int]) -> None:
+        with self._lock:
+            if not pinned:
+                # ответ на уже устаревшую голову не сохраняем
+                if head == self.head:
+                    self._latest[key] = value
+                return
+            size = len(key[1]) + len(str(value)) + 64
+            if key in self._pinned:
+                return
+            self._pinned[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._pinned:
+                _, (_, sz) = self._pinned.popitem(last=False)
+                self._bytes -= sz
+
+    # ---- layer ----------------------------------------------------------
+
+    def __call__(self, nxt, method, params):
+        if method == "eth_blockNumber":
+            resp = nxt(method, params)
+            if "result" in resp:
+                self.observe_block(int(resp["result"], 16))
+            return resp
+        # state overrides (симуляция) не кэшируем
+        if method != "eth_call" or len(params) != 2:
+            return nxt(method, params)
+
+        tx, tag = params
+        pinned = tag not in LATEST_TAGS
+        head = None if pinned else self._current_head(nxt)
+        if not pinned and head is None:
+            return nxt(method, params)
+        tx_key = json.dumps({k: tx.get(k) for k in ("from", "to", "value", "data", "input")},
+                            sort_keys=True, default=str).lower()
+        key = (str(tag).lower() if pinned else head, tx_key)
+
+        cached = self._get(key, pinned)
+        if cached is not None:
+            with self._lock:
+                self.hits += 1
+            return {"jsonrpc": "2.0", "id": 0, "result": cached}
+        with self._lock:
+            self.misses += 1
+        resp = nxt(method, params)
+        if "result" in resp and "error" not in resp:
+            self._put(key, resp["result"], pinned, head)
+        return resp
+
+    def report(self) -> str:
+        with self._lock:
+            total = self.hits + self.misses
+            return (f"call cache: hits={self.hits}/{total} pinned={len(self._pinned)} "
+                    f"({self._bytes / 2**20:.1f} MiB) latest={len(self._latest)} head={self.head} "
+                    f"invalidations={self.invalidations}")
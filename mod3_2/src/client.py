@@ -1,12 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import time
 from dataclasses import dataclass
 from typing import Any, Optional
 
 import requests
 from eth_account import Account
 from web3 import Web3
-from web3.providers.rpc import HTTPProvider
+
+from .broadcast import is_known
+from .journal import TxJournal, current_intent
+from .limiter import CircuitOpenError, backoff, limiter_for
+from .replacer import BumpPolicy, ReplacementEngine
+from .shared import SharedRpc
+from .signer import SignedTx, Signer
+from .simulate import current_simulation
+from .wallets import NonceAllocator
+from .zkfee import ZkProfile
 
 
 class TxError(RuntimeError):
@@ -19,90 +30,307 @@ class PriceFeed:
     quote: str = "USDT"
 
 
+def _hex(x: Any) -> str:
+    h = x.hex() if hasattr(x, "hex") else str(x)
+    return h if h.startswith("0x") else "0x" + h
+
+
 class AsyncEvmClient:
 
-    def __init__(self, rpc_url: str, private_key: str, chain_id: int, proxy: str | None = None):
+    def __init__(
+        self,
+        rpc_url: str,
+        private_key: str,
+        chain_id: int,
+        proxy: str | None = None,
+        journal: TxJournal | None = None,
+        bump_policy: BumpPolicy | None = None,
+        shared: SharedRpc | None = None,
+        signer: Signer | None = None,
+        zk_profile: ZkProfile | None = None,
+    ):
         self.rpc_url = rpc_url
         self.private_key = private_key
         self.chain_id = chain_id
         self.proxy = proxy
+        self.journal = journal
+        self.replacer = ReplacementEngine(self, bump_policy) if bump_policy is not None else None
 
         self.account = Account.from_key(private_key)
         self.address = self.account.address
+        self.signer = signer or Signer(private_key, pool="thread")
+        # zkSync: комиссия и газ одним zks_estimateFee (и опционально tx 0x71)
+        self.zk_profile = zk_profile
 
+        # общий провайдер/кэши, когда клиентов много (режим --keys)
+        self.shared = shared
         self.w3: Web3 | None = None
+        self.nonces = NonceAllocator(self._pending_nonce)
 
     async def __aenter__(self) -> "AsyncEvmClient":
-        request_kwargs: dict[str, Any] = {"timeout": 60}
-        if self.proxy:
-
-            request_kwargs["proxies"] = {"http": self.proxy, "https": self.proxy}
-
-        self.w3 = Web3(HTTPProvider(self.rpc_url, request_kwargs=request_kwargs))
-        if not self.w3.is_connected():
-            raise RuntimeError(f"RPC not connected: {self.rpc_url}")
+        if self.shared is None:
+            self.shared = SharedRpc(self.rpc_url, self.proxy)
+        self.shared.connect()
+        self.w3 = self.shared.w3
+        if self.journal is not None:
+            self.reconcile()
+        if self.replacer is not None:
+            self.replacer.fill_nonce_gaps()
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
         self.w3 = None
+        self.nonces.reset()
 
     def _require_w3(self) -> Web3:
         if self.w3 is None:
             raise RuntimeError("Client not initialized")
         return self.w3
 
-    async def get_nonce(self) -> int:
+    def _pending_nonce(self) -> int:
         w3 = self._require_w3()
         return w3.eth.get_transaction_count(self.address, "pending")
 
-    async def sign_and_send(self, to: str, data: str = "0x", value: int = 0, gas_multiplier: float = 1.15) -> str:
+    async def get_nonce(self) -> int:
+        return self._pending_nonce()
+
+    def reconcile(self) -> None:
+        # tx, которые остались в журнале без квитанции (процесс упал после подписи):
+        # все квитанции одним batch-запросом
+        assert self.journal is not None
+        w3 = self._require_w3()
+        pending = self.journal.pending(self.chain_id, self.address)
+        if not pending:
+            return
+
+        receipts = w3.provider.batch([("eth_getTransactionReceipt", [e.tx_hash]) for e in pending])
+        for e, resp in zip(pending, receipts):
+            r = resp.get("result")
+            if r:
+                status = "success" if int(r["status"], 16) == 1 else "failed"
+                self.journal.record_status(e.tx_hash, status, int(r["blockNumber"], 16))
+                print(f"[journal] {e.tx_hash} {status} in block {int(r['blockNumber'], 16)}")
+                continue
+            # квитанции нет: пробуем повторно отправить те же байты
+            try:
+                self._send_raw(e.raw, e.tx_hash)
+                self.journal.record_status(e.tx_hash, "sent")
+                print(f"[journal] {e.tx_hash} rebroadcast (nonce={e.nonce})")
+            except Exception as ex:
+                msg = str(ex).lower()
+                if "known" in msg:
+                    self.journal.record_status(e.tx_hash, "sent")
+                elif "nonce too low" in msg or "nonce is too low" in msg:
+                    self.journal.record_status(e.tx_hash, "dropped")
+                    print(f"[journal] {e.tx_hash} dropped (nonce {e.nonce} already used)")
+                else:
+                    print(f"[journal] {e.tx_hash} still pending: {ex}")
+
+    def _send_raw(self, raw: Any, tx_hash: str | None = None) -> None:
+        # со списком BROADCAST_RPCS — во все узлы сразу, иначе в основной
+        broadcaster = self.shared.broadcaster if self.shared is not None else None
+        if broadcaster is not None:
+            broadcaster.send(raw if isinstance(raw, (bytes, bytearray)) else bytes.fromhex(_hex(raw)[2:]), tx_hash)
+        else:
+            try:
+                self._require_w3().eth.send_raw_transaction(raw)
+            except Exception as e:
+                # узел уже видел эту tx (в т.ч. после повтора запроса по таймауту) — она отправлена
+                if not is_known(str(e)):
+                    raise
+
+    def _resume_step(self, intent: str, step_key: str) -> str | None:
+        # шаг intent уже подписан раньше: успешный — не повторяем, висящий — ждем его
+        assert self.journal is not None
+        for e in reversed(self.journal.find_step(intent, step_key)):
+            if e.status == "success":
+                print(f"[journal] step {step_key} already done: {e.tx_hash}")
+                return e.tx_hash
+            if e.status in ("signed", "sent"):
+                try:
+                    self._send_raw(e.raw, e.tx_hash)
+                except Exception as ex:
+                    msg = str(ex).lower()
+                    if "nonce too low" in msg or "nonce is too low" in msg:
+                        # nonce уже использован: либо этой tx (есть квитанция), либо другой
+                        r = self._receipt_or_none(e.tx_hash)
+                        if r is not None:
+                            status = "success" if r.get("status") == 1 else "failed"
+                            self.journal.record_status(e.tx_hash, status, r.get("blockNumber"))
+                            print(f"[journal] step {step_key} already mined: {e.tx_hash} {status}")
+                            return e.tx_hash
+                        self.journal.record_status(e.tx_hash, "dropped")
+                        print(f"[journal] step {step_key}: {e.tx_hash} dropped (nonce {e.nonce} already used)")
+                        continue
+                    if "known" not in msg:
+                        # как в reconcile: статус не меняем, tx остается висящей
+                        print(f"[journal] step {step_key}: {e.tx_hash} still pending: {ex}")
+                        return e.tx_hash
+                self.journal.record_status(e.tx_hash, "sent")
+                print(f"[journal] step {step_key} resumed: {e.tx_hash}")
+                return e.tx_hash
+        return None
+
+    def _receipt_or_none(self, tx_hash: str) -> dict[str, Any] | None:
+        try:
+            return dict(self._require_w3().eth.get_transaction_receipt(tx_hash))
+        except Exception:
+            return None
+
+    def estimate_gas(self, to: str, data: str = "0x", value: int = 0,
+                     state_override: dict[str, Any] | None = None) -> int:
+        # с state_override — газ шага, предыдущие tx которого еще не в блоке (src/flow.py)
+        w3 = self._require_w3()
+        tx = {"from": self.address, "to": w3.to_checksum_address(to), "data": _hex(data), "value": hex(int(value))}
+        if not state_override:
+            return int(w3.eth.estimate_gas(tx))
+        resp = w3.provider.make_request("eth_estimateGas", [tx, "latest", state_override])
+        if "error" in resp:
+            raise TxError(f"estimate_gas failed: {resp['error']}")
+        return int(resp["result"], 16)
+
+    async def sign_and_send(self, to: str, data: str = "0x", value: int = 0, gas_multiplier: float = 1.15,
+                            gas: int | None = None) -> str:
         w3 = self._require_w3()
-        nonce = await self.get_nonce()
+
+        sim = current_simulation()
+        if sim is not None:
+            return sim.execute(w3, to, data, value)
+
+        intent = current_intent() if self.journal is not None else None
+        step_key = None
+        if intent is not None:
+            selector = _hex(data)[:10]
+            step_key = intent.step_key(to, selector)
+            prev = self._resume_step(intent.id, step_key)
+            if prev:
+                return prev
 
         tx: dict[str, Any] = {
             "chainId": self.chain_id,
             "from": self.address,
             "to": w3.to_checksum_address(to),
-            "nonce": nonce,
             "data": data,
             "value": int(value),
         }
 
+        if gas is not None and self.zk_profile is not None:
+            # газ уже оценен вызывающим кодом, цены и тип tx — по профилю zkSync
+            try:
+                fee = self.shared.zk_fees.with_gas(tx, gas)
+            except Exception as e:
+                raise TxError(f"zks_estimateFee failed: {e}") from e
+            tx.update(self.zk_profile.fee_fields(fee, gas_multiplier))
+        elif gas is not None:
+            # газ уже оценен вызывающим кодом
+            try:
+                tx["gasPrice"] = self.shared.fees.gas_price()
+            except Exception as e:
+                raise TxError(f"gas_price failed: {e}") from e
+            tx["gas"] = int(gas * gas_multiplier)
+        elif self.zk_profile is not None:
+            try:
+                fee = self.shared.zk_fees.estimate(tx)
+            except Exception as e:
+                raise TxError(f"zks_estimateFee failed: {e}") from e
+            tx.update(self.zk_profile.fee_fields(fee, gas_multiplier))
+        else:
+            try:
+                tx["gasPrice"] = self.shared.fees.gas_price()
+            except Exception as e:
+                raise TxError(f"gas_price failed: {e}") from e
+
+            try:
+                gas_est = w3.eth.estimate_gas(tx)
+            except Exception as e:
+                raise TxError(f"estimate_gas failed: {e}") from e
 
-        try:
-            tx["gasPrice"] = int(w3.eth.gas_price)
-        except Exception as e:
-            raise TxError(f"gas_price failed: {e}") from e
+            tx["gas"] = int(gas_est * gas_multiplier)
 
+        # nonce берем после estimate_gas: упавшая оценка не оставляет дыр
+        tx["nonce"] = self.nonces.allocate()
         try:
-            gas_est = w3.eth.estimate_gas(tx)
+            # подпись вне event loop (пул signer-а)
+            signed = await self.signer.sign_tx_async(tx)
         except Exception as e:
-            raise TxError(f"estimate_gas failed: {e}") from e
-
-        tx["gas"] = int(gas_est * gas_multiplier)
-
-        signed = Account.sign_transaction(tx, self.private_key)
-
-        # web3.py v6+: raw_transaction (а не rawTransaction)
-        raw = getattr(signed, "rawTransaction", None) or getattr(signed, "raw_transaction", None)
-        if raw is None:
-            raise TxError("SignedTransaction has no raw tx field (rawTransaction/raw_transaction)")
+            self.nonces.release(tx["nonce"])
+            raise TxError(f"sign failed: {e}") from e
+        return self._broadcast(tx, intent.id if intent else None, step_key, signed=signed)
+
+    def _broadcast(self, tx: dict[str, Any], intent: str | None, step_key: str | None,
+                   fresh_nonce: bool = True, signed: SignedTx | None = None) -> str:
+        data = tx.get("data") or "0x"
+        if signed is None:
+            signed = self.signer.sign_tx(tx)
+        raw = signed.raw
+
+        signed_hash = signed.hash
+        if self.journal is not None:
+            # пишем до отправки: если процесс упадет, байты tx останутся в журнале
+            self.journal.record_signed(
+                self.chain_id, self.address, signed_hash, _hex(raw), tx["nonce"], tx["to"], _hex(data)[:10],
+                intent=intent, step_key=step_key,
+            )
 
         try:
-            tx_hash = w3.eth.send_raw_transaction(raw)
+            self._send_raw(raw, _hex(signed_hash))
         except Exception as e:
+            if fresh_nonce:
+                self.nonces.release(tx["nonce"])
+            if self.zk_profile is not None:
+                self.shared.zk_fees.forget(tx)
+            if self.journal is not None:
+                self.journal.record_status(signed_hash, "dropped")
             raise TxError(f"send_raw_transaction failed: {e}") from e
 
-        return tx_hash.hex()
+        # своя tx меняет состояние: кэш latest-чтений больше не верен
+        self.shared.calls.invalidate_latest()
+        if self.journal is not None:
+            self.journal.record_status(signed_hash, "sent")
+        if self.replacer is not None:
+            self.replacer.track(tx, signed_hash, intent, step_key)
+        return signed_hash
 
     async def wait_receipt(self, tx_hash: str, timeout: int = 240) -> dict[str, Any]:
         w3 = self._require_w3()
-        try:
-            r = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
-        except Exception as e:
-            raise TxError(f"wait_receipt failed: {e}") from e
+        sim = current_simulation()
+        if sim is not None:
+            return sim.receipt(tx_hash)
+
+        family = self.replacer.family(_hex(tx_hash)) if self.replacer is not None else None
+        if family is not None:
+            r = await self._wait_with_replacement(family, timeout)
+            tx_hash = _hex(r["transactionHash"])
+        else:
+            try:
+                r = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
+            except Exception as e:
+                raise TxError(f"wait_receipt failed: {e}") from e
+        if r.get("blockNumber") is not None:
+            self.shared.calls.observe_block(int(r["blockNumber"]))
+        if self.journal is not None:
+            status = "success" if r.get("status") == 1 else "failed"
+            self.journal.record_status(_hex(tx_hash), status, r.get("blockNumber"))
         return dict(r)
 
+    async def _wait_with_replacement(self, family, timeout: int) -> dict[str, Any]:
+        # хвост задержки ограничен политикой замен, а не таймаутом
+        assert self.replacer is not None
+        policy = self.replacer.policy
+        start = last_bump = time.monotonic()
+        while True:
+            r = self.replacer.find_receipt(family)
+            if r is not None:
+                self.replacer.settle(family.tx["nonce"], _hex(r["transactionHash"]))
+                return r
+            now = time.monotonic()
+            if now - start > timeout:
+                raise TxError(f"wait_receipt failed: nonce {family.tx['nonce']} not mined in {timeout}s")
+            if now - last_bump >= policy.stuck_after:
+                self.replacer.maybe_bump(family)
+                last_bump = now
+            await asyncio.sleep(policy.poll_interval)
+
     async def get_tx(self, tx_hash: str) -> dict:
 
         w3 = self._require_w3()
@@ -122,14 +350,34 @@ class AsyncEvmClient:
         url = f"https://api.binance.com/api/v3/depth?limit=1&symbol={s}USDT"
         proxies = {"http": self.proxy, "https": self.proxy} if self.proxy else None
 
-        for _ in range(5):
-            try:
+        limiter = limiter_for(url)
+
+        def fetch():
+            # слот лимитера и HTTP-запрос блокируют — вне event loop
+            with limiter.slot() as slot:
                 r = requests.get(url, timeout=15, proxies=proxies)
+                # 418/429 — бан/лимит Binance, 5xx — временная ошибка
+                slot.throttled = r.status_code in (418, 429)
+                slot.failed = r.status_code >= 500
+            return r, slot
+
+        for attempt in range(5):
+            try:
+                r, slot = await asyncio.to_thread(fetch)
+                if slot.throttled or slot.failed:
+                    await asyncio.sleep(backoff(attempt, retry_after=r.headers.get("Retry-After")))
+                    continue
                 j = r.json()
                 asks = j.get("asks")
                 if asks:
                     return float(asks[0][0])
                 return None
-            except Exception:
+            except CircuitOpenError:
+                return None
+            except (requests.Timeout, requests.ConnectionError):
+                await asyncio.sleep(backoff(attempt))
                 continue
+            except ValueError:
+                # не JSON — повтор не поможет
+                return None
         return None
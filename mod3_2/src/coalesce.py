@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+import threading
+from collections import Counter
+from typing import Any, Optional
+
+# только чтения: одинаковый запрос в один момент дает одинаковый ответ
+READ_METHODS = frozenset({
+    "eth_call",
+    "eth_getCode",
+    "eth_getBalance",
+    "eth_getStorageAt",
+    "eth_getTransactionCount",
+    "eth_blockNumber",
+    "eth_gasPrice",
+    "eth_maxPriorityFeePerGas",
+    "eth_chainId",
+    "eth_getBlockByNumber",
+    "eth_getBlockByHash",
+    "eth_getTransactionByHash",
+    "eth_getTransactionReceipt",
+    "eth_estimateGas",
+    "eth_getLogs",
+})
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class Coalescer:
+    # Слой RpcProvider (singleflight): одинаковые (method, params) чтения, которые
+    # уже в полете, ждут ответа первого запроса вместо отправки своего.
+
+    def __init__(self, methods: frozenset[str] = READ_METHODS):
+        self.methods = methods
+        self._lock = threading.Lock()
+        self._inflight: dict[tuple[str, str], _Call] = {}
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+
+    def __call__(self, nxt, method, params):
+        if method not in self.methods:
+            return nxt(method, params)
+        try:
+            # params включают block tag и state overrides симуляции
+            key = (method, json.dumps(params, sort_keys=True, default=str))
+        except (TypeError, ValueError):
+            return nxt(method, params)
+
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.misses[method] += 1
+            else:
+                self.hits[method] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return dict(call.result) if isinstance(call.result, dict) else call.result
+
+        try:
+            call.result = nxt(method, params)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.done.set()
+
+    def saved(self) -> int:
+        with self._lock:
+            return sum(self.hits.values())
+
+    def report(self) -> str:
+        with self._lock:
+            total_hits = sum(self.hits.values())
+            total = total_hits + sum(self.misses.values())
+            parts = [f"{m} {self.hits[m]}/{self.hits[m] + self.misses[m]}"
+                     for m in sorted(self.misses, key=lambda m: -self.hits[m]) if self.hits[m]]
+        return f"coalesced {total_hits}/{total} reads" + (": " + ", ".join(parts) if parts else "")
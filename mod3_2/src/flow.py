@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from web3 import Web3
+
+from .simulate import (
+    SEL_APPROVE,
+    SEL_DEPOSIT,
+    SEL_TRANSFER,
+    SEL_WITHDRAW,
+    Simulation,
+    _to_bytes,
+    current_simulation,
+)
+
+# вызовы, эффекты которых симуляция моделирует полностью: только их можно
+# пропускать как no-op, если они не меняют ни одного слота
+NOOP_CHECKED = (SEL_APPROVE, SEL_TRANSFER, SEL_DEPOSIT, SEL_WITHDRAW)
+
+
+@dataclass
+class Call:
+    to: str
+    data: str
+    value: int = 0
+
+
+@dataclass
+class FlowStep:
+    id: str
+    write: bool
+    # read: (результаты предыдущих шагов) -> значение
+    # write: (результаты) -> Call или None (шаг не нужен)
+    fn: Callable[[dict[str, Any]], Any]
+    after: list[str] = field(default_factory=list)
+
+
+@dataclass
+class _Pending:
+    step: FlowStep
+    call: Call
+    override: dict[str, Any]
+    gas: Optional[int] = None
+
+
+class StepGraph:
+    # Многошаговый flow адаптера: чтения без зависимостей друг от друга идут
+    # параллельно, записи прогоняются через симуляцию (revert и no-op видны до
+    # отправки), затем уходят подряд с последовательными nonce без ожидания
+    # квитанций. run() возвращает hash последней tx — ждать нужно только ее.
+
+    def __init__(self, client, name: str):
+        self.client = client
+        self.name = name
+        self.steps: dict[str, FlowStep] = {}
+
+    def _add(self, step: FlowStep) -> None:
+        if step.id in self.steps:
+            raise ValueError(f"{self.name}: duplicate step {step.id!r}")
+        for dep in step.after:
+            if dep not in self.steps:
+                raise ValueError(f"{self.name}: step {step.id!r} depends on unknown step {dep!r}")
+            if not step.write and self.steps[dep].write:
+                # чтение после неподтвержденной записи вернет старое состояние
+                raise ValueError(f"{self.name}: read {step.id!r} cannot depend on write {dep!r}")
+        self.steps[step.id] = step
+
+    def read(self, step_id: str, fn: Callable[[dict[str, Any]], Any], after: tuple[str, ...] = ()) -> None:
+        self._add(FlowStep(step_id, False, fn, list(after)))
+
+    def write(self, step_id: str, fn: Callable[[dict[str, Any]], Optional[Call]], after: tuple[str, ...] = ()) -> None:
+        self._add(FlowStep(step_id, True, fn, list(after)))
+
+    # ---- stages ---------------------------------------------------------
+
+    async def _run_reads(self, results: dict[str, Any]) -> None:
+        todo = [s for s in self.steps.values() if not s.write]
+        while todo:
+            ready = [s for s in todo if all(d in results for d in s.after)]
+            values = await asyncio.gather(*[asyncio.to_thread(s.fn, dict(results)) for s in ready])
+            for s, v in zip(ready, values):
+                results[s.id] = v
+            todo = [s for s in todo if s.id not in results]
+
+    def _build_writes(self, results: dict[str, Any]) -> list[tuple[FlowStep, Call]]:
+        # шаги объявляются после своих зависимостей, так что порядок объявления топологический
+        calls = []
+        for s in self.steps.values():
+            if not s.write:
+                continue
+            call = s.fn(results)
+            results[s.id] = call
+            if call is None:
+                print(f"[flow {self.name}] {s.id}: not needed")
+                continue
+            calls.append((s, call))
+        return calls
+
+    def _is_noop(self, w3: Web3, call: Call, before: dict[str, Any], after: dict[str, Any]) -> bool:
+        if call.value or _to_bytes(call.data)[:4] not in NOOP_CHECKED:
+            return False
+        for addr, o in after.items():
+            prev = before.get(addr, {}).get("stateDiff", {})
+            for slot, value in o["stateDiff"].items():
+                old = prev.get(slot)
+                if old is None:
+                    old = "0x" + bytes(w3.eth.get_storage_at(Web3.to_checksum_address(addr), slot)).rjust(32, b"\0").hex()
+                if int(old, 16) != int(value, 16):
+                    return False
+        return True
+
+    def _dry_run(self, calls: list[tuple[FlowStep, Call]]) -> list[_Pending]:
+        # цепочка целиком в симуляции: overrides до шага нужны для оценки газа,
+        # пока предыдущие tx еще не в блоке
+        w3 = self.client._require_w3()
+        sim = Simulation(owner=self.client.address)
+        out = []
+        for s, call in calls:
+            before = sim.state_override()
+            sim.execute(w3, call.to, call.data, call.value)
+            if self._is_noop(w3, call, before, sim.state_override()):
+                print(f"[flow {self.name}] {s.id}: no-op in simulation, skipped")
+                continue
+            out.append(_Pending(s, call, before))
+        return out
+
+    # ---- entry point ----------------------------------------------------
+
+    async def run(self) -> Optional[str]:
+        results: dict[str, Any] = {}
+        await self._run_reads(results)
+        calls = self._build_writes(results)
+        if not calls:
+            return None
+
+        if current_simulation() is not None:
+            # уже внутри симуляции (simulate-routes): шаги просто идут в нее
+            tx = None
+            for _, call in calls:
+                tx = await self.client.sign_and_send(to=call.to, data=call.data, value=call.value)
+            return tx
+
+        pending = await asyncio.to_thread(self._dry_run, calls)
+        if not pending:
+            return None
+        # газ всех шагов оцениваем до первой отправки: ошибка не оставит flow наполовину
+        gases = await asyncio.gather(*[
+            asyncio.to_thread(self.client.estimate_gas, p.call.to, p.call.data, p.call.value, p.override or None)
+            for p in pending
+        ])
+        for p, g in zip(pending, gases):
+            p.gas = g
+
+        tx = None
+        for p in pending:
+            tx = await self.client.sign_and_send(to=p.call.to, data=p.call.data, value=p.call.value, gas=p.gas)
+            print(f"[flow {self.name}] {p.step.id}: {tx}")
+        return tx
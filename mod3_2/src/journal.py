@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import contextvars
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+
+# Append-only журнал подписанных tx. Каждая смена статуса — новая строка,
+# текущее состояние tx = последняя строка по tx_hash.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tx_log (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts        REAL    NOT NULL,
+    chain_id  INTEGER NOT NULL,
+    address   TEXT    NOT NULL,
+    tx_hash   TEXT    NOT NULL,
+    intent    TEXT,
+    step_key  TEXT,
+    nonce     INTEGER,
+    to_addr   TEXT,
+    selector  TEXT,
+    raw       TEXT,
+    status    TEXT    NOT NULL,
+    block     INTEGER
+);
+CREATE INDEX IF NOT EXISTS tx_log_hash ON tx_log (tx_hash);
+CREATE INDEX IF NOT EXISTS tx_log_intent ON tx_log (intent, step_key);
+
+CREATE TABLE IF NOT EXISTS intent_log (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts        REAL    NOT NULL,
+    intent    TEXT    NOT NULL,
+    status    TEXT    NOT NULL,
+    tx_hash   TEXT
+);
+CREATE INDEX IF NOT EXISTS intent_log_intent ON intent_log (intent);
+
+CREATE TABLE IF NOT EXISTS order_log (
+    order_id  TEXT    PRIMARY KEY,
+    ts        REAL    NOT NULL,
+    params    TEXT    NOT NULL
+);
+"""
+
+PENDING = ("signed", "sent")
+FINAL = ("success", "failed", "dropped")
+
+_INTENT: contextvars.ContextVar[Optional["Intent"]] = contextvars.ContextVar("tx_intent", default=None)
+
+
+def make_intent_id(*parts: Any) -> str:
+    h = hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()
+    return h[:20]
+
+
+@dataclass
+class Intent:
+    id: str
+    # (to, selector) -> сколько раз уже встречался в этом запуске
+    _seen: dict[tuple[str, str], int] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def step_key(self, to: str, selector: str) -> str:
+        # ключ шага не зависит от того, были ли пропущены шаги до него
+        # (например approve, который на повторном запуске уже не нужен)
+        k = (to.lower(), selector)
+        with self._lock:
+            n = self._seen.get(k, 0)
+            self._seen[k] = n + 1
+        return f"{k[0]}:{selector}#{n}"
+
+
+def current_intent() -> Optional[Intent]:
+    return _INTENT.get()
+
+
+@contextmanager
+def intent_scope(intent_id: str) -> Iterator[Intent]:
+    intent = Intent(intent_id)
+    token = _INTENT.set(intent)
+    try:
+        yield intent
+    finally:
+        _INTENT.reset(token)
+
+
+@dataclass
+class JournalEntry:
+    tx_hash: str
+    chain_id: int
+    address: str
+    intent: Optional[str]
+    step_key: Optional[str]
+    nonce: Optional[int]
+    to_addr: Optional[str]
+    selector: Optional[str]
+    raw: Optional[str]
+    status: str
+    block: Optional[int]
+    ts: float
+
+
+class TxJournal:
+
+    def __init__(self, path: str = "tx_journal.sqlite3"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # ---- tx entries -----------------------------------------------------
+
+    def _last(self, tx_hash: str) -> Optional[JournalEntry]:
+        rows = self._select("WHERE tx_hash = ?", (tx_hash.lower(),))
+        return rows[-1] if rows else None
+
+    def _select(self, where: str, args: tuple) -> list[JournalEntry]:
+        # последняя строка на каждый tx_hash; raw берем из строки "signed"
+        q = f"""
+            SELECT l.tx_hash, l.chain_id, l.address, l.intent, l.step_key, l.nonce, l.to_addr, l.selector,
+                   (SELECT raw FROM tx_log r WHERE r.tx_hash = l.tx_hash AND r.raw IS NOT NULL ORDER BY r.id LIMIT 1),
+                   l.status, l.block, l.ts
+            FROM tx_log l
+            WHERE l.id IN (SELECT MAX(id) FROM tx_log GROUP BY tx_hash)
+            AND l.tx_hash IN (SELECT tx_hash FROM tx_log {where})
+            ORDER BY l.id
+        """
+        with self._lock:
+            rows = self._db.execute(q, args).fetchall()
+        return [JournalEntry(*r) for r in rows]
+
+    def record_signed(
+        self,
+        chain_id: int,
+        address: str,
+        tx_hash: str,
+        raw: str,
+        nonce: int,
+        to_addr: str,
+        selector: str,
+        intent: Optional[str] = None,
+        step_key: Optional[str] = None,
+    ) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO tx_log (ts, chain_id, address, tx_hash, intent, step_key, nonce, to_addr, selector, raw, status)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'signed')",
+                (time.time(), chain_id, address, tx_hash.lower(), intent, step_key, nonce, to_addr, selector, raw),
+            )
+
+    def record_status(self, tx_hash: str, status: str, block: Optional[int] = None) -> None:
+        prev = self._last(tx_hash)
+        if prev is None:
+            return
+        if prev.status == status and prev.block == block:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO tx_log (ts, chain_id, address, tx_hash, intent, step_key, nonce, to_addr, selector, status, block)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), prev.chain_id, prev.address, prev.tx_hash, prev.intent, prev.step_key, prev.nonce,
+                 prev.to_addr, prev.selector, status, block),
+            )
+
+    def get(self, tx_hash: str) -> Optional[JournalEntry]:
+        return self._last(tx_hash)
+
+    def pending(self, chain_id: int, address: str) -> list[JournalEntry]:
+        rows = self._select("WHERE chain_id = ? AND address = ?", (chain_id, address))
+        return [r for r in rows if r.status in PENDING]
+
+    def find_step(self, intent: str, step_key: str) -> list[JournalEntry]:
+        return self._select("WHERE intent = ? AND step_key = ?", (intent, step_key))
+
+    # ---- intents --------------------------------------------------------
+
+    def mark_intent(self, intent: str, status: str, tx_hash: Optional[str] = None) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO intent_log (ts, intent, status, tx_hash) VALUES (?, ?, ?, ?)",
+                (time.time(), intent, status, tx_hash),
+            )
+
+    def intent_done(self, intent: str, max_age: Optional[float] = None) -> Optional[str]:
+        # tx_hash финальной tx, если intent уже успешно выполнен (и не старше max_age)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT ts, status, tx_hash FROM intent_log WHERE intent = ? ORDER BY id DESC LIMIT 1",
+                (intent,),
+            ).fetchone()
+        if row is None or row[1] != "done":
+            return None
+        if max_age is not None and time.time() - row[0] > max_age:
+            return None
+        return row[2] or ""
+
+    def intent_status(self, intent: str) -> Optional[tuple[str, Optional[str]]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, tx_hash FROM intent_log WHERE intent = ? ORDER BY id DESC LIMIT 1",
+                (intent,),
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    # ---- orders ---------------------------------------------------------
+
+    def save_order(self, order_id: str, params: dict[str, Any]) -> None:
+        # параметры многошагового ордера (src/twap.py) фиксируются при создании
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO order_log (order_id, ts, params) VALUES (?, ?, ?)",
+                (order_id, time.time(), json.dumps(params)),
+            )
+
+    def load_order(self, order_id: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT params FROM order_log WHERE order_id = ?", (order_id,)).fetchone()
+        return json.loads(row[0]) if row else None
@@ -4,7 +4,9 @@ from decimal import Decimal
 from web3 import Web3
 
 from src.client import AsyncEvmClient
-from src.tokens import USDC_E, WETH, balance_of, allowance, encode_approve
+from src.flow import Call, StepGraph
+from src.tokens import USDC_E, WETH, balance_of
+from src.v2quote import amounts_out
 
 # USDC.e / WETH pair (KOI)
 KOI_PAIR = Web3.to_checksum_address("0xDFAaB828f5F515E104BaaBa4d8D554DA9096f0e4")
@@ -12,6 +14,9 @@ KOI_PAIR = Web3.to_checksum_address("0xDFAaB828f5F515E104BaaBa4d8D554DA9096f0e4"
 USDC_E = Web3.to_checksum_address(USDC_E)
 WETH = Web3.to_checksum_address(WETH)
 
+# проверяются при старте команды (src/verified.py)
+CONTRACTS = (KOI_PAIR, WETH, USDC_E)
+
 PAIR_ABI = [
     {
         "name": "swap",
@@ -100,51 +105,45 @@ class KoiFinance:
     def _w3(self) -> Web3:
         return self.client._require_w3()
 
+    async def quote(self, amounts: list[int], eth_in: bool = False) -> list[int]:
+        # лестница сумм по паре одним чтением резервов (token0=USDC.e, token1=WETH)
+        pair = self.client.shared.contracts.contract(address=KOI_PAIR, abi=PAIR_ABI)
+        r0, r1, _ = pair.functions.getReserves().call()
+        rin, rout = (r1, r0) if eth_in else (r0, r1)
+        return amounts_out(amounts, int(rin), int(rout))
+
     async def swap_eth_to_usdc_e(self, eth_amount: str, slippage: float = 1.0) -> str:
 
-        w3 = self._w3()
-        pair = w3.eth.contract(address=KOI_PAIR, abi=PAIR_ABI)
-        weth = w3.eth.contract(address=WETH, abi=WETH_ABI)
+        pair = self.client.shared.contracts.contract(address=KOI_PAIR, abi=PAIR_ABI)
+        weth = self.client.shared.contracts.contract(address=WETH, abi=WETH_ABI)
 
         amount_in = to_wei(eth_amount, 18)
         if amount_in <= 0:
             raise ValueError("amount_in == 0")
 
+        flow = StepGraph(self.client, "koi eth->usdc.e")
+        flow.read("reserves", lambda r: pair.functions.getReserves().call())
+
         # wrap ETH -> WETH
-        tx = await self.client.sign_and_send(
-            to=WETH,
-            data=weth.encode_abi("deposit", args=[]),
-            value=amount_in,
-        )
-        await self.client.wait_receipt(tx)
+        flow.write("wrap", lambda r: Call(WETH, weth.encode_abi("deposit", args=[]), amount_in))
 
-        # reserves: token0=USDC.e, token1=WETH
-        r0, r1, _ = pair.functions.getReserves().call()
-        expected_out = get_amount_out(amount_in, int(r1), int(r0))
-        out_min = int(expected_out * (1 - slippage / 100))
-
-        # approve WETH
-        if allowance(w3, WETH, self.client.address, KOI_PAIR) < amount_in:
-            approve = encode_approve(w3, WETH, KOI_PAIR, 2**256 - 1)
-            tx = await self.client.sign_and_send(to=WETH, data=approve, value=0)
-            await self.client.wait_receipt(tx)
-
-        # transfer WETH -> pair (CRITICAL)
-        tx = await self.client.sign_and_send(
-            to=WETH,
-            data=weth.encode_abi("transfer", args=[KOI_PAIR, int(amount_in)]),
-            value=0,
+        # transfer WETH -> pair (CRITICAL); approve не нужен — пара получает токен переводом
+        flow.write(
+            "transfer",
+            lambda r: Call(WETH, weth.encode_abi("transfer", args=[KOI_PAIR, int(amount_in)])),
+            after=("wrap",),
         )
-        await self.client.wait_receipt(tx)
 
-        # swap: USDC.e
-        swap_data = pair.encode_abi(
-            "swap",
-            args=[int(out_min), 0, self.client.address, b""],
-        )
+        def swap(r):
+            # reserves: token0=USDC.e, token1=WETH
+            r0, r1, _ = r["reserves"]
+            expected_out = get_amount_out(amount_in, int(r1), int(r0))
+            out_min = int(expected_out * (1 - slippage / 100))
+            print(f"KOI SWAP ETH->USDC.e | in={amount_in} out_min={out_min}")
+            return Call(KOI_PAIR, pair.encode_abi("swap", args=[int(out_min), 0, self.client.address, b""]))
 
-        print(f"KOI SWAP ETH->USDC.e | in={amount_in} out_min={out_min}")
-        return await self.client.sign_and_send(to=KOI_PAIR, data=swap_data, value=0)
+        flow.write("swap", swap, after=("reserves", "transfer"))
+        return await flow.run()
 
     async def swap_usdc_e_to_eth(
         self,
@@ -154,54 +153,49 @@ class KoiFinance:
     ) -> str:
 
         w3 = self._w3()
-        pair = w3.eth.contract(address=KOI_PAIR, abi=PAIR_ABI)
-        weth = w3.eth.contract(address=WETH, abi=WETH_ABI)
-        usdc = w3.eth.contract(address=USDC_E, abi=ERC20_TRANSFER_ABI)
+        pair = self.client.shared.contracts.contract(address=KOI_PAIR, abi=PAIR_ABI)
+        weth = self.client.shared.contracts.contract(address=WETH, abi=WETH_ABI)
+        usdc = self.client.shared.contracts.contract(address=USDC_E, abi=ERC20_TRANSFER_ABI)
+
+        flow = StepGraph(self.client, "koi usdc.e->eth")
 
         # amount_in: support "--amount 0" as "all"
-        if is_all_balance or usdc_amount in (None, "0", 0):
-            amount_in = balance_of(w3, USDC_E, self.client.address)
-        else:
-            amount_in = to_wei(usdc_amount, 6)
+        def amount(r):
+            if is_all_balance or usdc_amount in (None, "0", 0):
+                amount_in = balance_of(w3, USDC_E, self.client.address)
+            else:
+                amount_in = to_wei(usdc_amount, 6)
+            if amount_in <= 0:
+                raise ValueError("amount_in == 0")
+            return amount_in
 
-        if amount_in <= 0:
-            raise ValueError("amount_in == 0")
+        flow.read("amount", amount)
+        flow.read("reserves", lambda r: pair.functions.getReserves().call())
 
+        def out_min(r):
+            r0, r1, _ = r["reserves"]
+            expected_out = get_amount_out(int(r["amount"]), int(r0), int(r1))
+            return int(expected_out * (1 - slippage / 100))
 
-        r0, r1, _ = pair.functions.getReserves().call()
-        expected_out = get_amount_out(int(amount_in), int(r0), int(r1))
-        out_min = int(expected_out * (1 - slippage / 100))
-
-        # approve USDC.e
-        if allowance(w3, USDC_E, self.client.address, KOI_PAIR) < amount_in:
-            approve = encode_approve(w3, USDC_E, KOI_PAIR, 2**256 - 1)
-            tx = await self.client.sign_and_send(to=USDC_E, data=approve, value=0)
-            await self.client.wait_receipt(tx)
+        flow.read("out_min", out_min, after=("amount", "reserves"))
 
         # transfer USDC.e -> pair
-        tx = await self.client.sign_and_send(
-            to=USDC_E,
-            data=usdc.encode_abi("transfer", args=[KOI_PAIR, int(amount_in)]),
-            value=0,
-        )
-        await self.client.wait_receipt(tx)
-
-        # swap: WETH
-        swap_data = pair.encode_abi(
-            "swap",
-            args=[0, int(out_min), self.client.address, b""],
+        flow.write(
+            "transfer",
+            lambda r: Call(USDC_E, usdc.encode_abi("transfer", args=[KOI_PAIR, int(r["amount"])])),
+            after=("amount",),
         )
 
-        print(f"KOI SWAP USDC.e->WETH | in={amount_in} out_min={out_min}")
-        tx_swap = await self.client.sign_and_send(to=KOI_PAIR, data=swap_data, value=0)
-        await self.client.wait_receipt(tx_swap)
+        def swap(r):
+            print(f"KOI SWAP USDC.e->WETH | in={r['amount']} out_min={r['out_min']}")
+            return Call(KOI_PAIR, pair.encode_abi("swap", args=[0, int(r["out_min"]), self.client.address, b""]))
 
-        # unwrap all WETH received
-        weth_bal = balance_of(w3, WETH, self.client.address)
-        if weth_bal > 0:
-            unwrap_data = weth.encode_abi("withdraw", args=[int(weth_bal)])
-            print(f"Unwrap WETH->ETH | weth_bal={weth_bal}")
-            return await self.client.sign_and_send(to=WETH, data=unwrap_data, value=0)
+        flow.write("swap", swap, after=("out_min", "transfer"))
 
+        # unwrap: пара отдает ровно amount1Out, так что сумма известна до swap
+        def unwrap(r):
+            print(f"Unwrap WETH->ETH | weth={r['out_min']}")
+            return Call(WETH, weth.encode_abi("withdraw", args=[int(r["out_min"])]))
 
-        return tx_swap
+        flow.write("unwrap", unwrap, after=("swap",))
+        return await flow.run()
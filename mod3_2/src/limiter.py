@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
+from urllib.parse import urlparse
+
+import requests
+
+# JSON-RPC ошибки, которыми публичные узлы сообщают о лимите. Только явные фразы:
+# "exceeded"/"capacity" встречаются и в настоящих ошибках ("gas limit exceeded")
+RATE_LIMIT_CODES = (-32005, -32029, 429)
+RATE_LIMIT_WORDS = ("rate limit", "too many requests")
+# запись: узел мог принять tx до таймаута/5xx, повтор вернул бы "already known".
+# Повторяются только явные отказы по лимиту (429 / rate limit), когда tx точно не принята
+NO_BLIND_RETRY = ("eth_sendRawTransaction",)
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+def backoff(attempt: int, base: float = 0.25, cap: float = 8.0, retry_after: Optional[str] = None) -> float:
+    # full jitter: случайная пауза в [0, base * 2^attempt], не больше cap
+    if retry_after:
+        try:
+            return min(cap, float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def is_rate_limited(error) -> bool:
+    if isinstance(error, dict):
+        if error.get("code") in RATE_LIMIT_CODES:
+            return True
+        error = error.get("message", "")
+    msg = str(error).lower()
+    return any(w in msg for w in RATE_LIMIT_WORDS)
+
+
+@dataclass
+class Slot:
+    # исход запроса, который заполняет вызывающий код
+    throttled: bool = False
+    failed: bool = False
+
+
+class EndpointLimiter:
+    # Token bucket (запросов/с) + AIMD-окно одновременных запросов + circuit breaker.
+    # Окно растет на 1/limit за успешный ответ, пока задержка близка к базовой,
+    # и делится пополам на 429/таймауте.
+
+    def __init__(
+        self,
+        name: str,
+        rate: Optional[float] = None,
+        start: float = 4.0,
+        min_limit: float = 1.0,
+        max_limit: float = 64.0,
+        latency_tol: float = 1.5,
+        breaker_failures: int = 5,
+        breaker_cooldown: float = 10.0,
+    ):
+        self.name = name
+        self.rate = rate
+        self.limit = start
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tol = latency_tol
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+
+        self._cond = threading.Condition()
+        self.inflight = 0
+        self._tokens = rate or 0.0
+        self._at = time.monotonic()
+        self.base_latency: Optional[float] = None
+        self._fails = 0
+        self.open_until = 0.0
+        self._probe = False
+        # счетчики для отчета
+        self.ok = 0
+        self.throttled = 0
+        self.failed = 0
+        self.rejected = 0
+
+    # ---- admission ------------------------------------------------------
+
+    def _take_token(self) -> float:
+        # под self._cond; время ожидания до появления токена
+        if not self.rate:
+            return 0.0
+        now = time.monotonic()
+        self._tokens = min(self.rate, self._tokens + (now - self._at) * self.rate)
+        self._at = now
+        self._tokens -= 1
+        return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self) -> None:
+        with self._cond:
+            now = time.monotonic()
+            if self.open_until:
+                if now < self.open_until or self._probe:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.name}: circuit open")
+                # half-open: пропускаем один пробный запрос
+                self._probe = True
+            while self.inflight >= int(self.limit):
+                self._cond.wait()
+            self.inflight += 1
+            delay = self._take_token()
+        if delay:
+            time.sleep(delay)
+
+    def release(self, latency: float, throttled: bool = False, failed: bool = False) -> None:
+        with self._cond:
+            self.inflight -= 1
+            if throttled or failed:
+                if throttled:
+                    self.throttled += 1
+                    self.limit = max(self.min_limit, self.limit / 2)
+                else:
+                    self.failed += 1
+                self._fails += 1
+                if self._probe or self._fails >= self.breaker_failures:
+                    self.open_until = time.monotonic() + self.breaker_cooldown
+                    print(f"[limiter] {self.name}: circuit open for {self.breaker_cooldown:.0f}s")
+                self._probe = False
+            else:
+                self.ok += 1
+                self._fails = 0
+                if self.open_until:
+                    print(f"[limiter] {self.name}: circuit closed")
+                self.open_until = 0.0
+                self._probe = False
+                base = self.base_latency
+                self.base_latency = latency if base is None else min(latency, base * 0.95 + latency * 0.05)
+                if latency <= self.base_latency * self.latency_tol:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                elif latency > self.base_latency * self.latency_tol * 2:
+                    # узел замедлился без 429 — мягко отступаем
+                    self.limit = max(self.min_limit, self.limit * 0.9)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, acquired: bool = False) -> Iterator[Slot]:
+        if not acquired:
+            self.acquire()
+        s = Slot()
+        t = time.perf_counter()
+        try:
+            yield s
+        except (requests.Timeout, requests.ConnectionError):
+            s.throttled = True
+            raise
+        finally:
+            self.release(time.perf_counter() - t, s.throttled, s.failed)
+
+    def report(self) -> str:
+        with self._cond:
+            return (f"{self.name}: limit={self.limit:.1f} ok={self.ok} throttled={self.throttled} "
+                    f"failed={self.failed} rejected={self.rejected}")
+
+
+_LIMITERS: dict[str, EndpointLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def limiter_for(endpoint: str, **kwargs) -> EndpointLimiter:
+    # один лимитер на хост на весь процесс: его делят все клиенты и кошельки
+    host = urlparse(endpoint).netloc or endpoint
+    with _LIMITERS_LOCK:
+        lim = _LIMITERS.get(host)
+        if lim is None:
+            lim = _LIMITERS[host] = EndpointLimiter(host, **kwargs)
+        return lim
+
+
+def all_limiters() -> list[EndpointLimiter]:
+    with _LIMITERS_LOCK:
+        return list(_LIMITERS.values())
+
+
+class LimiterLayer:
+    # слой RpcProvider: лимит + повторы с jittered backoff для 429/таймаутов/5xx
+
+    def __init__(self, limiter: EndpointLimiter, retries: int = 4):
+        self.limiter = limiter
+        self.retries = retries
+
+    def __call__(self, nxt, method, params):
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                self.limiter.acquire()
+            except CircuitOpenError:
+                # пока breaker открыт, в узел не ходим; ждем конца паузы и пробуем снова
+                if attempt >= self.retries:
+                    raise
+                time.sleep(max(self.limiter.open_until - time.monotonic(), backoff(attempt)))
+                attempt += 1
+                continue
+            with self.limiter.slot(acquired=True) as s:
+                try:
+                    resp = nxt(method, params)
+                except requests.HTTPError as e:
+                    status = e.response.status_code if e.response is not None else 0
+                    if status != 429 and (status < 500 or method in NO_BLIND_RETRY):
+                        s.failed = status >= 500
+                        raise
+                    s.throttled = status == 429
+                    s.failed = status >= 500
+                    retry_after = e.response.headers.get("Retry-After") if e.response is not None else None
+                    if attempt >= self.retries:
+                        raise
+                    resp = None
+                except (requests.Timeout, requests.ConnectionError):
+                    s.throttled = True
+                    if attempt >= self.retries or method in NO_BLIND_RETRY:
+                        raise
+                    resp = None
+                else:
+                    if isinstance(resp, dict) and "error" in resp and is_rate_limited(resp["error"]):
+                        s.throttled = True
+                        if attempt >= self.retries:
+                            return resp
+                        resp = None
+            if resp is not None:
+                return resp
+            time.sleep(backoff(attempt, retry_after=retry_after))
+            attempt += 1
@@ -1,108 +1,222 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import threading
+import time
+from typing import Optional
+
 from web3 import Web3
 
 from .client import AsyncEvmClient
+from .flow import Call, StepGraph
+from .multicall import aggregate
 from .utils import to_wei
-from .tokens import USDC_E, balance_of, allowance, encode_approve
-from hexbytes import HexBytes
-
-def _to_hexstr(x) -> str:
-
-    if isinstance(x, str):
-        return x
-    if isinstance(x, (bytes, bytearray, HexBytes)):
-        return "0x" + bytes(x).hex()
-    raise TypeError(f"Unsupported type for calldata: {type(x)}")
-
-
-def _strip_0x(x) -> str:
-
-    s = _to_hexstr(x)
-    return s[2:] if s.startswith("0x") else s
-
-
-@dataclass
-class MaverickTemplate:
-    tx_hash: str
-
-    template_amount_in: int = 10
-
-def _word32(n: int) -> str:
-    return hex(int(n))[2:].rjust(64, "0")
-
-
-def _replace_word_once(calldata_hex: str, old_word_64: str, new_word_64: str) -> str:
-
-    x = _strip_0x(calldata_hex).lower()
-    old_word_64 = old_word_64.lower()
-    new_word_64 = new_word_64.lower()
-
-    idx = x.find(old_word_64)
-    if idx == -1:
-        raise RuntimeError("amountIn word not found in template calldata (anchor mismatch).")
-
-    if x.find(old_word_64, idx + 1) != -1:
-        raise RuntimeError("amountIn word found multiple times in calldata. Need a more specific anchor.")
-    x2 = x[:idx] + new_word_64 + x[idx + 64 :]
-    return "0x" + x2
+from .tokens import MAV, USDC_E, WETH, balance_of, allowance, encode_approve
+
+# Maverick V1, zkSync Era
+MAVERICK_ROUTER = Web3.to_checksum_address("0x39E098A153Ad69834a9Dac32f0FCa92066aD03f4")
+MAVERICK_FACTORY = Web3.to_checksum_address("0x2C1a605f843A2E18b7d7772f0Ce23c236acCF7f5")
+MAVERICK_POOL_INFO = Web3.to_checksum_address("0x57D47F505EdaA8Ae1eFD807A860A79A28bE06449")
+
+# проверяются при старте команды (src/verified.py)
+CONTRACTS = (USDC_E, MAV, WETH, MAVERICK_ROUTER, MAVERICK_FACTORY, MAVERICK_POOL_INFO)
+
+ROUTER_ABI = [
+    {
+        "name": "exactInputSingle",
+        "type": "function",
+        "stateMutability": "payable",
+        "inputs": [
+            {
+                "name": "params",
+                "type": "tuple",
+                "components": [
+                    {"name": "tokenIn", "type": "address"},
+                    {"name": "tokenOut", "type": "address"},
+                    {"name": "pool", "type": "address"},
+                    {"name": "recipient", "type": "address"},
+                    {"name": "deadline", "type": "uint256"},
+                    {"name": "amountIn", "type": "uint256"},
+                    {"name": "amountOutMinimum", "type": "uint256"},
+                    {"name": "sqrtPriceLimitD18", "type": "uint256"},
+                ],
+            }
+        ],
+        "outputs": [{"name": "amountOut", "type": "uint256"}],
+    },
+    {
+        "name": "unwrapWETH9",
+        "type": "function",
+        "stateMutability": "payable",
+        "inputs": [
+            {"name": "amountMinimum", "type": "uint256"},
+            {"name": "recipient", "type": "address"},
+        ],
+        "outputs": [],
+    },
+    {
+        "name": "multicall",
+        "type": "function",
+        "stateMutability": "payable",
+        "inputs": [{"name": "data", "type": "bytes[]"}],
+        "outputs": [{"name": "results", "type": "bytes[]"}],
+    },
+]
+
+POOL_INFO_ABI = [
+    {
+        # не view: пул считает swap и откатывает его, поэтому только через eth_call
+        "name": "calculateSwap",
+        "type": "function",
+        "stateMutability": "nonpayable",
+        "inputs": [
+            {"name": "pool", "type": "address"},
+            {"name": "amount", "type": "uint128"},
+            {"name": "tokenAIn", "type": "bool"},
+            {"name": "exactOutput", "type": "bool"},
+            {"name": "sqrtPriceLimit", "type": "uint256"},
+        ],
+        "outputs": [{"name": "returnAmount", "type": "uint256"}],
+    }
+]
+
+FACTORY_ABI = [
+    {
+        "name": "poolCount",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [{"name": "_tokenA", "type": "address"}, {"name": "_tokenB", "type": "address"}],
+        "outputs": [{"name": "_poolCount", "type": "uint256"}],
+    },
+    {
+        "name": "lookup",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [
+            {"name": "_tokenA", "type": "address"},
+            {"name": "_tokenB", "type": "address"},
+            {"name": "startIndex", "type": "uint256"},
+            {"name": "endIndex", "type": "uint256"},
+        ],
+        "outputs": [{"name": "pools", "type": "address[]"}],
+    },
+]
+
+# (tokenA, tokenB) -> пулы фабрики, на процесс
+_POOLS: dict[tuple[str, str], list[str]] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _sorted_pair(t0: str, t1: str) -> tuple[str, str]:
+    a, b = Web3.to_checksum_address(t0), Web3.to_checksum_address(t1)
+    return (a, b) if int(a, 16) < int(b, 16) else (b, a)
 
 
 class Maverick:
+    # Swap напрямую через Router.exactInputSingle: пулы пары берутся из фабрики,
+    # котировки всех пулов и сумм — одним multicall к PoolInformation.calculateSwap.
 
-
-    def __init__(self, client: AsyncEvmClient, template: MaverickTemplate):
+    def __init__(self, client: AsyncEvmClient, pools: Optional[list[str]] = None):
         self.client = client
-        self.template = template
+        # явный список пулов вместо поиска через фабрику
+        self.pools = [Web3.to_checksum_address(p) for p in pools] if pools else None
 
     def _w3(self) -> Web3:
         return self.client._require_w3()
 
-    async def _load_template_tx(self) -> tuple[str, str]:
-        tx = await self.client.get_tx(self.template.tx_hash)
-        to_addr = tx.get("to")
-        data = tx.get("input") or tx.get("data")
-        if not to_addr or not data:
-            raise RuntimeError("Template tx has empty 'to' or 'input'.")
-        return (to_addr, data)
-
-    async def _ensure_approve(self, spender: str, need_amount: int):
+    def pools_for(self, token_in: str, token_out: str) -> list[str]:
+        if self.pools is not None:
+            return self.pools
+        key = _sorted_pair(token_in, token_out)
+        with _POOLS_LOCK:
+            cached = _POOLS.get(key)
+        if cached is not None:
+            return cached
+        factory = self.client.shared.contracts.contract(address=MAVERICK_FACTORY, abi=FACTORY_ABI)
+        n = int(factory.functions.poolCount(*key).call())
+        pools = [Web3.to_checksum_address(p) for p in factory.functions.lookup(*key, 0, n).call()] if n else []
+        if not pools:
+            raise RuntimeError(f"No Maverick pools for {key[0]}/{key[1]}")
+        with _POOLS_LOCK:
+            _POOLS[key] = pools
+        return pools
+
+    def quote_ladder(self, token_in: str, token_out: str, amounts: list[int],
+                     pools: Optional[list[str]] = None) -> dict[str, list[int]]:
+        # pool -> выход для каждой суммы; 0 — пул не может исполнить сумму
         w3 = self._w3()
-        cur = allowance(w3, USDC_E, self.client.address, spender)
-        if cur >= need_amount:
-            return
-        print("Approve USDC.e -> Maverick router ...")
-        approve_data = encode_approve(w3, USDC_E, spender, 2**256 - 1)
-        txa = await self.client.sign_and_send(to=USDC_E, data=approve_data, value=0)
-        await self.client.wait_receipt(txa)
-
-    async def usdc_e_swap_from_template(self, usdc_amount: str | None, slippage: float, is_all_balance: bool = False) -> str:
+        pools = pools or self.pools_for(token_in, token_out)
+        token_a_in = _sorted_pair(token_in, token_out)[0] == Web3.to_checksum_address(token_in)
+        info = self.client.shared.contracts.contract(address=MAVERICK_POOL_INFO, abi=POOL_INFO_ABI)
+        calls = [
+            (MAVERICK_POOL_INFO, bytes.fromhex(
+                info.encode_abi("calculateSwap", args=[p, int(a), token_a_in, False, 0])[2:]))
+            for p in pools for a in amounts
+        ]
+        res = aggregate(w3, calls, contract=self.client.shared.contracts.contract)
+        n = len(amounts)
+        return {p: [r.uint() for r in res[i * n : (i + 1) * n]] for i, p in enumerate(pools)}
+
+    def best_pool(self, token_in: str, token_out: str, amount_in: int) -> tuple[str, int]:
+        quotes = self.quote_ladder(token_in, token_out, [amount_in])
+        pool, (out,) = max(quotes.items(), key=lambda kv: kv[1][0])
+        if out <= 0:
+            raise RuntimeError(f"Maverick: no pool can swap {amount_in} of {token_in}")
+        return pool, out
+
+    def _encode_swap(self, token_in: str, token_out: str, pool: str, amount_in: int, min_out: int,
+                     to_eth: bool) -> str:
+        router = self.client.shared.contracts.contract(address=MAVERICK_ROUTER, abi=ROUTER_ABI)
+        deadline = int(time.time()) + 900
+        # за ETH: WETH остается в роутере и выводится unwrapWETH9 в том же multicall
+        recipient = MAVERICK_ROUTER if to_eth else self.client.address
+        swap = router.encode_abi("exactInputSingle", args=[(
+            Web3.to_checksum_address(token_in), Web3.to_checksum_address(token_out), pool,
+            recipient, deadline, int(amount_in), int(min_out), 0,
+        )])
+        if not to_eth:
+            return swap
+        unwrap = router.encode_abi("unwrapWETH9", args=[int(min_out), self.client.address])
+        return router.encode_abi("multicall", args=[[bytes.fromhex(swap[2:]), bytes.fromhex(unwrap[2:])]])
+
+    async def _swap_from_usdc_e(self, token_out: str, usdc_amount: str | None, slippage: float,
+                                is_all_balance: bool, to_eth: bool) -> str:
         w3 = self._w3()
-
-        to_addr, input_data = await self._load_template_tx()
-        router = w3.to_checksum_address(to_addr)
-
-        if is_all_balance:
-            amount_in = balance_of(w3, USDC_E, self.client.address)
-        else:
-            if usdc_amount is None:
-                raise ValueError("Set --amount or use --all")
-            amount_in = to_wei(usdc_amount, 6)
-
-        if amount_in <= 0:
-            raise ValueError("amount_in is 0")
-
-        # approve
-        await self._ensure_approve(router, amount_in)
-
-
-        old_word = _word32(self.template.template_amount_in)
-        new_word = _word32(amount_in)
-
-        new_data = _replace_word_once(input_data, old_word, new_word)
-
-        print(f"Maverick TEMPLATE SWAP amount_in={amount_in} (old={self.template.template_amount_in}) router={router}")
-        # slippage
-
-        return await self.client.sign_and_send(to=router, data=new_data, value=0)
+        flow = StepGraph(self.client, f"maverick usdc.e->{'eth' if to_eth else token_out}")
+
+        def amount(r):
+            if is_all_balance:
+                amount_in = balance_of(w3, USDC_E, self.client.address)
+            else:
+                if usdc_amount is None:
+                    raise ValueError("Set --amount or use --all")
+                amount_in = to_wei(usdc_amount, 6)
+            if amount_in <= 0:
+                raise ValueError("amount_in is 0")
+            return amount_in
+
+        flow.read("amount", amount)
+        flow.read("allowance", lambda r: allowance(w3, USDC_E, self.client.address, MAVERICK_ROUTER))
+        flow.read("quote", lambda r: self.best_pool(USDC_E, token_out, r["amount"]), after=("amount",))
+
+        flow.write(
+            "approve",
+            lambda r: Call(USDC_E, encode_approve(w3, USDC_E, MAVERICK_ROUTER, 2**256 - 1))
+            if r["allowance"] < r["amount"] else None,
+            after=("amount", "allowance"),
+        )
+
+        def swap(r):
+            pool, out = r["quote"]
+            # slippage=1 => 1%
+            min_out = int(out * (100 - float(slippage)) / 100)
+            print(f"Maverick SWAP pool={pool} amount_in={r['amount']} quote={out} min={min_out}")
+            return Call(MAVERICK_ROUTER, self._encode_swap(USDC_E, token_out, pool, r["amount"], min_out, to_eth))
+
+        flow.write("swap", swap, after=("quote", "approve"))
+        return await flow.run()
+
+    async def usdc_e_to_eth(self, usdc_amount: str | None, slippage: float, is_all_balance: bool = False) -> str:
+        return await self._swap_from_usdc_e(WETH, usdc_amount, slippage, is_all_balance, to_eth=True)
+
+    async def usdc_e_to_mav(self, usdc_amount: str | None, slippage: float, is_all_balance: bool = False) -> str:
+        return await self._swap_from_usdc_e(MAV, usdc_amount, slippage, is_all_balance, to_eth=False)
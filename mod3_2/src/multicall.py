@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from web3 import Web3
+
+# Multicall3 на zkSync Era (адрес отличается от 0xcA11... в EVM-сетях)
+MULTICALL3 = "0xF9cda624FBC7e059355ce98a31693d299FACd963"
+MAX_BATCH = 200
+
+AGGREGATE3_ABI = [
+    {
+        "name": "aggregate3",
+        "type": "function",
+        "stateMutability": "payable",
+        "inputs": [
+            {
+                "name": "calls",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "target", "type": "address"},
+                    {"name": "allowFailure", "type": "bool"},
+                    {"name": "callData", "type": "bytes"},
+                ],
+            }
+        ],
+        "outputs": [
+            {
+                "name": "returnData",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "success", "type": "bool"},
+                    {"name": "returnData", "type": "bytes"},
+                ],
+            }
+        ],
+    }
+]
+
+
+@dataclass
+class CallResult:
+    ok: bool
+    data: bytes
+
+    def uint(self) -> int:
+        return int.from_bytes(self.data[:32], "big") if self.ok and len(self.data) >= 32 else 0
+
+
+def aggregate(w3: Web3, calls: list[tuple[str, bytes]], address: str = MULTICALL3,
+              contract: Optional[Callable[..., Any]] = None) -> list[CallResult]:
+    # много eth_call одним запросом; упавший вызов не роняет остальные.
+    # contract — фабрика контрактов (shared.contracts.contract), по умолчанию w3.eth.contract
+    mc = (contract or w3.eth.contract)(address=Web3.to_checksum_address(address), abi=AGGREGATE3_ABI)
+    out: list[CallResult] = []
+    for i in range(0, len(calls), MAX_BATCH):
+        chunk = [(Web3.to_checksum_address(t), True, bytes(d)) for t, d in calls[i : i + MAX_BATCH]]
+        res = mc.functions.aggregate3(chunk).call()
+        out += [CallResult(bool(ok), bytes(data)) for ok, data in res]
+    return out
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+# Проекты, шаги которых выполняет отдельный долгоживущий воркер (`main.py serve`).
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROJECTS: dict[str, tuple[Path, str]] = {
+    "dz2": (REPO_ROOT / "dz2 full", "main.py"),
+}
+LOCAL_PROJECT = "mod3_2"
+
+
+@dataclass
+class Step:
+    id: str
+    cmd: str
+    args: dict[str, Any] = field(default_factory=dict)
+    after: list[str] = field(default_factory=list)
+    project: str = LOCAL_PROJECT
+
+    def argv(self) -> list[str]:
+        out = [self.cmd]
+        for k, v in self.args.items():
+            flag = "--" + str(k).replace("_", "-")
+            if v is True:
+                out.append(flag)
+            elif v is False or v is None:
+                continue
+            else:
+                out += [flag, str(v)]
+        return out
+
+
+@dataclass
+class Plan:
+    steps: list[Step]
+    concurrency: int = 4
+    checkpoint: Path = Path("plan.state.json")
+
+
+def _read_plan_file(path: Path) -> dict[str, Any]:
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() == ".json":
+        return json.loads(text)
+    try:
+        import yaml
+    except ImportError as e:
+        raise RuntimeError("PyYAML is required for .yaml plans (pip install pyyaml) or use a .json plan") from e
+    return yaml.safe_load(text)
+
+
+def load_plan(path: str | Path) -> Plan:
+    path = Path(path)
+    raw = _read_plan_file(path) or {}
+    items = raw.get("steps") if isinstance(raw, dict) else raw
+    if not items:
+        raise ValueError(f"Plan has no steps: {path}")
+
+    steps: list[Step] = []
+    prev: Optional[str] = None
+    for i, item in enumerate(items):
+        sid = str(item.get("id") or f"step{i + 1}")
+        # без `after` шаг ждет предыдущий (обычный упорядоченный список);
+        # `after: []` — независимый корень DAG
+        if "after" in item:
+            after = item["after"]
+            after = [after] if isinstance(after, str) else [str(x) for x in (after or [])]
+        else:
+            after = [prev] if prev else []
+        steps.append(Step(
+            id=sid,
+            cmd=str(item["cmd"]),
+            args=dict(item.get("args") or {}),
+            after=after,
+            project=str(item.get("project") or LOCAL_PROJECT),
+        ))
+        prev = sid
+
+    _validate(steps)
+    opts = raw if isinstance(raw, dict) else {}
+    checkpoint = Path(opts.get("checkpoint") or path.with_name(path.stem + ".state.json"))
+    return Plan(steps=steps, concurrency=int(opts.get("concurrency", 4)), checkpoint=checkpoint)
+
+
+def _validate(steps: list[Step]) -> None:
+    ids = [s.id for s in steps]
+    if len(ids) != len(set(ids)):
+        raise ValueError("Duplicate step ids in plan")
+    known = set(ids)
+    for s in steps:
+        for dep in s.after:
+            if dep not in known:
+                raise ValueError(f"Step {s.id!r} depends on unknown step {dep!r}")
+        if s.project != LOCAL_PROJECT and s.project not in PROJECTS:
+            raise ValueError(f"Step {s.id!r}: unknown project {s.project!r}")
+
+    # Kahn: проверка на циклы
+    indeg = {s.id: len(s.after) for s in steps}
+    children: dict[str, list[str]] = {s.id: [] for s in steps}
+    for s in steps:
+        for dep in s.after:
+            children[dep].append(s.id)
+    queue = [sid for sid, d in indeg.items() if d == 0]
+    seen = 0
+    while queue:
+        sid = queue.pop()
+        seen += 1
+        for c in children[sid]:
+            indeg[c] -= 1
+            if indeg[c] == 0:
+                queue.append(c)
+    if seen != len(steps):
+        raise ValueError("Plan has a dependency cycle")
+
+
+class Checkpoint:
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.state: dict[str, dict[str, Any]] = {}
+        if path.exists():
+            self.state = json.loads(path.read_text(encoding="utf-8"))
+
+    def is_done(self, step_id: str) -> bool:
+        return self.state.get(step_id, {}).get("status") == "done"
+
+    def mark(self, step_id: str, result: dict[str, Any]) -> None:
+        self.state[step_id] = result
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self.state, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+class ProjectWorker:
+    # Один процесс на проект: шаги идут в него JSON-строками через stdin/stdout.
+
+    def __init__(self, name: str):
+        self.name = name
+        self.proc: asyncio.subprocess.Process | None = None
+        self._futures: dict[str, asyncio.Future] = {}
+        self._reader: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        cwd, main = PROJECTS[self.name]
+        self.proc = await asyncio.create_subprocess_exec(
+            sys.executable, main, "serve",
+            cwd=str(cwd),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        self._reader = asyncio.create_task(self._read_loop())
+
+    async def _read_loop(self) -> None:
+        assert self.proc and self.proc.stdout
+        while True:
+            line = await self.proc.stdout.readline()
+            if not line:
+                break
+            msg = json.loads(line)
+            fut = self._futures.pop(msg.get("id"), None)
+            if fut and not fut.done():
+                fut.set_result(msg)
+        for fut in self._futures.values():
+            if not fut.done():
+                fut.set_exception(RuntimeError(f"worker {self.name} exited"))
+
+    async def execute(self, step: Step) -> dict[str, Any]:
+        if self.proc is None:
+            await self.start()
+        assert self.proc and self.proc.stdin
+        fut = asyncio.get_running_loop().create_future()
+        self._futures[step.id] = fut
+        self.proc.stdin.write((json.dumps({"id": step.id, "argv": step.argv()}) + "\n").encode())
+        await self.proc.stdin.drain()
+        msg = await fut
+        if msg.get("error"):
+            raise RuntimeError(msg["error"])
+        return {"tx": msg.get("tx"), "receipt_status": msg.get("status")}
+
+    async def close(self) -> None:
+        if self.proc is None:
+            return
+        if self.proc.stdin:
+            self.proc.stdin.close()
+        await self.proc.wait()
+        if self._reader:
+            await self._reader
+
+
+Executor = Callable[[Step], Awaitable[dict[str, Any]]]
+
+
+class PlanRunner:
+
+    def __init__(self, plan: Plan, execute_local: Executor):
+        self.plan = plan
+        self.execute_local = execute_local
+        self.checkpoint = Checkpoint(plan.checkpoint)
+        self.workers: dict[str, ProjectWorker] = {}
+
+    async def _execute(self, step: Step) -> dict[str, Any]:
+        if step.project == LOCAL_PROJECT:
+            return await self.execute_local(step)
+        w = self.workers.get(step.project)
+        if w is None:
+            w = self.workers[step.project] = ProjectWorker(step.project)
+        return await w.execute(step)
+
+    async def run(self) -> bool:
+        sem = asyncio.Semaphore(max(1, self.plan.concurrency))
+        tasks: dict[str, asyncio.Task] = {}
+
+        async def run_step(step: Step) -> bool:
+            if self.checkpoint.is_done(step.id):
+                print(f"[plan] {step.id}: already done, skip")
+                return True
+            for dep in step.after:
+                if not await tasks[dep]:
+                    print(f"[plan] {step.id}: skipped (dependency {dep} failed)")
+                    return False
+
+            async with sem:
+                print(f"[plan] {step.id}: {step.project} {' '.join(step.argv())}")
+                t0 = time.perf_counter()
+                try:
+                    result = await self._execute(step)
+                except Exception as e:
+                    print(f"[plan] {step.id}: FAILED {e}")
+                    self.checkpoint.mark(step.id, {"status": "failed", "error": str(e)})
+                    return False
+
+            ok = result.get("receipt_status") == 1
+            result["status"] = "done" if ok else "failed"
+            result["elapsed"] = round(time.perf_counter() - t0, 3)
+            self.checkpoint.mark(step.id, result)
+            print(f"[plan] {step.id}: {result['status']} tx={result.get('tx')} ({result['elapsed']}s)")
+            return ok
+
+        # порядок создания задач не важен: зависимости ждут друг друга через tasks
+        for step in self.plan.steps:
+            tasks[step.id] = asyncio.create_task(run_step(step))
+        try:
+            results = await asyncio.gather(*tasks.values())
+        finally:
+            for w in self.workers.values():
+                await w.close()
+
+        done = sum(1 for r in results if r)
+        print(f"[plan] finished: {done}/{len(results)} steps ok, checkpoint={self.plan.checkpoint}")
+        return all(results)
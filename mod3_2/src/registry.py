@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import importlib
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from .startup import StartupProfile
+
+# Этот модуль не должен импортировать web3 / адаптеры на уровне модуля:
+# адаптер подгружается только когда выбрана его команда.
+
+SYNC_TEMPLATE_USDCE_TO_ETH = "0xdf0c47e4bf5fd96a4a03f9777e5b91ced2bcfa43a8ad08141346d8041900782e"
+
+
+@dataclass(frozen=True)
+class Command:
+    name: str
+    module: str
+    cls: str
+    method: str
+    # команда принимает --all (тогда --amount не обязателен)
+    all_flag: bool = False
+    # (имя класса шаблона в модуле адаптера, kwargs)
+    template: Optional[tuple[str, dict[str, Any]]] = None
+    # доп. kwargs для конструктора адаптера
+    ctor_kwargs: dict[str, Any] = field(default_factory=dict)
+    # входной и выходной актив (имя в src/tokens.py или ETH) и имя константы
+    # спендера в модуле адаптера, если команда делает approve (src/twap.py)
+    token_in: str = "USDC_E"
+    token_out: str = "ETH"
+    spender: Optional[str] = None
+
+
+COMMANDS: dict[str, Command] = {
+    c.name: c
+    for c in [
+        Command("koi_usdc_e_to_eth", "src.koi_zksync", "KoiFinance", "swap_usdc_e_to_eth"),
+        Command("koi_eth_to_usdc_e", "src.koi_zksync", "KoiFinance", "swap_eth_to_usdc_e",
+                token_in="ETH", token_out="USDC_E"),
+        Command("eth_to_usdt", "src.spacefi", "SpaceFi", "eth_to_usdt", token_in="ETH", token_out="USDT"),
+        Command("usdc_e_to_eth", "src.spacefi", "SpaceFi", "usdc_e_to_eth", all_flag=True, spender="SPACEFI_ROUTER"),
+        Command("mav_usdc_e_to_eth", "src.maverick", "Maverick", "usdc_e_to_eth", all_flag=True,
+                spender="MAVERICK_ROUTER"),
+        Command("mav_usdc_e_to_mav", "src.maverick", "Maverick", "usdc_e_to_mav", all_flag=True,
+                token_out="MAV", spender="MAVERICK_ROUTER"),
+        Command(
+            "sync_usdc_e_to_eth", "src.syncswap_zksync", "SyncSwap", "swap_usdc_e_to_eth", all_flag=True,
+            template=("SyncSwapTemplate", {"tx_hash": SYNC_TEMPLATE_USDCE_TO_ETH}),
+        ),
+    ]
+}
+
+
+def get_command(name: str) -> Command:
+    try:
+        return COMMANDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown command: {name}") from None
+
+
+def load_module(cmd: Command, profile: StartupProfile | None = None):
+    if profile is None:
+        return importlib.import_module(cmd.module)
+    with profile.phase(f"import {cmd.module}"):
+        return importlib.import_module(cmd.module)
+
+
+def build_adapter(client, cmd: Command, profile: StartupProfile | None = None):
+    module = load_module(cmd, profile)
+    profile = profile or StartupProfile()
+    with profile.phase(f"init {cmd.cls}"):
+        kwargs = dict(cmd.ctor_kwargs)
+        if cmd.template is not None:
+            tcls, tkw = cmd.template
+            kwargs["template"] = getattr(module, tcls)(**tkw)
+        return getattr(module, cmd.cls)(client, **kwargs)
+
+
+def verify_contracts(shared, chain_id: int, cmd: Command, profile: StartupProfile | None = None) -> int:
+    # адреса, объявленные модулем адаптера (CONTRACTS), проверяются параллельно
+    module = load_module(cmd)
+    profile = profile or StartupProfile()
+    with profile.phase("verify contracts"):
+        return shared.verified.validate_all(shared.w3, chain_id, getattr(module, "CONTRACTS", ()))
+
+
+async def call_adapter(adapter, cmd: Command, amount: str | None, slippage: float, all_balance: bool = False) -> str:
+    method = getattr(adapter, cmd.method)
+    if cmd.all_flag:
+        return await method(amount, slippage, is_all_balance=all_balance)
+    return await method(amount, slippage)
+
+
+async def run_command(
+    client,
+    name: str,
+    amount: str | None,
+    slippage: float,
+    all_balance: bool = False,
+    profile: StartupProfile | None = None,
+) -> str:
+    cmd = get_command(name)
+    adapter = build_adapter(client, cmd, profile)
+    return await call_adapter(adapter, cmd, amount, slippage, all_balance)
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import math
+import threading
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from web3.exceptions import TransactionNotFound
+
+
+@dataclass
+class BumpPolicy:
+    # сколько ждать до первой (и каждой следующей) замены
+    stuck_after: float = 30.0
+    poll_interval: float = 2.0
+    # минимальный шаг замены в узле (geth txpool: +10%)
+    bump_pct: float = 10.0
+    # бюджет: потолок gasPrice и число замен на одну tx
+    max_gas_price: Optional[int] = None
+    max_bumps: int = 5
+
+
+@dataclass
+class InFlight:
+    tx: dict[str, Any]
+    hashes: list[str]
+    intent: Optional[str] = None
+    step_key: Optional[str] = None
+    bumps: int = 0
+
+
+class ReplacementEngine:
+    # Следит за отправленными tx: заменяет недооцененные тем же nonce с
+    # повышенной ценой газа и закрывает дыры в nonce cancel-транзакциями.
+
+    def __init__(self, client, policy: BumpPolicy):
+        self.client = client
+        self.policy = policy
+        self._lock = threading.Lock()
+        # nonce -> семейство замен
+        self.inflight: dict[int, InFlight] = {}
+
+    def track(self, tx: dict[str, Any], tx_hash: str, intent: Optional[str], step_key: Optional[str]) -> None:
+        with self._lock:
+            cur = self.inflight.get(tx["nonce"])
+            if cur is None:
+                self.inflight[tx["nonce"]] = InFlight(dict(tx), [tx_hash], intent, step_key)
+            else:
+                cur.tx = dict(tx)
+                cur.hashes.append(tx_hash)
+
+    def family(self, tx_hash: str) -> Optional[InFlight]:
+        h = tx_hash.lower()
+        with self._lock:
+            for f in self.inflight.values():
+                if h in f.hashes:
+                    return f
+        return None
+
+    def settle(self, nonce: int, mined_hash: str) -> None:
+        with self._lock:
+            f = self.inflight.pop(nonce, None)
+        journal = self.client.journal
+        if f is None or journal is None:
+            return
+        for h in f.hashes:
+            if h != mined_hash.lower():
+                journal.record_status(h, "replaced")
+
+    def find_receipt(self, f: InFlight) -> Optional[dict[str, Any]]:
+        w3 = self.client._require_w3()
+        for h in reversed(f.hashes):
+            try:
+                r = w3.eth.get_transaction_receipt(h)
+            except TransactionNotFound:
+                continue
+            if r is not None:
+                return dict(r)
+        return None
+
+    def _bumped_price(self, old: int, market: int) -> Optional[int]:
+        need = int(math.ceil(old * (1 + self.policy.bump_pct / 100))) + 1
+        new = max(need, market)
+        cap = self.policy.max_gas_price
+        if cap is not None and new > cap:
+            # в бюджет не укладываемся с минимальным шагом — узел отклонит замену
+            return None if need > cap else cap
+        return new
+
+    def maybe_bump(self, f: InFlight) -> Optional[str]:
+        w3 = self.client._require_w3()
+        if f.bumps >= self.policy.max_bumps:
+            return None
+
+        market = int(w3.eth.gas_price)
+        # zkSync 0x71 (ZkProfile.eip712): цена в maxFeePerGas
+        key = "maxFeePerGas" if "maxFeePerGas" in f.tx else "gasPrice"
+        old = int(f.tx[key])
+        if market <= old:
+            # цена в рынке, значит tx ждет предыдущий nonce
+            self.fill_nonce_gaps(upto=f.tx["nonce"])
+            return None
+
+        new_price = self._bumped_price(old, market)
+        if new_price is None:
+            print(f"[replace] nonce={f.tx['nonce']}: fee budget exhausted (market={market})")
+            return None
+
+        tx = dict(f.tx)
+        tx[key] = new_price
+        tip = ""
+        if "maxPriorityFeePerGas" in tx:
+            # узел требует шаг и по priority fee: тот же множитель, не выше нового maxFeePerGas
+            old_tip = int(tx["maxPriorityFeePerGas"])
+            tx["maxPriorityFeePerGas"] = min(-(-old_tip * new_price // old) if old else old_tip, new_price)
+            tip = f", maxPriorityFeePerGas {old_tip} -> {tx['maxPriorityFeePerGas']}"
+        f.bumps += 1
+        print(f"[replace] nonce={tx['nonce']}: {key} {old} -> {new_price}{tip} (market={market}, bump #{f.bumps})")
+        try:
+            return self.client._broadcast(tx, f.intent, f.step_key, fresh_nonce=False)
+        except Exception as e:
+            # например, исходная tx уже в блоке ("nonce too low")
+            print(f"[replace] nonce={tx['nonce']}: replacement rejected: {e}")
+            return None
+
+    def fill_nonce_gaps(self, upto: Optional[int] = None) -> list[str]:
+        # nonce между подтвержденным и нашими висящими tx, которых нет в сети,
+        # закрываем нулевым переводом самому себе
+        w3 = self.client._require_w3()
+        address = self.client.address
+        # pending-счетчик узла останавливается на первой дыре
+        first_free = int(w3.eth.get_transaction_count(address, "pending"))
+
+        with self._lock:
+            known = set(self.inflight)
+        if self.client.journal is not None:
+            known |= {e.nonce for e in self.client.journal.pending(self.client.chain_id, address) if e.nonce is not None}
+        if not known:
+            return []
+        top = max(known) if upto is None else upto
+
+        sent = []
+        for n in range(first_free, top):
+            if n in known:
+                continue
+            try:
+                sent.append(self.cancel(n))
+            except Exception as e:
+                print(f"[replace] cancel for nonce {n} failed: {e}")
+        return sent
+
+    def cancel(self, nonce: int) -> str:
+        w3 = self.client._require_w3()
+        address = self.client.address
+        market = int(w3.eth.gas_price)
+        tx = {
+            "chainId": self.client.chain_id,
+            "from": address,
+            "to": address,
+            "value": 0,
+            "data": "0x",
+            "nonce": nonce,
+            "gasPrice": self._bumped_price(market, market) or market,
+        }
+        tx["gas"] = int(w3.eth.estimate_gas({k: v for k, v in tx.items() if k != "nonce"}) * 1.15)
+        print(f"[replace] nonce gap at {nonce}: sending cancel tx")
+        return self.client._broadcast(tx, None, None, fresh_nonce=False)
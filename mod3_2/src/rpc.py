@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import itertools
+from typing import Any, Callable
+
+import requests
+from web3.providers.rpc import HTTPProvider
+
+# layer(next_call, method, params) -> response
+Layer = Callable[[Callable[[str, Any], Any], str, Any], Any]
+
+
+class RpcProvider(HTTPProvider):
+    # HTTPProvider с цепочкой слоев вокруг make_request: через него проходит
+    # каждый запрос клиента, включая contract.functions.x().call() адаптеров.
+
+    def __init__(self, endpoint_uri: str, request_kwargs: dict[str, Any] | None = None):
+        super().__init__(endpoint_uri, request_kwargs=request_kwargs)
+        self.layers: list[Layer] = []
+        self._batch_ids = itertools.count(1)
+
+    def add_layer(self, layer: Layer) -> None:
+        self.layers.append(layer)
+
+    def make_request(self, method, params):
+        call = super().make_request
+        for layer in reversed(self.layers):
+            call = _bind(layer, call)
+        return call(method, params)
+
+    def batch(self, calls: list[tuple[str, list[Any]]]) -> list[dict[str, Any]]:
+        # один HTTP-запрос с JSON-RPC batch; ответы в порядке calls
+        if not calls:
+            return []
+        ids = [next(self._batch_ids) for _ in calls]
+        body = [{"jsonrpc": "2.0", "id": i, "method": m, "params": p} for i, (m, p) in zip(ids, calls)]
+        kwargs = dict(self.get_request_kwargs())
+        kwargs.setdefault("timeout", 30)
+        r = requests.post(self.endpoint_uri, json=body, **kwargs)
+        r.raise_for_status()
+        data = r.json()
+        if not isinstance(data, list):
+            raise RuntimeError(f"batch request failed: {data}")
+        by_id = {x.get("id"): x for x in data}
+        return [by_id.get(i, {"error": {"message": "missing in batch response"}}) for i in ids]
+
+
+def _bind(layer: Layer, nxt: Callable[[str, Any], Any]) -> Callable[[str, Any], Any]:
+    def call(method, params):
+        return layer(nxt, method, params)
+
+    return call
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import multiprocessing as mp
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from multiprocessing.managers import BaseManager
+from typing import Any, Optional
+
+from eth_account import Account
+
+from .wallets import WalletResult, run_wallets
+
+
+class RateBudget:
+    # Token bucket на каждый RPC endpoint, общий для всех процессов.
+    # Живет в процессе менеджера, воркеры обращаются к нему через прокси.
+
+    def __init__(self, rates: dict[str, float], burst: float = 1.0):
+        self.rates = dict(rates)
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._tokens: dict[str, float] = {}
+        self._at: dict[str, float] = {}
+        self.used: dict[str, int] = {}
+
+    def reserve(self, endpoint: str, n: int = 1) -> float:
+        # забирает n токенов сразу; возвращает, сколько секунд подождать до их появления
+        rate = self.rates.get(endpoint)
+        with self._lock:
+            self.used[endpoint] = self.used.get(endpoint, 0) + n
+            if not rate:
+                return 0.0
+            now = time.monotonic()
+            cap = max(rate * self.burst, n)
+            tokens = self._tokens.get(endpoint, cap)
+            tokens = min(cap, tokens + (now - self._at.get(endpoint, now)) * rate)
+            tokens -= n
+            self._tokens[endpoint] = tokens
+            self._at[endpoint] = now
+            return max(0.0, -tokens / rate)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self.used)
+
+
+class BudgetManager(BaseManager):
+    pass
+
+
+BudgetManager.register("RateBudget", RateBudget)
+
+
+class BudgetLayer:
+    # слой RpcProvider: перед каждым запросом берем токен из общего бюджета.
+    # Токены берутся пачками по chunk, чтобы не ходить в менеджер на каждый запрос.
+
+    def __init__(self, budget, endpoint: str, chunk: int = 4):
+        self.budget = budget
+        self.endpoint = endpoint
+        self.chunk = max(1, chunk)
+        self._lock = threading.Lock()
+        self._left = 0
+
+    def __call__(self, nxt, method, params):
+        with self._lock:
+            if self._left == 0:
+                delay = self.budget.reserve(self.endpoint, self.chunk)
+                self._left = self.chunk
+            else:
+                delay = 0.0
+            self._left -= 1
+        if delay:
+            time.sleep(delay)
+        return nxt(method, params)
+
+
+async def _run_shard(factory, argv, keys, concurrency, budget, chunk) -> list[dict[str, Any]]:
+    job, shared = factory(argv)
+    if budget is not None:
+        shared.provider.add_layer(BudgetLayer(budget, shared.provider.endpoint_uri, chunk))
+    results = await run_wallets(keys, job, concurrency)
+    return [asdict(r) for r in results]
+
+
+def split(keys: list[str], n: int) -> list[list[str]]:
+    # кошелек целиком в одном шарде: порядок его шагов сохраняется
+    n = max(1, min(n, len(keys)))
+    return [keys[i::n] for i in range(n)]
+
+
+def run_sharded(
+    job_ref: str,
+    argv: list[str],
+    keys: list[str],
+    processes: int,
+    concurrency: int,
+    rates: dict[str, float],
+    chunk: int = 4,
+) -> tuple[list[WalletResult], dict[str, int]]:
+    # job_ref = "module:factory"; factory(argv) -> (job(key), SharedRpc) в процессе воркера
+    ctx = mp.get_context("spawn")
+    manager = BudgetManager(ctx=ctx)
+    manager.start()
+    try:
+        budget = manager.RateBudget(rates)
+        shards = split(keys, processes)
+        per_shard = max(1, concurrency // len(shards))
+        with ProcessPoolExecutor(max_workers=len(shards), mp_context=ctx) as pool:
+            futs = [
+                pool.submit(_shard_entry, job_ref, argv, shard, per_shard, budget, chunk)
+                for shard in shards
+            ]
+            results: list[WalletResult] = []
+            for f, shard in zip(futs, shards):
+                try:
+                    results += [WalletResult(**r) for r in f.result()]
+                except Exception as e:
+                    # упал весь процесс-шард: все его кошельки считаем неуспешными
+                    results += [WalletResult(Account.from_key(k).address, False, error=f"shard failed: {e}")
+                                for k in shard]
+        return results, budget.stats()
+    finally:
+        manager.shutdown()
+
+
+def _shard_entry(job_ref: str, argv: list[str], keys: list[str], concurrency: int,
+                 budget: Optional[Any], chunk: int) -> list[dict[str, Any]]:
+    # прокси бюджета передается в процесс как есть (pickle переподключает его к менеджеру)
+    module, name = job_ref.split(":")
+    factory = getattr(importlib.import_module(module), name)
+    return asyncio.run(_run_shard(factory, argv, keys, concurrency, budget, chunk))
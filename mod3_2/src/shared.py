@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from typing import Any
+
+from web3 import Web3
+
+from .broadcast import Broadcaster
+from .callcache import CallCache
+from .coalesce import Coalescer
+from .limiter import LimiterLayer, limiter_for
+from .rpc import RpcProvider
+from .simulate import simulation_layer
+from .verified import ContractRegistry
+from .wallets import ContractCache, TtlValue
+from .zkfee import ZkFeeEstimator
+
+
+class FeeOracle(TtlValue):
+    # gasPrice с коротким TTL: сотни кошельков не дергают eth_gasPrice на каждую tx
+
+    def __init__(self, w3: Web3, ttl: float = 2.0):
+        super().__init__(lambda: int(w3.eth.gas_price), ttl)
+
+    def gas_price(self, fresh: bool = False) -> int:
+        return self.get(fresh)
+
+
+class SharedRpc:
+    # Общие для всех кошельков ресурсы одного RPC: провайдер (пул соединений и
+    # слои), оракул цены газа и кэш контрактов.
+
+    def __init__(self, rpc_url: str, proxy: str | None = None, timeout: int = 60,
+                 broadcast: list[str] | None = None, limits: dict | None = None, cache_mb: float = 32,
+                 verified: ContractRegistry | None = None, zk_fee_ttl: float = 30.0):
+        request_kwargs: dict[str, Any] = {"timeout": timeout}
+        if proxy:
+            request_kwargs["proxies"] = {"http": proxy, "https": proxy}
+
+        self.rpc_url = rpc_url
+        self.provider = RpcProvider(rpc_url, request_kwargs=request_kwargs)
+        self.provider.add_layer(simulation_layer)
+        # eth_call в пределах одного блока не повторяем
+        self.calls = CallCache(max_bytes=int(cache_mb * 2**20))
+        self.provider.add_layer(self.calls)
+        # одинаковые чтения в полете от разных задач/кошельков — один запрос в сеть
+        self.coalescer = Coalescer()
+        self.provider.add_layer(self.coalescer)
+        # лимитер — последний слой, ближе всего к сети: кэши и слияние запросов идут до него
+        limits = dict(limits or {})
+        retries = limits.pop("retries", 4)
+        self.limiter = limiter_for(rpc_url, **limits)
+        self.provider.add_layer(LimiterLayer(self.limiter, retries))
+        if hasattr(self.provider, "exception_retry_configuration"):
+            # web3 v7+: свои повторы без jitter и мимо лимитера — выключаем
+            self.provider.exception_retry_configuration = None
+        self.w3 = Web3(self.provider)
+        self.fees = FeeOracle(self.w3)
+        self.contracts = ContractCache(self.w3.eth.contract)
+        # zkSync: zks_estimateFee по форме маршрута (используется с ZkProfile клиента)
+        self.zk_fees = ZkFeeEstimator(self.w3, ttl=zk_fee_ttl)
+        # адреса роутеров/пар/токенов, код которых уже проверен
+        self.verified = verified or ContractRegistry()
+        # raw tx рассылаются во все узлы из списка (основной тоже в нем)
+        self.broadcaster = Broadcaster([rpc_url] + list(broadcast), proxy, limits=limits) if broadcast else None
+        self._connected = False
+
+    def connect(self) -> None:
+        if self._connected:
+            return
+        if not self.w3.is_connected():
+            raise RuntimeError(f"RPC not connected: {self.rpc_url}")
+        self._connected = True
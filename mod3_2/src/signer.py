@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import rlp
+from eth_account import Account
+from eth_utils import keccak
+
+from .zkfee import EIP712_TX_TYPE, eip712_digest, eip712_tx_hash, serialize_eip712
+
+try:
+    # нативный secp256k1 (libsecp256k1); cffi отпускает GIL — потоки подписывают параллельно
+    import coincurve
+except ImportError:  # pragma: no cover
+    coincurve = None
+
+HAS_NATIVE = coincurve is not None
+
+
+@dataclass
+class SignedTx:
+    raw: bytes
+    hash: str
+    nonce: int
+
+
+def _to_bytes(x: Any) -> bytes:
+    if x is None:
+        return b""
+    if isinstance(x, (bytes, bytearray)):
+        return bytes(x)
+    s = str(x)
+    return bytes.fromhex(s[2:] if s.startswith("0x") else s)
+
+
+def _key_bytes(private_key: Any) -> bytes:
+    return _to_bytes(private_key).rjust(32, b"\x00")
+
+
+def _sign_legacy_native(tx: dict[str, Any], key: bytes) -> SignedTx:
+    # EIP-155 legacy tx напрямую через coincurve: без валидации и сериализаторов eth_account
+    chain_id = int(tx["chainId"])
+    fields = [
+        int(tx["nonce"]),
+        int(tx["gasPrice"]),
+        int(tx["gas"]),
+        _to_bytes(tx.get("to")),
+        int(tx.get("value", 0)),
+        _to_bytes(tx.get("data") or "0x"),
+    ]
+    sighash = keccak(rlp.encode(fields + [chain_id, 0, 0]))
+    sig = coincurve.PrivateKey(key).sign_recoverable(sighash, hasher=None)
+    r, s, recid = int.from_bytes(sig[:32], "big"), int.from_bytes(sig[32:64], "big"), sig[64]
+    raw = rlp.encode(fields + [recid + 35 + 2 * chain_id, r, s])
+    return SignedTx(raw, "0x" + keccak(raw).hex(), int(tx["nonce"]))
+
+
+def _sign_eip712(tx: dict[str, Any], private_key: Any) -> SignedTx:
+    # zkSync 0x71: подпись EIP-712 digest, сериализация своя (eth_account ее не знает)
+    digest = eip712_digest(tx)
+    v, r, s = _sign_hash(digest, private_key)
+    return SignedTx(serialize_eip712(tx, v, r, s), eip712_tx_hash(digest, v, r, s), int(tx["nonce"]))
+
+
+def _sign_tx(tx: dict[str, Any], private_key: Any) -> SignedTx:
+    # верхний уровень модуля: функция должна пикливаться для process pool
+    if tx.get("type") == EIP712_TX_TYPE:
+        return _sign_eip712(tx, private_key)
+    legacy = "gasPrice" in tx and tx.get("type") in (None, 0, "0x0")
+    if HAS_NATIVE and legacy:
+        return _sign_legacy_native(tx, _key_bytes(private_key))
+    tx = {k: v for k, v in tx.items() if k != "from"}
+    signed = Account.sign_transaction(tx, private_key)
+    # web3.py v6+: raw_transaction (а не rawTransaction)
+    raw = getattr(signed, "rawTransaction", None) or getattr(signed, "raw_transaction", None)
+    h = signed.hash.hex()
+    return SignedTx(bytes(raw), h if h.startswith("0x") else "0x" + h, int(tx["nonce"]))
+
+
+def _sign_hash(digest: bytes, private_key: Any) -> tuple[int, bytes, bytes]:
+    if HAS_NATIVE:
+        sig = coincurve.PrivateKey(_key_bytes(private_key)).sign_recoverable(digest, hasher=None)
+        return sig[64] + 27, sig[:32], sig[32:64]
+    if hasattr(Account, "signHash"):
+        signed = Account.signHash(digest, private_key=private_key)
+    else:
+        signed = Account._sign_hash(digest, private_key=private_key)
+    return signed.v, int(signed.r).to_bytes(32, "big"), int(signed.s).to_bytes(32, "big")
+
+
+_POOLS: dict[str, Executor] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def shared_pool(kind: str, workers: Optional[int] = None) -> Optional[Executor]:
+    # один пул на процесс для всех кошельков; "inline" — подписывать в вызывающем потоке
+    if kind == "inline":
+        return None
+    if kind == "auto":
+        # без нативного бэкенда подпись держит GIL — нужны процессы
+        kind = "thread" if HAS_NATIVE else "process"
+    with _POOLS_LOCK:
+        pool = _POOLS.get(kind)
+        if pool is None:
+            n = workers or os.cpu_count() or 1
+            if kind == "thread":
+                pool = ThreadPoolExecutor(max_workers=n, thread_name_prefix="signer")
+            elif kind == "process":
+                pool = ProcessPoolExecutor(max_workers=n, mp_context=mp.get_context("spawn"))
+            else:
+                raise ValueError(f"unknown signer pool: {kind}")
+            _POOLS[kind] = pool
+        return pool
+
+
+class Signer:
+    # Подпись tx и хешей (permit) вне event loop: в пуле потоков/процессов,
+    # через coincurve, если он установлен.
+
+    def __init__(self, private_key: Any, pool: str = "auto", workers: Optional[int] = None):
+        self.private_key = private_key
+        self.pool_kind = pool
+        self.workers = workers
+        self.address = Account.from_key(private_key).address
+
+    @property
+    def pool(self) -> Optional[Executor]:
+        return shared_pool(self.pool_kind, self.workers)
+
+    @property
+    def backend(self) -> str:
+        return "coincurve" if HAS_NATIVE else "eth_keys"
+
+    def sign_tx(self, tx: dict[str, Any]) -> SignedTx:
+        return _sign_tx(tx, self.private_key)
+
+    def sign_hash(self, digest: bytes) -> tuple[int, bytes, bytes]:
+        return _sign_hash(digest, self.private_key)
+
+    async def sign_tx_async(self, tx: dict[str, Any]) -> SignedTx:
+        pool = self.pool
+        if pool is None:
+            return self.sign_tx(tx)
+        return await asyncio.get_running_loop().run_in_executor(pool, _sign_tx, dict(tx), self.private_key)
+
+    async def sign_hash_async(self, digest: bytes) -> tuple[int, bytes, bytes]:
+        pool = self.pool
+        if pool is None:
+            return self.sign_hash(digest)
+        return await asyncio.get_running_loop().run_in_executor(pool, _sign_hash, digest, self.private_key)
+
+    def sign_batch(self, txs: list[dict[str, Any]]) -> list[SignedTx]:
+        # заранее подписать пачку (например, варианты с разными nonce/ценой газа)
+        pool = self.pool
+        if pool is None or len(txs) < 2:
+            return [self.sign_tx(tx) for tx in txs]
+        chunk = max(1, len(txs) // ((self.workers or os.cpu_count() or 1) * 4))
+        return list(pool.map(_sign_tx, [dict(tx) for tx in txs], [self.private_key] * len(txs), chunksize=chunk))
+
+    async def sign_batch_async(self, txs: list[dict[str, Any]]) -> list[SignedTx]:
+        pool = self.pool
+        if pool is None:
+            return self.sign_batch(txs)
+        loop = asyncio.get_running_loop()
+        return list(await asyncio.gather(*[
+            loop.run_in_executor(pool, _sign_tx, dict(tx), self.private_key) for tx in txs
+        ]))
@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import contextvars
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+
+from eth_abi import decode as abi_decode
+from eth_abi import encode as abi_encode
+from eth_utils import keccak
+from web3 import Web3
+
+# Активная симуляция текущей задачи/потока. Пока она задана, клиент не
+# отправляет tx, а прогоняет их через eth_call с накопленными state overrides.
+_ACTIVE: contextvars.ContextVar[Optional["Simulation"]] = contextvars.ContextVar("simulation", default=None)
+
+ETH = "ETH"
+MAX_SLOT_PROBE = 128
+
+SEL_APPROVE = bytes.fromhex("095ea7b3")
+SEL_TRANSFER = bytes.fromhex("a9059cbb")
+SEL_DEPOSIT = bytes.fromhex("d0e30db0")
+SEL_WITHDRAW = bytes.fromhex("2e1a7d4d")
+SEL_PAIR_SWAP = bytes.fromhex("022c0d9f")
+SEL_BALANCE_OF = bytes.fromhex("70a08231")
+SEL_ALLOWANCE = bytes.fromhex("dd62ed3e")
+SEL_TOKEN0 = bytes.fromhex("0dfe1681")
+SEL_TOKEN1 = bytes.fromhex("d21220a7")
+
+# UniswapV2-роутеры (SpaceFi, QuickSwap): (сигнатура аргументов, индекс path)
+V2_ROUTER_SWAPS: dict[bytes, tuple[list[str], int]] = {
+    bytes.fromhex("7ff36ab5"): (["uint256", "address[]", "address", "uint256"], 1),             # swapExactETHForTokens
+    bytes.fromhex("18cbafe5"): (["uint256", "uint256", "address[]", "address", "uint256"], 2),  # swapExactTokensForETH
+    bytes.fromhex("38ed1739"): (["uint256", "uint256", "address[]", "address", "uint256"], 2),  # swapExactTokensForTokens
+}
+SEL_SWAP_EXACT_TOKENS_FOR_ETH = bytes.fromhex("18cbafe5")
+
+# Maverick V1 роутер: exactInputSingle -> amountOut; за ETH — multicall(swap на роутер, unwrapWETH9)
+SEL_EXACT_INPUT_SINGLE = bytes.fromhex("a5dcbcdf")
+SEL_UNWRAP_WETH9 = bytes.fromhex("49404b7c")
+SEL_MULTICALL = bytes.fromhex("ac9650d8")
+EXACT_INPUT_SINGLE_PARAMS = "(address,address,address,address,uint256,uint256,uint256,uint256)"
+# SyncSwap роутеры: swap / swapWithPermit (первый аргумент — paths) -> TokenAmount(token, amount)
+SYNCSWAP_SWAPS = {bytes.fromhex(s) for s in ("2cc4081e", "e84d494b", "d7570e45", "7b2151e5", "0ae6a646")}
+
+
+class SimulationError(RuntimeError):
+    pass
+
+
+def current_simulation() -> Optional["Simulation"]:
+    return _ACTIVE.get()
+
+
+def _word(x: int) -> str:
+    return "0x" + int(x).to_bytes(32, "big").hex()
+
+
+def _addr_word(addr: str) -> bytes:
+    return bytes.fromhex(addr[2:].lower().rjust(64, "0"))
+
+
+def _mapping_slot(key: bytes, slot: int, vyper: bool = False) -> str:
+    s = int(slot).to_bytes(32, "big")
+    return "0x" + keccak((s + key) if vyper else (key + s)).hex()
+
+
+def _to_bytes(x: Any) -> bytes:
+    if isinstance(x, (bytes, bytearray)):
+        return bytes(x)
+    s = str(x)
+    return bytes.fromhex(s[2:] if s.startswith("0x") else s)
+
+
+@dataclass
+class SimulatedTx:
+    tx_hash: str
+    to: str
+    selector: str
+    value: int
+    ok: bool
+    output: Any = None
+    error: str | None = None
+    # calldata: по ней набор можно подписать заранее (src/watch.py)
+    data: str = "0x"
+
+
+@dataclass
+class _SlotLayout:
+    slot: int
+    vyper: bool
+
+
+@dataclass
+class Simulation:
+    owner: str
+    # address -> {"stateDiff": {slot: value}}
+    overrides: dict[str, dict[str, Any]] = field(default_factory=dict)
+    txs: list[SimulatedTx] = field(default_factory=list)
+    # token (или ETH) -> чистое изменение баланса owner
+    deltas: dict[str, int] = field(default_factory=dict)
+    _balance_layout: dict[str, _SlotLayout] = field(default_factory=dict)
+    _allowance_layout: dict[str, _SlotLayout] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @contextmanager
+    def activate(self) -> Iterator["Simulation"]:
+        token = _ACTIVE.set(self)
+        try:
+            yield self
+        finally:
+            _ACTIVE.reset(token)
+
+    # ---- provider layer -------------------------------------------------
+
+    def state_override(self) -> dict[str, Any]:
+        with self._lock:
+            return {a: {"stateDiff": dict(o["stateDiff"])} for a, o in self.overrides.items()}
+
+    # ---- raw calls ------------------------------------------------------
+
+    def _call(self, w3: Web3, to: str, data: bytes, value: int = 0, sender: str | None = None,
+              override: dict[str, Any] | None = None) -> bytes:
+        tx = {"from": sender or self.owner, "to": Web3.to_checksum_address(to), "data": "0x" + data.hex()}
+        if value:
+            tx["value"] = hex(int(value))
+        params = [tx, "latest", override if override is not None else self.state_override()]
+        # прямой запрос мимо слоя симуляции: overrides уже в params
+        resp = w3.provider.make_request("eth_call", params)
+        if "error" in resp:
+            err = resp["error"]
+            raise SimulationError(err.get("message", str(err)) if isinstance(err, dict) else str(err))
+        return _to_bytes(resp["result"])
+
+    def _read_u256(self, w3: Web3, to: str, data: bytes) -> int:
+        out = self._call(w3, to, data)
+        return int.from_bytes(out[:32], "big") if out else 0
+
+    # ---- storage slot discovery -----------------------------------------
+
+    def _probe(self, w3: Web3, token: str, call: bytes, key_fn) -> _SlotLayout:
+        # один eth_call на раскладку: все кандидатные слоты сразу с разными маркерами
+        base = 0xC0FFEE << 128
+        for vyper in (False, True):
+            diff = {key_fn(i, vyper): _word(base + i) for i in range(MAX_SLOT_PROBE)}
+            override = self.state_override()
+            merged = dict(override.get(token, {}).get("stateDiff", {}))
+            merged.update(diff)
+            override[token] = {"stateDiff": merged}
+            out = self._call(w3, token, call, override=override)
+            got = int.from_bytes(out[:32], "big") if out else 0
+            if base <= got < base + MAX_SLOT_PROBE:
+                return _SlotLayout(slot=got - base, vyper=vyper)
+        raise SimulationError(f"cannot locate storage slot for {token}")
+
+    def _balance_slot(self, w3: Web3, token: str, holder: str) -> str:
+        layout = self._balance_layout.get(token)
+        key = _addr_word(self.owner)
+        if layout is None:
+            call = SEL_BALANCE_OF + key
+            layout = self._probe(w3, token, call, lambda i, v: _mapping_slot(key, i, v))
+            self._balance_layout[token] = layout
+        return _mapping_slot(_addr_word(holder), layout.slot, layout.vyper)
+
+    def _allowance_slot(self, w3: Web3, token: str, owner: str, spender: str) -> str:
+        layout = self._allowance_layout.get(token)
+        ko, ks = _addr_word(owner), _addr_word(spender)
+        if layout is None:
+            call = SEL_ALLOWANCE + ko + ks
+
+            def key_fn(i: int, vyper: bool) -> str:
+                inner = _mapping_slot(ko, i, vyper)
+                return _mapping_slot(ks, int(inner, 16), vyper)
+
+            layout = self._probe(w3, token, call, key_fn)
+            self._allowance_layout[token] = layout
+        inner = _mapping_slot(ko, layout.slot, layout.vyper)
+        return _mapping_slot(ks, int(inner, 16), layout.vyper)
+
+    def _set_slot(self, token: str, slot: str, value: int) -> None:
+        with self._lock:
+            self.overrides.setdefault(token, {"stateDiff": {}})["stateDiff"][slot] = _word(value)
+
+    # ---- effects --------------------------------------------------------
+
+    def _balance(self, w3: Web3, token: str, holder: str) -> int:
+        return self._read_u256(w3, token, SEL_BALANCE_OF + _addr_word(holder))
+
+    def _add_balance(self, w3: Web3, token: str, holder: str, delta: int) -> None:
+        token = Web3.to_checksum_address(token)
+        cur = self._balance(w3, token, holder)
+        self._set_slot(token, self._balance_slot(w3, token, holder), max(cur + delta, 0))
+        if holder.lower() == self.owner.lower():
+            self._track(token, delta)
+
+    def _track(self, asset: str, delta: int) -> None:
+        self.deltas[asset] = self.deltas.get(asset, 0) + int(delta)
+
+    def _debit_input(self, w3: Web3, token: str, amount: int, value: int) -> None:
+        if value:
+            self._track(ETH, -value)
+        else:
+            self._add_balance(w3, token, self.owner, -amount)
+
+    @staticmethod
+    def _syncswap_inputs(args: bytes) -> list[tuple[str, int]]:
+        # paths[i] = SwapPath(steps, tokenIn, amountIn); шаги (формат зависит от версии роутера) не читаем
+        def word(b: bytes, off: int) -> int:
+            return int.from_bytes(b[off: off + 32], "big")
+
+        blob = args[word(args, 0):]
+        out = []
+        for i in range(word(blob, 0)):
+            el = 32 + word(blob, 32 + 32 * i)
+            out.append((Web3.to_checksum_address("0x" + blob[el + 44: el + 64].hex()), word(blob, el + 64)))
+        return out
+
+    def _apply_effects(self, w3: Web3, to: str, data: bytes, value: int, ret: bytes) -> Any:
+        sel, args = data[:4], data[4:]
+
+        if sel == SEL_APPROVE:
+            spender, amount = abi_decode(["address", "uint256"], args)
+            self._set_slot(to, self._allowance_slot(w3, to, self.owner, spender), amount)
+            return {"approved": amount}
+
+        if sel == SEL_TRANSFER:
+            dst, amount = abi_decode(["address", "uint256"], args)
+            self._add_balance(w3, to, self.owner, -amount)
+            self._add_balance(w3, to, dst, amount)
+            return {"transferred": amount}
+
+        if sel == SEL_DEPOSIT:
+            self._add_balance(w3, to, self.owner, value)
+            self._track(ETH, -value)
+            return {"wrapped": value}
+
+        if sel == SEL_WITHDRAW:
+            (wad,) = abi_decode(["uint256"], args)
+            self._add_balance(w3, to, self.owner, -wad)
+            self._track(ETH, wad)
+            return {"unwrapped": wad}
+
+        if sel == SEL_PAIR_SWAP:
+            # пара получила токен заранее (transfer выше) — начисляем выход получателю
+            out0, out1, recipient, _ = abi_decode(["uint256", "uint256", "address", "bytes"], args)
+            t0 = "0x" + self._call(w3, to, SEL_TOKEN0)[-20:].hex()
+            t1 = "0x" + self._call(w3, to, SEL_TOKEN1)[-20:].hex()
+            if out0:
+                self._add_balance(w3, t0, recipient, out0)
+            if out1:
+                self._add_balance(w3, t1, recipient, out1)
+            return {"amount0Out": out0, "amount1Out": out1}
+
+        if sel in V2_ROUTER_SWAPS:
+            types, path_idx = V2_ROUTER_SWAPS[sel]
+            decoded = abi_decode(types, args)
+            path = decoded[path_idx]
+            (amounts,) = abi_decode(["uint256[]"], ret)
+            self._debit_input(w3, path[0], amounts[0], value)
+            if sel == SEL_SWAP_EXACT_TOKENS_FOR_ETH:
+                self._track(ETH, amounts[-1])
+            else:
+                self._add_balance(w3, path[-1], self.owner, amounts[-1])
+            return {"amounts": list(amounts)}
+
+        if sel == SEL_EXACT_INPUT_SINGLE:
+            ((token_in, token_out, _, recipient, _, amount_in, _, _),) = abi_decode([EXACT_INPUT_SINGLE_PARAMS], args)
+            (amount_out,) = abi_decode(["uint256"], ret)
+            self._debit_input(w3, token_in, amount_in, value)
+            # получатель — роутер: выход заберет следующий вызов multicall (unwrapWETH9)
+            if recipient.lower() == self.owner.lower():
+                self._add_balance(w3, token_out, self.owner, amount_out)
+            return {"amountOut": amount_out, "recipient": recipient}
+
+        if sel == SEL_MULTICALL:
+            (calls,) = abi_decode(["bytes[]"], args)
+            (rets,) = abi_decode(["bytes[]"], ret)
+            outputs, held = [], 0
+            for i, (c, r) in enumerate(zip(calls, rets)):
+                if c[:4] == SEL_UNWRAP_WETH9:
+                    _, recipient = abi_decode(["uint256", "address"], c[4:])
+                    if recipient.lower() == self.owner.lower():
+                        self._track(ETH, held)
+                    outputs.append({"unwrapped": held})
+                    held = 0
+                    continue
+                # value multicall-а тратит первый swap
+                out = self._apply_effects(w3, to, c, value if i == 0 else 0, r)
+                if isinstance(out, dict) and str(out.get("recipient", "")).lower() == to.lower():
+                    held += out["amountOut"]
+                outputs.append(out)
+            return {"multicall": outputs}
+
+        if sel in SYNCSWAP_SWAPS and len(ret) >= 64:
+            if value:
+                self._track(ETH, -value)
+            else:
+                for token_in, amount_in in self._syncswap_inputs(args):
+                    self._add_balance(w3, token_in, self.owner, -amount_in)
+            token_out, amount_out = abi_decode(["address", "uint256"], ret[:64])
+            # выход (и вывод WETH в ETH) задается в data шагов; считаем его выходом owner
+            self._track(Web3.to_checksum_address(token_out), amount_out)
+            return {"token": token_out, "amountOut": amount_out}
+
+        # неизвестный вызов: отдаем сырой результат
+        if len(ret) == 32:
+            return {"return": int.from_bytes(ret, "big")}
+        return {"return": "0x" + ret.hex()} if ret else None
+
+    # ---- entry points used by the client ---------------------------------
+
+    def execute(self, w3: Web3, to: str, data: Any, value: int = 0) -> str:
+        to = Web3.to_checksum_address(to)
+        raw = _to_bytes(data or "0x")
+        tx_hash = "0x" + keccak(abi_encode(["address", "bytes", "uint256", "uint256"],
+                                           [to, raw, int(value), len(self.txs)])).hex()
+        selector = "0x" + raw[:4].hex()
+        try:
+            ret = self._call(w3, to, raw, value)
+            output = self._apply_effects(w3, to, raw, int(value), ret)
+        except Exception as e:
+            self.txs.append(SimulatedTx(tx_hash, to, selector, int(value), ok=False, error=str(e), data="0x" + raw.hex()))
+            raise SimulationError(f"simulated tx to {to} ({selector}) reverted: {e}") from e
+
+        self.txs.append(SimulatedTx(tx_hash, to, selector, int(value), ok=True, output=output, data="0x" + raw.hex()))
+        return tx_hash
+
+    def receipt(self, tx_hash: str) -> dict[str, Any]:
+        for t in self.txs:
+            if t.tx_hash == tx_hash:
+                return {"transactionHash": tx_hash, "status": 1 if t.ok else 0, "simulated": True}
+        raise SimulationError(f"unknown simulated tx {tx_hash}")
+
+    def report(self) -> str:
+        lines = ["simulation:"]
+        for i, t in enumerate(self.txs, 1):
+            state = "ok" if t.ok else f"REVERT {t.error}"
+            lines.append(f"  {i}. to={t.to} sel={t.selector} value={t.value} {state} {t.output or ''}".rstrip())
+        for asset, d in self.deltas.items():
+            if d:
+                lines.append(f"  delta {asset}: {d:+d}")
+        return "\n".join(lines)
+
+    def native_out(self, weth: str) -> int:
+        # ETH и WETH считаем одним активом при сравнении маршрутов
+        return self.deltas.get(ETH, 0) + self.deltas.get(Web3.to_checksum_address(weth), 0)
+
+
+def simulation_layer(nxt, method, params):
+    sim = current_simulation()
+    if sim is not None and method == "eth_call" and len(params) == 2:
+        params = [params[0], params[1], sim.state_override()]
+    return nxt(method, params)
@@ -9,6 +9,7 @@ from web3 import Web3
 
 from .client import AsyncEvmClient
 from .tokens import balance_of, allowance, encode_approve
+from .verified import ContractCheckError
 
 # SpaceFi Swap
 SPACEFI_ROUTER = "0xbE7D1Fd1F6748BBDefC4fbaCafBb11C6Fc506d1D"  # DEX router
@@ -69,6 +70,9 @@ ROUTER_ABI = [
     },
 ]
 
+# проверяются при старте команды (src/verified.py)
+CONTRACTS = (SPACEFI_ROUTER, WETH, USDT, USDC_E)
+
 
 def to_wei(amount: str, decimals: int) -> int:
 
@@ -100,15 +104,13 @@ class SpaceFi:
         w3 = self._w3()
         router_addr = w3.to_checksum_address(SPACEFI_ROUTER)
 
-        # быстрый sanity-check
-        code = w3.eth.get_code(router_addr)
-        if len(code) == 0:
-            raise RuntimeError(
-                f"SpaceFi router has no code at {router_addr}. "
-                f"Check that you are on zkSync Era RPC (chainId=324)."
-            )
+        # sanity-check по реестру: код скачивается раз в CONTRACT_RECHECK_S, а не на каждый вызов
+        try:
+            self.client.shared.verified.ensure(w3, self.client.chain_id, router_addr)
+        except ContractCheckError as e:
+            raise RuntimeError(f"SpaceFi router: {e}") from e
 
-        return w3.eth.contract(address=router_addr, abi=ROUTER_ABI)
+        return self.client.shared.contracts.contract(address=router_addr, abi=ROUTER_ABI)
 
     def _min_out(self, amount_in_wei: int, path: list[str], slippage: float) -> int:
         w3 = self._w3()
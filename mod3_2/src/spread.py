@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from itertools import combinations
+from decimal import Decimal
+from typing import Any, Callable, Optional
+
+from web3 import Web3
+
+from .koi_zksync import KOI_PAIR
+from .multicall import aggregate
+from .spacefi import SPACEFI_ROUTER
+from .syncswap_pool import PoolInfo, SyncSwapPool
+from .tokens import MAV, USDC_E, USDT, WETH, ZERO
+from .v2quote import amounts_out
+from .watch import WatchedPool, load_pools
+
+# SyncSwap: фабрики классических и стабильных пулов (getPool(tokenA, tokenB))
+SYNCSWAP_CLASSIC_FACTORY = "0xf2DAd89f2788a8CD54625C60b55cD3d2D0ACa7Cb"
+SYNCSWAP_STABLE_FACTORY = "0x5b9f21d407F35b10CbfDDca17D5D84b129356ea3"
+
+SEL_FACTORY = bytes.fromhex("c45a0155")
+SEL_GET_PAIR = bytes.fromhex("e6a43905")
+SEL_GET_POOL = bytes.fromhex("531aa03e")
+
+TOKEN_SYMBOLS = {
+    Web3.to_checksum_address(WETH): "WETH",
+    Web3.to_checksum_address(USDC_E): "USDC_E",
+    Web3.to_checksum_address(USDT): "USDT",
+    Web3.to_checksum_address(MAV): "MAV",
+}
+TOKENS_BY_SYMBOL = {s: a for a, s in TOKEN_SYMBOLS.items()}
+
+KIND_V2 = "v2"
+KIND_SYNCSWAP = "syncswap"
+
+
+@dataclass(frozen=True)
+class Venue:
+    name: str
+    pool: str
+    kind: str
+
+
+def _pair_call(sel: bytes, a: str, b: str) -> bytes:
+    return sel + bytes(12) + bytes.fromhex(a[2:]) + bytes(12) + bytes.fromhex(b[2:])
+
+
+def discover(w3: Web3, tokens: list[str], extra: Optional[dict[str, list[str]]] = None) -> list[Venue]:
+    # пулы всех пар токенов на SpaceFi и SyncSwap одним multicall (фабрика SpaceFi — из роутера),
+    # Koi — известная пара USDC.e/WETH и пулы из extra
+    tokens = sorted(Web3.to_checksum_address(t) for t in tokens)
+    spacefi_factory = Web3.to_checksum_address("0x" + aggregate(w3, [(SPACEFI_ROUTER, SEL_FACTORY)])[0].data[-20:].hex())
+    sources = [
+        ("spacefi", KIND_V2, spacefi_factory, SEL_GET_PAIR),
+        ("syncswap", KIND_SYNCSWAP, SYNCSWAP_CLASSIC_FACTORY, SEL_GET_POOL),
+        ("syncswap-stable", KIND_SYNCSWAP, SYNCSWAP_STABLE_FACTORY, SEL_GET_POOL),
+    ]
+    calls, names = [], []
+    for a, b in combinations(tokens, 2):
+        for name, kind, factory, sel in sources:
+            calls.append((factory, _pair_call(sel, a, b)))
+            names.append((name, kind))
+    venues = []
+    for (name, kind), r in zip(names, aggregate(w3, calls)):
+        addr = Web3.to_checksum_address("0x" + r.data[-20:].hex()) if r.ok and len(r.data) >= 32 else ZERO
+        if addr != ZERO:
+            venues.append(Venue(name, addr, kind))
+
+    pools = {"koi": [KOI_PAIR]}
+    for name, addrs in (extra or {}).items():
+        pools.setdefault(name, []).extend(addrs)
+    for name, addrs in pools.items():
+        for a in addrs:
+            venues.append(Venue(name, Web3.to_checksum_address(a), KIND_SYNCSWAP if name.startswith("syncswap") else KIND_V2))
+    return venues
+
+
+def venues_of(header: dict[str, Any]) -> list[Venue]:
+    # пулы записи spread --record: из заголовка, без discover
+    return [Venue(m["venue"], Web3.to_checksum_address(a), m["kind"]) for a, m in header["pools"].items()]
+
+
+class SpreadMonitor:
+    # Котировки пар токенов по всем DEX из зеркал пулов (резервы из событий Sync).
+    # Новый блок приходит одним запросом (src/watch.py LogSource) при любом числе
+    # пар; пересчитываются только пары, пулы которых получили Sync. Заголовок
+    # записи (header) хранит токены, decimals, info и комиссии пулов SyncSwap:
+    # load(header) проигрывает запись без обращений к узлу.
+
+    def __init__(self, w3: Web3, venues: list[Venue], probes: dict[str, Any], sender: str = ZERO):
+        self.w3 = w3
+        self.venues = {v.pool: v for v in venues}
+        # token -> сумма пробы в единицах токена (не wei)
+        self.probes = {Web3.to_checksum_address(t): Decimal(str(a)) for t, a in probes.items()}
+        self.sender = sender
+        self.pools: dict[str, WatchedPool] = {}
+        self.mirrors: dict[str, SyncSwapPool] = {}
+        # (token0, token1) -> пулы пары
+        self.pairs: dict[tuple[str, str], list[str]] = {}
+        # проигрывание записи: зеркала SyncSwap не сверяются с узлом
+        self.replay = False
+
+    def _from_header(self, header: dict[str, Any]) -> tuple[int, dict[str, WatchedPool]]:
+        head = header["block"]
+        pools = {}
+        for addr in self.venues:
+            m = header["pools"][addr]
+            r0, r1 = header["reserves"][addr]
+            pools[addr] = WatchedPool(addr, Web3.to_checksum_address(m["token0"]), Web3.to_checksum_address(m["token1"]),
+                                      m["dec0"], m["dec1"], r0, r1, head)
+        return head, pools
+
+    def load(self, header: Optional[dict[str, Any]] = None) -> int:
+        self.replay = header is not None
+        head, self.pools = self._from_header(header) if self.replay else load_pools(self.w3, list(self.venues))
+        for addr, p in self.pools.items():
+            self.pairs.setdefault((p.token0, p.token1), []).append(addr)
+            if self.venues[addr].kind != KIND_SYNCSWAP:
+                continue
+            if self.replay:
+                meta = header["pools"][addr]
+                info = PoolInfo(addr, meta["pool_type"], p.token0, p.token1, meta["mul0"], meta["mul1"])
+                m = SyncSwapPool(self.w3, addr, self.sender, info=info, fees=meta["fees"])
+            else:
+                m = SyncSwapPool(self.w3, addr, self.sender)
+            m.apply_sync(p.reserve0, p.reserve1, None if self.replay else p.block)
+            self.mirrors[addr] = m
+        # пара с одним пулом спреда не дает
+        self.pairs = {k: v for k, v in self.pairs.items() if len(v) > 1}
+        return head
+
+    def apply(self, logs: list[dict[str, Any]]) -> set[tuple[str, str]]:
+        touched = set()
+        for log in logs:
+            addr = Web3.to_checksum_address(log["address"])
+            p = self.pools.get(addr)
+            if p is None or not p.apply(log):
+                continue
+            m = self.mirrors.get(addr)
+            if m is not None:
+                m.apply_sync(p.reserve0, p.reserve1, None if self.replay else p.block)
+            touched.add((p.token0, p.token1))
+        return {k for k in touched if k in self.pairs}
+
+    def header(self, head: int) -> dict[str, Any]:
+        # первая строка записи: резервы и все, что load(header) иначе читал бы с узла
+        pools = {}
+        for addr, p in self.pools.items():
+            v = self.venues[addr]
+            meta = {"venue": v.name, "kind": v.kind, "token0": p.token0, "token1": p.token1,
+                    "dec0": p.dec0, "dec1": p.dec1}
+            m = self.mirrors.get(addr)
+            if m is not None:
+                meta.update(pool_type=m.info.pool_type, mul0=m.info.mul0, mul1=m.info.mul1,
+                            fees={t: m.swap_fee(t) for t in (p.token0, p.token1)})
+            pools[addr] = meta
+        return {"block": head, "reserves": {a: [p.reserve0, p.reserve1] for a, p in self.pools.items()}, "pools": pools}
+
+    def _quote(self, addr: str, token_in: str, amount: int) -> int:
+        m = self.mirrors.get(addr)
+        if m is not None:
+            return m.quote(token_in, amount)
+        p = self.pools[addr]
+        rin, rout = (p.reserve0, p.reserve1) if token_in == p.token0 else (p.reserve1, p.reserve0)
+        return amounts_out([amount], rin, rout)[0]
+
+    def _base(self, key: tuple[str, str]) -> tuple[str, str, int]:
+        # сторона пары, для которой задана проба; иначе token0 на 1 единицу
+        t0, t1 = key
+        p = self.pools[self.pairs[key][0]]
+        for base, other, dec in ((t0, t1, p.dec0), (t1, t0, p.dec1)):
+            if base in self.probes:
+                return base, other, int(self.probes[base] * 10**dec)
+        return t0, t1, 10**p.dec0
+
+    def pair_update(self, key: tuple[str, str], block: int) -> dict[str, Any]:
+        base, other, amount = self._base(key)
+        first = self.pools[self.pairs[key][0]]
+        dec_in, dec_out = (first.dec0, first.dec1) if base == first.token0 else (first.dec1, first.dec0)
+
+        venues, outs = {}, {}
+        for addr in self.pairs[key]:
+            out = self._quote(addr, base, amount)
+            if out <= 0:
+                continue
+            outs[addr] = out
+            venues[self.venues[addr].name] = {
+                "pool": addr,
+                "out": out,
+                "price": (out / 10**dec_out) / (amount / 10**dec_in),
+            }
+
+        update: dict[str, Any] = {
+            "block": block,
+            "pair": f"{TOKEN_SYMBOLS.get(base, base)}/{TOKEN_SYMBOLS.get(other, other)}",
+            "amount_in": amount,
+            "venues": venues,
+        }
+        if len(outs) < 2:
+            return update
+        prices = [v["price"] for v in venues.values()]
+        update["spread_bps"] = (max(prices) / min(prices) - 1) * 1e4
+        # круг base -> other на одном пуле, other -> base на другом
+        best = None
+        for x, y in ((x, y) for x in outs for y in outs if x != y):
+            back = self._quote(y, other, outs[x])
+            bps = (back / amount - 1) * 1e4
+            if best is None or bps > best[2]:
+                best = (x, y, bps)
+        update["best_round_trip"] = {
+            "buy": self.venues[best[0]].name,
+            "sell": self.venues[best[1]].name,
+            "bps": best[2],
+        }
+        return update
+
+    async def run(self, source, head: int, emit: Callable[[dict[str, Any]], None] | None = None,
+                  min_bps: float = 0.0, max_blocks: int | None = None) -> int:
+        emit = emit or (lambda u: print(json.dumps(u), flush=True))
+        # начальный снимок всех пар
+        for key in self.pairs:
+            emit(self.pair_update(key, head))
+        blocks = 0
+        async for block, logs, _ in source.batches():
+            for key in self.apply(logs):
+                u = self.pair_update(key, block)
+                if u.get("spread_bps", 0.0) >= min_bps:
+                    emit(u)
+            blocks += 1
+            if max_blocks is not None and blocks >= max_blocks:
+                break
+        return blocks
+
+    def report(self) -> str:
+        names = sorted({v.name for a, v in self.venues.items() if a in self.pools})
+        return f"spread: {len(self.pools)} pools ({', '.join(names)}), {len(self.pairs)} pairs"
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class StartupProfile:
+
+    def __init__(self, t0: float | None = None):
+        # t0 = момент старта main (до тяжелых импортов)
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.phases: list[tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def total(self) -> float:
+        return time.perf_counter() - self.t0
+
+    def report(self) -> str:
+        total = self.total()
+        measured = sum(dt for _, dt in self.phases)
+        lines = ["startup profile:"]
+        for name, dt in self.phases:
+            share = dt / total * 100 if total > 0 else 0.0
+            lines.append(f"  {name:<28} {dt * 1000:9.1f} ms  {share:5.1f}%")
+        lines.append(f"  {'other':<28} {(total - measured) * 1000:9.1f} ms")
+        lines.append(f"  {'total':<28} {total * 1000:9.1f} ms")
+        return "\n".join(lines)
+
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from web3 import Web3
+
+# SyncSwap: комиссия в единицах 1e-5 (300 = 0.3%)
+MAX_FEE = 100_000
+POOL_CLASSIC = 1
+POOL_STABLE = 2
+# StableMath: A = 1000, N_A = 2 * A
+STABLE_N_A = 2000
+MAX_LOOP_LIMIT = 256
+# комиссия пула (ее меняет fee manager) и итог сверки с getAmountOut живут столько секунд
+CACHE_TTL = 300.0
+
+POOL_ABI = [
+    {"name": "poolType", "type": "function", "stateMutability": "view", "inputs": [], "outputs": [{"type": "uint16"}]},
+    {"name": "token0", "type": "function", "stateMutability": "view", "inputs": [], "outputs": [{"type": "address"}]},
+    {"name": "token1", "type": "function", "stateMutability": "view", "inputs": [], "outputs": [{"type": "address"}]},
+    {
+        "name": "getReserves",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [],
+        "outputs": [{"name": "reserve0", "type": "uint256"}, {"name": "reserve1", "type": "uint256"}],
+    },
+    {
+        "name": "getSwapFee",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [
+            {"name": "sender", "type": "address"},
+            {"name": "tokenIn", "type": "address"},
+            {"name": "tokenOut", "type": "address"},
+            {"name": "data", "type": "bytes"},
+        ],
+        "outputs": [{"name": "swapFee", "type": "uint24"}],
+    },
+    {
+        "name": "getAmountOut",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [
+            {"name": "tokenIn", "type": "address"},
+            {"name": "amountIn", "type": "uint256"},
+            {"name": "sender", "type": "address"},
+        ],
+        "outputs": [{"name": "amountOut", "type": "uint256"}],
+    },
+    {"name": "token0PrecisionMultiplier", "type": "function", "stateMutability": "view", "inputs": [],
+     "outputs": [{"type": "uint256"}]},
+    {"name": "token1PrecisionMultiplier", "type": "function", "stateMutability": "view", "inputs": [],
+     "outputs": [{"type": "uint256"}]},
+]
+
+
+# ---- pool math (целочисленно, как в контрактах) ---------------------------
+
+def classic_amount_out(amount_in: int, reserve_in: int, reserve_out: int, swap_fee: int) -> int:
+    if amount_in <= 0 or reserve_in <= 0 or reserve_out <= 0:
+        return 0
+    amount_in_with_fee = amount_in * (MAX_FEE - swap_fee)
+    return amount_in_with_fee * reserve_out // (reserve_in * MAX_FEE + amount_in_with_fee)
+
+
+def _within1(a: int, b: int) -> bool:
+    return abs(a - b) <= 1
+
+
+def _compute_d(xp0: int, xp1: int) -> int:
+    s = xp0 + xp1
+    if s == 0:
+        return 0
+    d = s
+    for _ in range(MAX_LOOP_LIMIT):
+        dp = (((d * d) // xp0) * d) // xp1 // 4
+        prev = d
+        d = ((STABLE_N_A * s + 2 * dp) * d) // ((STABLE_N_A - 1) * d + 3 * dp)
+        if _within1(d, prev):
+            break
+    return d
+
+
+def _get_y(x: int, d: int) -> int:
+    c = (d * d) // (x * 2)
+    c = (c * d) // (STABLE_N_A * 2)
+    b = x + d // STABLE_N_A
+    y = d
+    for _ in range(MAX_LOOP_LIMIT):
+        prev = y
+        y = (y * y + c) // (y * 2 + b - d)
+        if _within1(y, prev):
+            break
+    return y
+
+
+def stable_amount_out(amount_in: int, reserve_in: int, reserve_out: int, swap_fee: int,
+                      mul_in: int, mul_out: int) -> int:
+    if amount_in <= 0 or reserve_in <= 0 or reserve_out <= 0:
+        return 0
+    adj_in = reserve_in * mul_in
+    adj_out = reserve_out * mul_out
+    fee_deducted = amount_in - amount_in * swap_fee // MAX_FEE
+    d = _compute_d(adj_in, adj_out)
+    x = adj_in + fee_deducted * mul_in
+    y = _get_y(x, d)
+    if adj_out <= y + 1:
+        return 0
+    return (adj_out - y - 1) // mul_out
+
+
+# ---- pool mirror ---------------------------------------------------------
+
+@dataclass
+class PoolInfo:
+    address: str
+    pool_type: int
+    token0: str
+    token1: str
+    mul0: int = 1
+    mul1: int = 1
+
+
+class SyncSwapPool:
+    # Зеркало пула: статические поля читаются один раз, резервы и комиссия — на
+    # текущий блок (повторные чтения в том же блоке отдает CallCache) или
+    # подставляются из событий Sync через apply_sync(). Первая локальная котировка
+    # по каждому направлению сверяется с getAmountOut пула на том же блоке, что и
+    # резервы (для зеркала — блок последнего Sync); при расхождении пул котируется
+    # только on-chain. Зеркало без блока (проигрывание записи) не сверяется.
+    # Комиссия и итог сверки общие для всех зеркал процесса (ключ — пул, tokenIn,
+    # sender) и перечитываются через CACHE_TTL; info и fees, переданные явно,
+    # не читаются вовсе.
+
+    _INFO: dict[str, PoolInfo] = {}
+    _INFO_LOCK = threading.Lock()
+    _FEES: dict[tuple[str, str, str], tuple[int, float]] = {}
+    _VERIFIED: dict[tuple[str, str, str], tuple[bool, float]] = {}
+
+    def __init__(self, w3: Web3, address: str, sender: str,
+                 info: Optional[PoolInfo] = None, fees: Optional[dict[str, int]] = None):
+        self.w3 = w3
+        self.address = Web3.to_checksum_address(address)
+        self.sender = Web3.to_checksum_address(sender)
+        self.contract = w3.eth.contract(address=self.address, abi=POOL_ABI)
+        self.info = info or self._load_info()
+        # tokenIn -> комиссия, известная заранее (getSwapFee не читается)
+        self.fees = {Web3.to_checksum_address(t): int(f) for t, f in (fees or {}).items()}
+        self.reserves: Optional[tuple[int, int]] = None
+        # True — резервы ведутся событиями Sync, getReserves не нужен
+        self.mirrored = False
+        # блок, на котором верны зеркальные резервы (None — неизвестен)
+        self.block: Optional[int] = None
+
+    def _load_info(self) -> PoolInfo:
+        with self._INFO_LOCK:
+            info = self._INFO.get(self.address)
+        if info is not None:
+            return info
+        f = self.contract.functions
+        info = PoolInfo(
+            address=self.address,
+            pool_type=int(f.poolType().call()),
+            token0=Web3.to_checksum_address(f.token0().call()),
+            token1=Web3.to_checksum_address(f.token1().call()),
+        )
+        if info.pool_type == POOL_STABLE:
+            info.mul0 = int(f.token0PrecisionMultiplier().call())
+            info.mul1 = int(f.token1PrecisionMultiplier().call())
+        with self._INFO_LOCK:
+            self._INFO[self.address] = info
+        return info
+
+    def token_out(self, token_in: str) -> str:
+        t = Web3.to_checksum_address(token_in)
+        if t == self.info.token0:
+            return self.info.token1
+        if t == self.info.token1:
+            return self.info.token0
+        raise ValueError(f"{t} is not in pool {self.address}")
+
+    def refresh(self) -> None:
+        r0, r1 = self.contract.functions.getReserves().call()
+        self.reserves = (int(r0), int(r1))
+
+    def apply_sync(self, reserve0: int, reserve1: int, block: Optional[int] = None) -> None:
+        self.reserves = (int(reserve0), int(reserve1))
+        self.mirrored = True
+        self.block = block
+
+    def _cached(self, cache: dict, token_in: str):
+        with self._INFO_LOCK:
+            hit = cache.get((self.address, token_in, self.sender))
+        if hit is not None and time.monotonic() - hit[1] < CACHE_TTL:
+            return hit[0]
+        return None
+
+    def _store(self, cache: dict, token_in: str, value) -> None:
+        with self._INFO_LOCK:
+            cache[(self.address, token_in, self.sender)] = (value, time.monotonic())
+
+    def verified(self, token_in: str) -> Optional[bool]:
+        # локальная математика совпала с on-chain (None — еще не сверяли или сверка устарела)
+        return self._cached(self._VERIFIED, Web3.to_checksum_address(token_in))
+
+    def swap_fee(self, token_in: str) -> int:
+        t = Web3.to_checksum_address(token_in)
+        if t in self.fees:
+            return self.fees[t]
+        fee = self._cached(self._FEES, t)
+        if fee is None:
+            fee = int(self.contract.functions.getSwapFee(self.sender, t, self.token_out(t), b"").call())
+            self._store(self._FEES, t, fee)
+        return fee
+
+    def _local(self, token_in: str, amounts: list[int]) -> list[int]:
+        if not self.mirrored or self.reserves is None:
+            self.refresh()
+        t = Web3.to_checksum_address(token_in)
+        fee = self.swap_fee(t)
+        zero_in = t == self.info.token0
+        r0, r1 = self.reserves
+        r_in, r_out = (r0, r1) if zero_in else (r1, r0)
+        if self.info.pool_type == POOL_STABLE:
+            m_in, m_out = (self.info.mul0, self.info.mul1) if zero_in else (self.info.mul1, self.info.mul0)
+            return [stable_amount_out(a, r_in, r_out, fee, m_in, m_out) for a in amounts]
+        if self.info.pool_type == POOL_CLASSIC:
+            return [classic_amount_out(a, r_in, r_out, fee) for a in amounts]
+        raise ValueError(f"unsupported SyncSwap pool type {self.info.pool_type} at {self.address}")
+
+    def onchain_amount_out(self, token_in: str, amount_in: int, block="latest") -> int:
+        t = Web3.to_checksum_address(token_in)
+        return int(self.contract.functions.getAmountOut(t, int(amount_in), self.sender).call(block_identifier=block))
+
+    def _at(self):
+        # блок резервов, по которым считается локальная котировка
+        if not self.mirrored:
+            return "latest"
+        return self.block if self.block is not None else "latest"
+
+    def quote_ladder(self, token_in: str, amounts: list[int]) -> list[int]:
+        t = Web3.to_checksum_address(token_in)
+        verified = self.verified(t)
+        if verified is False:
+            return [self.onchain_amount_out(t, a, self._at()) for a in amounts]
+        outs = self._local(t, amounts)
+        if self.mirrored and self.block is None:
+            # резервы не привязаны к блоку узла: сверять не с чем
+            return outs
+        if verified is None and amounts:
+            # одна сверка на направление за CACHE_TTL
+            chain = self.onchain_amount_out(t, amounts[-1], self._at())
+            ok = chain == outs[-1]
+            self._store(self._VERIFIED, t, ok)
+            if not ok:
+                print(f"[syncswap] {self.address}: local quote {outs[-1]} != getAmountOut {chain}, using on-chain quotes")
+                return [self.onchain_amount_out(t, a, self._at()) for a in amounts]
+        return outs
+
+    def quote(self, token_in: str, amount_in: int) -> int:
+        return self.quote_ladder(token_in, [amount_in])[0]
+
+
+def quote_path(pools: list[SyncSwapPool], token_in: str, amounts: list[int]) -> list[int]:
+    # многошаговый путь: выход шага — вход следующего, вся лестница сумм за раз
+    t = Web3.to_checksum_address(token_in)
+    outs = list(amounts)
+    for p in pools:
+        outs = p.quote_ladder(t, outs)
+        t = p.token_out(t)
+    return outs
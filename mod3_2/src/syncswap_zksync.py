@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import time
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Any, Optional, Tuple
 
 from eth_abi import encode as abi_encode
@@ -11,13 +12,20 @@ from hexbytes import HexBytes
 from web3 import Web3
 
 from .client import AsyncEvmClient
+from .syncswap_pool import SyncSwapPool, quote_path
+from .template_index import DEFAULT_LIBRARY_PATH, NATIVE, TemplateLibrary
 from .utils import to_wei
 from .tokens import USDC_E, balance_of, allowance, encode_approve
 
+# проверяются при старте команды (src/verified.py); роутер берется из шаблона
+CONTRACTS = (USDC_E,)
+
 
 @dataclass
 class SyncSwapTemplate:
-    tx_hash: str  #
+    # tx-шаблон ищется в библиотеке (src/template_index.py), tx_hash — если там его нет
+    tx_hash: Optional[str] = None
+    library: Optional[str] = DEFAULT_LIBRARY_PATH
 
 
 class SyncSwap:
@@ -61,7 +69,26 @@ class SyncSwap:
     def _write_u256(buf: bytearray, off: int, val: int) -> None:
         buf[off : off + 32] = int(val).to_bytes(32, "big")
 
+    def _library_template(self) -> Optional[tuple[str, bytes]]:
+        if not self.template.library or not Path(self.template.library).exists():
+            return None
+        rec = TemplateLibrary(self.template.library).lookup(
+            self.client.chain_id, USDC_E, NATIVE, selector="0x" + self.TEMPLATE_SELECTOR.hex(), replayable=False,
+        )
+        if rec is None or not rec.validated:
+            # без подтверждения support >= MIN_SUPPORT раскладка слотов может быть случайной — берем tx_hash
+            if rec is not None:
+                print(f"[syncswap] library template {rec.tx_hash} is not validated (support={rec.support}), using tx_hash")
+            return None
+        # получатель в path шаблона — отправитель чужой tx, подставляем свой адрес
+        return Web3.to_checksum_address(rec.router), rec.patch(recipient=self.client.address)
+
     async def _load_template(self) -> tuple[str, bytes]:
+        found = self._library_template()
+        if found is not None:
+            return found
+        if not self.template.tx_hash:
+            raise RuntimeError("No SyncSwap template in the library; run `templates refresh` or set tx_hash")
         tx = await self.client.get_tx(self.template.tx_hash)
         to_addr = tx.get("to")
         if not to_addr:
@@ -108,9 +135,29 @@ class SyncSwap:
 
         return bytes(b), token_in, int(old_amount)
 
+    def _path_pools(self, paths_blob: bytes) -> list[str]:
+        # paths[0].steps[i].pool: SwapPath(steps, tokenIn, amountIn), SwapStep(pool, data, callback, callbackData)
+        b = paths_blob
+        el0 = 32 + self._read_u256(b, 32)
+        steps = el0 + self._read_u256(b, el0)
+        n = self._read_u256(b, steps)
+        pools = []
+        for i in range(n):
+            st = steps + 32 + self._read_u256(b, steps + 32 + 32 * i)
+            pools.append(Web3.to_checksum_address("0x" + b[st + 12 : st + 32].hex()))
+        return pools
+
+    async def quote(self, amounts: list[int]) -> list[int]:
+        # лестница сумм по пути шаблона одним чтением резервов (для выбора маршрута)
+        _, template_calldata = await self._load_template()
+        paths_blob = self._extract_paths_blob_from_template(template_calldata)
+        _, token_in, _ = self._patch_amount_in_paths(paths_blob, 0)
+        w3 = self._w3()
+        pools = [SyncSwapPool(w3, p, self.client.address) for p in self._path_pools(paths_blob)]
+        return quote_path(pools, token_in, [int(a) for a in amounts])
+
     def _erc20_permit_contract(self, token: str):
 
-        w3 = self._w3()
         abi = [
             {
                 "name": "nonces",
@@ -127,9 +174,9 @@ class SyncSwap:
                 "outputs": [{"type": "bytes32"}],
             },
         ]
-        return w3.eth.contract(address=Web3.to_checksum_address(token), abi=abi)
+        return self.client.shared.contracts.contract(address=Web3.to_checksum_address(token), abi=abi)
 
-    def _sign_permit(
+    async def _sign_permit(
         self,
         token: str,
         owner: str,
@@ -154,6 +201,11 @@ class SyncSwap:
         struct_hash = keccak(encoded)
         digest = keccak(b"\x19\x01" + domain_separator + struct_hash)
 
+        signer = getattr(self.client, "signer", None)
+        if signer is not None:
+            # подпись в пуле signer-а, не блокирует event loop
+            return await signer.sign_hash_async(digest)
+
         if hasattr(Account, "signHash"):
             signed = Account.signHash(digest, private_key=private_key)
         else:
@@ -232,8 +284,13 @@ class SyncSwap:
         swap_deadline = now + 900
         permit_deadline = now + 3600
 
-
-        amount_out_min = 1
+        # котировка локально по резервам пулов пути (сверена с getAmountOut пула)
+        pools = [SyncSwapPool(w3, p, self.client.address) for p in self._path_pools(patched_paths)]
+        amount_out = quote_path(pools, token_in, [amount_in])[0]
+        if amount_out <= 0:
+            raise ValueError(f"SyncSwap quote is 0 for amount_in={amount_in}")
+        # slippage=1 => 1%
+        amount_out_min = int(amount_out * (100 - float(slippage)) / 100)
 
         # private key
         pk = getattr(self.client, "private_key", None) or getattr(self.client, "_private_key", None)
@@ -241,7 +298,7 @@ class SyncSwap:
             raise RuntimeError("Cannot access private key on client to sign permit")
 
         # SIGN permit for USDC.e
-        v, r, s = self._sign_permit(
+        v, r, s = await self._sign_permit(
             token=USDC_E,
             owner=self.client.address,
             spender=router_addr,
@@ -266,7 +323,7 @@ class SyncSwap:
 
         print(
             "SyncSwap SWAP_WITH_PERMIT USDC.e->ETH\n"
-            f"  amount_in={amount_in} min={amount_out_min} slippage={slippage} all={is_all_balance}\n"
+            f"  amount_in={amount_in} quote={amount_out} min={amount_out_min} slippage={slippage} all={is_all_balance}\n"
             f"  router={router_addr} permit_deadline={permit_deadline} swap_deadline={swap_deadline}"
         )
 
@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from eth_utils import keccak
+from web3 import Web3
+
+from .template_router import TemplateSwap
+
+NATIVE = "ETH"
+# zkSync: ETH — системный токен с событиями Transfer, газ платится бутлоадеру
+L2_ETH_TOKEN = "0x000000000000000000000000000000000000800a"
+BOOTLOADER = "0x0000000000000000000000000000000000008001"
+TOPIC_TRANSFER = "0x" + keccak(text="Transfer(address,address,uint256)").hex()
+
+# слоты calldata, которые меняются от tx к tx (остальные слова должны совпадать)
+SLOT_AMOUNT = "A"
+SLOT_MIN_OUT = "M"
+SLOT_DEADLINE = "D"
+SLOT_RECIPIENT = "R"
+VARIABLE_SLOTS = (SLOT_AMOUNT, SLOT_MIN_OUT, SLOT_DEADLINE, SLOT_RECIPIENT)
+
+# amountOutMin шаблона ищется среди слов в [MIN_OUT_FLOOR * out, out]
+MIN_OUT_FLOOR = 0.5
+# столько tx с одинаковой раскладкой нужно, чтобы шаблон считался проверенным
+MIN_SUPPORT = 2
+DEFAULT_LIBRARY_PATH = "templates.library.json"
+
+
+def _hex(x: Any) -> str:
+    if isinstance(x, (bytes, bytearray)):
+        return "0x" + bytes(x).hex()
+    s = x.hex() if hasattr(x, "hex") and not isinstance(x, str) else str(x)
+    return s if s.startswith("0x") else "0x" + s
+
+
+def _words(data: bytes) -> list[int]:
+    return [int.from_bytes(data[i : i + 32], "big") for i in range(4, len(data), 32)]
+
+
+def _addr(topic: Any) -> str:
+    return "0x" + bytes.fromhex(_hex(topic)[2:])[-20:].hex()
+
+
+@dataclass
+class TemplateRecord:
+    router: str
+    selector: str
+    token_in: str
+    token_out: str
+    # класс каждого слова calldata: A/M/D/R — переменные слоты, z — 0, a — адрес, w — прочее
+    layout: str
+    tx_hash: str
+    block: int
+    calldata: str
+    amount_in: int
+    amount_out: int
+    support: int = 1
+    # слова вне переменных слотов, которые отличались между tx кластера (подписи и т.п.)
+    unstable: list[int] = field(default_factory=list)
+
+    def key(self) -> tuple[str, str, str, str, str]:
+        return (self.router, self.selector, self.token_in, self.token_out, self.layout)
+
+    def offsets(self, slot: str) -> list[int]:
+        # байтовые смещения слов слота в calldata (с учетом селектора)
+        return [4 + 32 * i for i, c in enumerate(self.layout) if c == slot]
+
+    @property
+    def replayable(self) -> bool:
+        return bool(self.offsets(SLOT_AMOUNT)) and not self.unstable
+
+    @property
+    def validated(self) -> bool:
+        return self.replayable and self.support >= MIN_SUPPORT
+
+    def patch(self, recipient: Optional[str] = None, amount_in: Optional[int] = None,
+              min_out: Optional[int] = None, deadline: Optional[int] = None) -> bytes:
+        b = bytearray(bytes.fromhex(self.calldata[2:]))
+        values = {
+            SLOT_RECIPIENT: int(recipient, 16) if recipient is not None else None,
+            SLOT_AMOUNT: amount_in,
+            SLOT_MIN_OUT: min_out,
+            SLOT_DEADLINE: deadline,
+        }
+        for slot, v in values.items():
+            if v is None:
+                continue
+            offs = self.offsets(slot)
+            if not offs and slot == SLOT_MIN_OUT:
+                raise ValueError(f"template {self.tx_hash} has no amountOutMin slot")
+            for off in offs:
+                b[off : off + 32] = int(v).to_bytes(32, "big")
+        return bytes(b)
+
+    def build(self, recipient: str, amount_in: int, min_out: int, deadline: int) -> TemplateSwap:
+        data = self.patch(recipient, amount_in, min_out, deadline)
+        value = int(amount_in) if self.token_in == NATIVE else 0
+        return TemplateSwap(to=Web3.to_checksum_address(self.router), data=_hex(data), value=value)
+
+
+class TemplateLibrary:
+    # Библиотека шаблонов swap-ов на диске: по chain id — последний просканированный
+    # блок каждого роутера и кластеры tx по (router, selector, tokenIn, tokenOut, раскладка).
+
+    def __init__(self, path: str | os.PathLike = DEFAULT_LIBRARY_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data: dict[str, dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                self._data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._data = {}
+
+    def _chain(self, chain_id: int) -> dict[str, Any]:
+        return self._data.setdefault(str(chain_id), {"scanned": {}, "templates": []})
+
+    def save(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with self._lock:
+            tmp.write_text(json.dumps(self._data, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def scanned(self, chain_id: int, router: str) -> Optional[int]:
+        with self._lock:
+            return self._chain(chain_id)["scanned"].get(router.lower())
+
+    def mark_scanned(self, chain_id: int, router: str, block: int) -> None:
+        with self._lock:
+            self._chain(chain_id)["scanned"][router.lower()] = int(block)
+
+    def records(self, chain_id: int) -> list[TemplateRecord]:
+        with self._lock:
+            return [TemplateRecord(**r) for r in self._chain(chain_id)["templates"]]
+
+    def add(self, chain_id: int, rec: TemplateRecord) -> TemplateRecord:
+        # tx той же раскладки вливается в кластер: support растет, шаблоном
+        # становится более свежая tx, различия вне переменных слотов копятся в unstable
+        with self._lock:
+            items = self._chain(chain_id)["templates"]
+            for i, raw in enumerate(items):
+                cur = TemplateRecord(**raw)
+                if cur.key() != rec.key():
+                    continue
+                if cur.tx_hash == rec.tx_hash:
+                    return cur
+                a, b = bytes.fromhex(cur.calldata[2:]), bytes.fromhex(rec.calldata[2:])
+                diff = {j for j, c in enumerate(rec.layout) if c not in VARIABLE_SLOTS
+                        and a[4 + 32 * j : 36 + 32 * j] != b[4 + 32 * j : 36 + 32 * j]}
+                newest = rec if rec.block >= cur.block else cur
+                newest.support = cur.support + 1
+                newest.unstable = sorted(set(cur.unstable) | diff)
+                items[i] = asdict(newest)
+                return newest
+            items.append(asdict(rec))
+            return rec
+
+    def lookup(self, chain_id: int, token_in: str, token_out: str, router: Optional[str] = None,
+               selector: Optional[str] = None, replayable: bool = True) -> Optional[TemplateRecord]:
+        def norm(t: str) -> str:
+            return NATIVE if t.upper() == NATIVE else t.lower()
+
+        found = [
+            r for r in self.records(chain_id)
+            if r.token_in == norm(token_in) and r.token_out == norm(token_out)
+            and (router is None or r.router == router.lower())
+            and (selector is None or r.selector == selector.lower())
+            and (r.replayable or not replayable)
+        ]
+        if not found:
+            return None
+        # проверенные, со слотом amountOutMin, с большим support, свежие — первыми
+        return max(found, key=lambda r: (r.validated, bool(r.offsets(SLOT_MIN_OUT)), r.support, r.block))
+
+    def report(self, chain_id: int) -> str:
+        lines = []
+        for r in sorted(self.records(chain_id), key=lambda r: (r.router, r.token_in, r.token_out)):
+            state = "validated" if r.validated else ("replayable" if r.replayable else f"unstable words {r.unstable}")
+            lines.append(
+                f"{r.router} {r.selector} {r.token_in} -> {r.token_out}: support={r.support} "
+                f"amountIn@{r.offsets(SLOT_AMOUNT)} minOut@{r.offsets(SLOT_MIN_OUT)} {state} ({r.tx_hash})"
+            )
+        return "\n".join(lines) or "template library is empty"
+
+
+class TemplateIndexer:
+    # Сканирует блоки, отбирает успешные tx к роутерам с нужными селекторами и по
+    # квитанции (Transfer-события отправителя) определяет пару и суммы, а по ним —
+    # слоты amountIn / amountOutMin / deadline / получателя в calldata.
+
+    def __init__(self, w3: Web3, library: TemplateLibrary, chain_id: int,
+                 routers: dict[str, Iterable[str]], workers: int = 8):
+        self.w3 = w3
+        self.library = library
+        self.chain_id = chain_id
+        self.routers = {r.lower(): {s.lower() for s in sels} for r, sels in routers.items()}
+        self.workers = workers
+
+    def classify(self, tx: dict[str, Any], receipt: dict[str, Any], block_ts: int) -> Optional[TemplateRecord]:
+        if int(receipt.get("status", 0)) != 1:
+            return None
+        sender = str(tx["from"]).lower()
+        data = bytes.fromhex(_hex(tx.get("input") or tx.get("data") or "0x")[2:])
+        if len(data) < 36 or (len(data) - 4) % 32:
+            return None
+
+        ins: list[tuple[str, int]] = []
+        outs: dict[str, int] = {}
+        for log in receipt.get("logs", []):
+            topics = log.get("topics", [])
+            if len(topics) != 3 or _hex(topics[0]) != TOPIC_TRANSFER:
+                continue
+            token = str(log["address"]).lower()
+            token = NATIVE if token == L2_ETH_TOKEN else token
+            frm, to = _addr(topics[1]), _addr(topics[2])
+            if BOOTLOADER in (frm, to):
+                continue
+            amount = int(_hex(log["data"]), 16)
+            if frm == sender:
+                ins.append((token, amount))
+            elif to == sender:
+                outs[token] = outs.get(token, 0) + amount
+        if int(tx.get("value", 0)) > 0:
+            token_in, amount_in = NATIVE, int(tx["value"])
+        elif ins:
+            token_in, amount_in = ins[0]
+        else:
+            return None
+        outs.pop(token_in, None)
+        if not outs:
+            return None
+        token_out, amount_out = max(outs.items(), key=lambda kv: kv[1])
+
+        layout = []
+        for w in _words(data):
+            if w == amount_in:
+                layout.append(SLOT_AMOUNT)
+            elif w == int(sender, 16):
+                layout.append(SLOT_RECIPIENT)
+            elif amount_out and amount_out * MIN_OUT_FLOOR <= w <= amount_out:
+                layout.append(SLOT_MIN_OUT)
+            elif block_ts - 3600 <= w <= block_ts + 400 * 86400:
+                layout.append(SLOT_DEADLINE)
+            elif w == 0:
+                layout.append("z")
+            elif 1 << 128 < w < 1 << 160:
+                layout.append("a")
+            else:
+                layout.append("w")
+        if SLOT_AMOUNT not in layout:
+            return None
+        return TemplateRecord(
+            router=str(tx["to"]).lower(),
+            selector="0x" + data[:4].hex(),
+            token_in=token_in,
+            token_out=token_out,
+            layout="".join(layout),
+            tx_hash=_hex(tx["hash"]),
+            block=int(tx["blockNumber"]),
+            calldata=_hex(data),
+            amount_in=amount_in,
+            amount_out=amount_out,
+        )
+
+    def _scan_block(self, n: int) -> list[tuple[dict, int]]:
+        block = self.w3.eth.get_block(n, full_transactions=True)
+        out = []
+        for tx in block["transactions"]:
+            to = str(tx.get("to") or "").lower()
+            sels = self.routers.get(to)
+            if sels is not None and _hex(tx.get("input") or "0x")[:10].lower() in sels:
+                out.append((dict(tx), int(block["timestamp"])))
+        return out
+
+    def _classify_one(self, item: tuple[dict, int]) -> Optional[TemplateRecord]:
+        tx, ts = item
+        receipt = dict(self.w3.eth.get_transaction_receipt(tx["hash"]))
+        return self.classify(tx, receipt, ts)
+
+    def refresh(self, max_blocks: int = 5000, head: Optional[int] = None) -> tuple[int, int]:
+        # с последнего просканированного блока до head (не больше max_blocks);
+        # возвращает (блоков просканировано, tx добавлено)
+        head = int(head if head is not None else self.w3.eth.block_number)
+        floor = max(head - max_blocks + 1, 0)
+        done = {r: self.library.scanned(self.chain_id, r) for r in self.routers}
+        start = max(min((d + 1 if d is not None else floor) for d in done.values()), floor) if done else head + 1
+        if start > head:
+            return 0, 0
+        with ThreadPoolExecutor(max_workers=self.workers) as ex:
+            found = [x for part in ex.map(self._scan_block, range(start, head + 1)) for x in part]
+            # роутер, просканированный дальше других, не получает свои tx второй раз
+            found = [x for x in found if done[str(x[0]["to"]).lower()] is None
+                     or int(x[0]["blockNumber"]) > done[str(x[0]["to"]).lower()]]
+            recs = [r for r in ex.map(self._classify_one, found) if r is not None]
+        for r in sorted(recs, key=lambda r: r.block):
+            self.library.add(self.chain_id, r)
+        for router in self.routers:
+            self.library.mark_scanned(self.chain_id, router, head)
+        self.library.save()
+        return head - start + 1, len(recs)
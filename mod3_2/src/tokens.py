@@ -44,6 +44,10 @@ def balance_of(w3: Web3, token: str, owner: str) -> int:
     return int(_erc20(w3, token).functions.balanceOf(w3.to_checksum_address(owner)).call())
 
 
+def decimals(w3: Web3, token: str) -> int:
+    return int(_erc20(w3, token).functions.decimals().call())
+
+
 def allowance(w3: Web3, token: str, owner: str, spender: str) -> int:
     return int(_erc20(w3, token).functions.allowance(
         w3.to_checksum_address(owner),
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from .journal import TxJournal, make_intent_id
+from .utils import from_wei
+
+ORDER_CANCELLED = "cancelled"
+ORDER_DONE = "done"
+
+
+@dataclass
+class TwapOrder:
+    id: str
+    command: str
+    # сумма во входном активе, wei; фиксируется при создании (и для --all)
+    total: int
+    slices: int
+    over_s: float = 0.0
+    blocks: int = 0
+    slippage: float = 1.0
+    token_in: str = "USDC_E"
+    token_out: str = "ETH"
+    dec_in: int = 6
+    dec_out: int = 18
+    # выход всей суммы одной сделкой (симуляция на момент создания ордера)
+    baseline_out: int = 0
+
+    def amounts(self) -> list[int]:
+        base = self.total // self.slices
+        return [base] * (self.slices - 1) + [self.total - base * (self.slices - 1)]
+
+    def slice_intent(self, k: int) -> str:
+        return make_intent_id("twap", self.id, k)
+
+    def slice_key(self, k: int) -> str:
+        return f"{self.id}#{k}"
+
+    def price(self, amount_in: int, amount_out: int) -> float:
+        if not amount_in:
+            return 0.0
+        return float(from_wei(amount_out, self.dec_out) / from_wei(amount_in, self.dec_in))
+
+
+@dataclass
+class SliceResult:
+    index: int
+    amount_in: int
+    amount_out: int = 0
+    quote: int = 0
+    tx_hash: Optional[str] = None
+    # done | failed | cancelled | pending; done без amount_out — выполнена, но выход не записан
+    status: str = "pending"
+
+
+def _fee(receipt: dict[str, Any]) -> int:
+    return int(receipt.get("gasUsed") or 0) * int(receipt.get("effectiveGasPrice") or 0)
+
+
+class TwapScheduler:
+    # Ордер режется на N частей, равномерно по окну времени (over_s) или блоков.
+    # Каждая часть — свой intent журнала: повторный запуск того же ордера
+    # пропускает выполненные части (и дожидается прерванной), cancel помечает
+    # ордер, и планировщик — в том числе в другом процессе — останавливается
+    # перед следующей частью. Перед каждой частью котировка пересчитывается
+    # симуляцией команды на текущем состоянии пулов (чтения того же блока отдает
+    # CallCache, сама отправка их уже не повторяет).
+
+    def __init__(self, journal: TxJournal, order: TwapOrder,
+                 send: Callable[[int, str], Awaitable[tuple[str, dict[str, Any]]]],
+                 measure: Callable[[], int],
+                 quote: Optional[Callable[[int], Awaitable[int]]] = None,
+                 block_number: Optional[Callable[[], int]] = None,
+                 poll: float = 1.0):
+        self.journal = journal
+        self.order = order
+        self.send = send
+        self.measure = measure
+        self.quote = quote
+        self.block_number = block_number
+        self.poll = poll
+
+    def cancelled(self) -> bool:
+        st = self.journal.intent_status(self.order.id)
+        return st is not None and st[0] == ORDER_CANCELLED
+
+    def cancel(self) -> None:
+        self.journal.mark_intent(self.order.id, ORDER_CANCELLED)
+
+    def results(self) -> list[SliceResult]:
+        out = []
+        for k, a in enumerate(self.order.amounts()):
+            saved = self.journal.load_order(self.order.slice_key(k))
+            if saved is not None:
+                out.append(SliceResult(**saved))
+                continue
+            txh = self.journal.intent_done(self.order.slice_intent(k))
+            out.append(SliceResult(k, a, tx_hash=txh, status="done") if txh is not None else SliceResult(k, a))
+        return out
+
+    async def _wait(self, i: int, n: int, start: float, start_block: Optional[int]) -> None:
+        o = self.order
+        if o.blocks and start_block is not None and self.block_number is not None:
+            target = start_block + (o.blocks * i) // max(n, 1)
+            while await asyncio.to_thread(self.block_number) < target:
+                await asyncio.sleep(self.poll)
+            return
+        delay = start + o.over_s * i / max(n, 1) - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def run(self) -> list[SliceResult]:
+        o = self.order
+        results = self.results()
+        todo = [r for r in results if r.status != "done"]
+        if not todo:
+            return results
+        if len(todo) < len(results):
+            print(f"[twap {o.id}] resuming: {len(results) - len(todo)}/{len(results)} slices already done")
+
+        start = time.monotonic()
+        start_block = await asyncio.to_thread(self.block_number) if o.blocks and self.block_number else None
+        for i, r in enumerate(todo):
+            await self._wait(i, len(todo), start, start_block)
+            if self.cancelled():
+                for rest in todo[i:]:
+                    rest.status = ORDER_CANCELLED
+                print(f"[twap {o.id}] cancelled, {len(todo) - i} slices not sent")
+                break
+
+            try:
+                if self.quote is not None:
+                    r.quote = await self.quote(r.amount_in)
+                before = await asyncio.to_thread(self.measure)
+                r.tx_hash, receipt = await self.send(r.amount_in, o.slice_intent(r.index))
+            except Exception as e:
+                r.status = "failed"
+                print(f"[twap {o.id}] slice {r.index + 1}/{o.slices} failed: {e}")
+                break
+            if receipt.get("status") != 1:
+                r.status = "failed"
+                print(f"[twap {o.id}] slice {r.index + 1}/{o.slices} reverted: {r.tx_hash}")
+                break
+            after = await asyncio.to_thread(self.measure)
+            if not receipt.get("skipped"):
+                # газ платится в ETH: для выхода в ETH возвращаем его в дельту
+                out = after - before + (_fee(receipt) if o.token_out == "ETH" else 0)
+                # прерванная часть, которую дождались после рестарта, могла попасть в блок до замера
+                r.amount_out = max(out, 0)
+            r.status = "done"
+            self.journal.save_order(o.slice_key(r.index), asdict(r))
+            print(f"[twap {o.id}] slice {r.index + 1}/{o.slices}: in={r.amount_in} quote={r.quote} "
+                  f"out={r.amount_out} tx={r.tx_hash}")
+
+        if all(r.status == "done" for r in results):
+            self.journal.mark_intent(o.id, ORDER_DONE)
+        return results
+
+    def report(self, results: list[SliceResult]) -> str:
+        o = self.order
+        done = [r for r in results if r.status == "done"]
+        measured = [r for r in done if r.amount_out]
+        lines = [f"twap {o.id} ({o.command}): {len(done)}/{o.slices} slices done, "
+                 f"{from_wei(sum(r.amount_in for r in done), o.dec_in)} {o.token_in} sent"]
+        for r in results:
+            px = f" price={o.price(r.amount_in, r.amount_out):.8g}" if r.amount_out else ""
+            lines.append(f"  {r.index + 1}. {r.status} in={r.amount_in} out={r.amount_out}{px} {r.tx_hash or ''}".rstrip())
+        if not measured:
+            return "\n".join(lines)
+        amt_in = sum(r.amount_in for r in measured)
+        amt_out = sum(r.amount_out for r in measured)
+        avg = o.price(amt_in, amt_out)
+        line = f"  avg price {avg:.8g} {o.token_out}/{o.token_in} over {len(measured)} slices"
+        if o.baseline_out:
+            base = o.price(o.total, o.baseline_out)
+            line += f" vs single-shot {base:.8g} ({(avg / base - 1) * 1e4:+.1f} bps)"
+        lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Sequence
+
+# UniswapV2: 0.3% = 997 / 1000
+FEE_NUM = 997
+FEE_DEN = 1000
+
+
+@dataclass(frozen=True)
+class Hop:
+    # пул V2 в направлении обмена
+    reserve_in: int
+    reserve_out: int
+    fee_num: int = FEE_NUM
+    fee_den: int = FEE_DEN
+
+
+# Целочисленно, как getAmountOut роутера: out = a*f*R_out // (R_in*den + a*f).
+# Вся стоимость — операции над большими int (до 2**234), поэтому ускорение не от
+# векторизации, а от того, что лишнего не считаем: a*f — один раз на сумму и
+# комиссию для всех пулов, R_in*den — один раз на пул, без вызова функции на квоту.
+
+
+def _hop(fee_amounts: list[int], h: Hop) -> list[int]:
+    # fee_amounts = [a * h.fee_num]; пустой пул дает 0
+    if h.reserve_in <= 0 or h.reserve_out <= 0:
+        return [0] * len(fee_amounts)
+    rin, rout = h.reserve_in * h.fee_den, h.reserve_out
+    return [(x * rout) // (rin + x) for x in fee_amounts]
+
+
+def amounts_out(amounts: Sequence[int], reserve_in: int, reserve_out: int,
+                fee_num: int = FEE_NUM, fee_den: int = FEE_DEN) -> list[int]:
+    # лестница сумм через один пул
+    return _hop([int(a) * fee_num for a in amounts], Hop(int(reserve_in), int(reserve_out), fee_num, fee_den))
+
+
+def quote_grid(amounts: Sequence[int], hops: Sequence[Hop]) -> list[list[int]]:
+    # каждая сумма через каждый пул: результат [пул][сумма]
+    amounts = [int(a) for a in amounts]
+    by_fee: dict[int, list[int]] = {}
+    out = []
+    for h in hops:
+        fa = by_fee.get(h.fee_num)
+        if fa is None:
+            fa = by_fee[h.fee_num] = [a * h.fee_num for a in amounts]
+        out.append(_hop(fa, h))
+    return out
+
+
+def quote_path(amounts: Sequence[int], path: Sequence[Hop]) -> list[int]:
+    # многошаговый путь: выход шага — вход следующего
+    cur = [int(a) for a in amounts]
+    for h in path:
+        cur = _hop([a * h.fee_num for a in cur], h)
+    return cur
+
+
+def quote_paths(amounts: Sequence[int], paths: Sequence[Sequence[Hop]]) -> list[list[int]]:
+    # результат [путь][сумма]; первый шаг путей считается как сетка (a*f общий)
+    amounts = [int(a) for a in amounts]
+    firsts = quote_grid(amounts, [p[0] for p in paths if p])
+    out, k = [], 0
+    for p in paths:
+        if not p:
+            out.append(list(amounts))
+            continue
+        out.append(quote_path(firsts[k], p[1:]))
+        k += 1
+    return out
+
+
+def best_path(amount_in: int, paths: Sequence[Sequence[Hop]]) -> tuple[int, int]:
+    # (индекс пути, выход) с максимальным выходом для одной суммы
+    outs = quote_paths([amount_in], paths)
+    i = max(range(len(outs)), key=lambda k: outs[k][0])
+    return i, outs[i][0]
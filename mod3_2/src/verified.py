@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
+
+from eth_utils import keccak
+from web3 import Web3
+
+
+class ContractCheckError(RuntimeError):
+    pass
+
+
+class ContractRegistry:
+    # Проверенные адреса (роутеры, пары, токены): hash кода на диске по chain id.
+    # Пока запись моложе recheck_s, адресу верим без запросов к узлу.
+
+    def __init__(self, path: str | os.PathLike = "contracts.verified.json", recheck_s: float = 7 * 86400):
+        self.path = Path(path)
+        self.recheck_s = recheck_s
+        self._lock = threading.Lock()
+        self._data: dict[str, dict[str, dict]] = {}
+        if self.path.exists():
+            try:
+                self._data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._data = {}
+
+    def _entry(self, chain_id: int, address: str) -> Optional[dict]:
+        with self._lock:
+            return self._data.get(str(chain_id), {}).get(address.lower())
+
+    def is_fresh(self, chain_id: int, address: str) -> bool:
+        e = self._entry(chain_id, address)
+        return e is not None and time.time() - e["verified_at"] < self.recheck_s
+
+    def _save(self) -> None:
+        # атомарная запись: временный файл + replace, оба под замком —
+        # иначе параллельный _save перезапишет tmp до нашего replace
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with self._lock:
+            tmp.write_text(json.dumps(self._data, indent=1, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    def _check(self, w3: Web3, chain_id: int, address: str) -> bool:
+        # True — запись обновилась и файл надо сохранить
+        if self.is_fresh(chain_id, address):
+            return False
+        code = bytes(w3.eth.get_code(Web3.to_checksum_address(address)))
+        if not code:
+            raise ContractCheckError(
+                f"no code at {address} on chain {chain_id}. "
+                f"Check that you are on the right RPC (chainId={chain_id})."
+            )
+        code_hash = "0x" + keccak(code).hex()
+        prev = self._entry(chain_id, address)
+        if prev is not None and prev["code_hash"] != code_hash:
+            raise ContractCheckError(
+                f"code at {address} changed: {prev['code_hash']} -> {code_hash}. "
+                f"Remove it from {self.path} if the upgrade is expected."
+            )
+        with self._lock:
+            self._data.setdefault(str(chain_id), {})[address.lower()] = {
+                "code_hash": code_hash,
+                "verified_at": time.time(),
+            }
+        return True
+
+    def ensure(self, w3: Web3, chain_id: int, address: str) -> None:
+        if self._check(w3, chain_id, address):
+            self._save()
+
+    def validate_all(self, w3: Web3, chain_id: int, addresses: Iterable[str], workers: int = 8) -> int:
+        # все устаревшие адреса проверяются параллельно; возвращает число запросов к узлу
+        todo = sorted({a.lower() for a in addresses if not self.is_fresh(chain_id, a)})
+        if not todo:
+            return 0
+        with ThreadPoolExecutor(max_workers=min(workers, len(todo))) as ex:
+            futs = [ex.submit(self._check, w3, chain_id, a) for a in todo]
+        errors = [f.exception() for f in futs if f.exception() is not None]
+        self._save()
+        if errors:
+            raise ContractCheckError("; ".join(str(e) for e in errors))
+        return len(todo)
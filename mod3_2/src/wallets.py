@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+from eth_account import Account
+
+# Режим нескольких кошельков и общие для них ресурсы SharedRpc. Модуль общий с dz2
+# ("dz2 full/src/wallets.py" подгружает его по пути): только stdlib и eth_account.
+
+
+@dataclass
+class WalletResult:
+    address: str
+    ok: bool
+    tx: Optional[str] = None
+    status: Any = None
+    error: Optional[str] = None
+    latency: float = 0.0
+
+
+def load_keys(path: str) -> list[str]:
+    # один приватный ключ на строку, пустые строки и # комментарии пропускаем
+    keys = []
+    for n, line in enumerate(Path(path).read_text(encoding="utf-8").splitlines(), 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        try:
+            Account.from_key(line)
+        except Exception as e:
+            raise ValueError(f"{path}:{n}: bad private key") from e
+        keys.append(line)
+    if not keys:
+        raise ValueError(f"{path}: no keys")
+    return keys
+
+
+async def run_wallets(
+    keys: list[str],
+    job: Callable[[str], Awaitable[tuple[str, Any]]],
+    concurrency: int = 8,
+) -> list[WalletResult]:
+    # job(key) выполняет все шаги одного кошелька последовательно;
+    # разные кошельки идут параллельно, не больше concurrency одновременно
+    concurrency = max(1, concurrency)
+    sem = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    # свой пул: стандартный executor ограничен ~32 потоками
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="wallet")
+
+    async def one(key: str) -> WalletResult:
+        address = Account.from_key(key).address
+        async with sem:
+            t = time.perf_counter()
+            try:
+                # адаптеры используют синхронный web3 — кошелек в своем потоке
+                txh, status = await loop.run_in_executor(pool, asyncio.run, job(key))
+                res = WalletResult(address, status == 1, txh, status, latency=time.perf_counter() - t)
+            except (Exception, SystemExit) as e:
+                res = WalletResult(address, False, error=f"{type(e).__name__}: {e}",
+                                   latency=time.perf_counter() - t)
+        mark = "ok" if res.ok else "FAIL"
+        print(f"[{mark}] {address} {res.tx or res.error} ({res.latency:.2f}s)")
+        return res
+
+    try:
+        return list(await asyncio.gather(*[one(k) for k in keys]))
+    finally:
+        pool.shutdown(wait=False)
+
+
+def _pct(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+
+def summary(results: list[WalletResult], wall: float) -> str:
+    ok = [r for r in results if r.ok]
+    lat = [r.latency for r in results]
+    lines = [
+        f"wallets: {len(results)} ok={len(ok)} failed={len(results) - len(ok)}",
+        f"wall: {wall:.2f}s throughput: {len(results) / wall if wall else 0:.2f} wallets/s",
+        f"latency: p50={_pct(lat, 0.5):.2f}s p90={_pct(lat, 0.9):.2f}s "
+        f"p99={_pct(lat, 0.99):.2f}s max={max(lat, default=0):.2f}s",
+    ]
+    for r in results:
+        if not r.ok:
+            lines.append(f"  {r.address}: {r.error or f'status={r.status}'}")
+    return "\n".join(lines)
+
+
+class NonceAllocator:
+    # Раздает nonce локально, чтобы параллельные шаги одного кошелька
+    # не получали одинаковый pending nonce из RPC.
+
+    def __init__(self, fetch: Callable[[], int]):
+        self._fetch = fetch
+        self._lock = threading.Lock()
+        self._next: int | None = None
+
+    def allocate(self) -> int:
+        with self._lock:
+            if self._next is None:
+                self._next = int(self._fetch())
+            n = self._next
+            self._next += 1
+            return n
+
+    def release(self, nonce: int) -> None:
+        # tx с этим nonce не ушла в сеть
+        with self._lock:
+            if self._next is not None and nonce == self._next - 1:
+                self._next = nonce
+            else:
+                self._next = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._next = None
+
+
+class TtlValue:
+    # значение с коротким TTL, общее для всех кошельков (цена газа, поля комиссии)
+
+    def __init__(self, fetch: Callable[[], Any], ttl: float = 2.0):
+        self._load = fetch
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._value: Any = None
+        self._at = 0.0
+
+    def get(self, fresh: bool = False) -> Any:
+        with self._lock:
+            now = time.monotonic()
+            if fresh or self._value is None or now - self._at > self.ttl:
+                self._value = self._load()
+                self._at = now
+            return self._value
+
+
+class ContractCache:
+    # контракт web3 с кэшем по (address, abi): разбор ABI делается один раз на процесс.
+    # Вызывается явно (shared.contracts.contract), w3.eth.contract не подменяется.
+
+    def __init__(self, factory: Callable[..., Any], maxsize: int = 512):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._items: OrderedDict[tuple[str, str], Any] = OrderedDict()
+        self.maxsize = maxsize
+
+    def contract(self, address: str, abi: list[dict[str, Any]]):
+        key = (str(address).lower(), json.dumps(abi, sort_keys=True))
+        with self._lock:
+            c = self._items.get(key)
+            if c is not None:
+                self._items.move_to_end(key)
+                return c
+        c = self._factory(address=address, abi=abi)
+        with self._lock:
+            self._items[key] = c
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return c
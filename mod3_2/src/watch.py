@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+from eth_utils import keccak
+from web3 import Web3
+
+from .signer import SignedTx
+from .simulate import Simulation
+
+# Sync пары UniswapV2 (Koi, SpaceFi) и пула SyncSwap: данные одинаковые — два слова резервов
+TOPIC_SYNC_V2 = "0x" + keccak(text="Sync(uint112,uint112)").hex()
+TOPIC_SYNC_U256 = "0x" + keccak(text="Sync(uint256,uint256)").hex()
+SYNC_TOPICS = (TOPIC_SYNC_V2, TOPIC_SYNC_U256)
+
+SEL_GET_RESERVES = "0x0902f1ac"
+SEL_TOKEN0 = "0x0dfe1681"
+SEL_TOKEN1 = "0xd21220a7"
+SEL_DECIMALS = "0x313ce567"
+
+# getLogs больше этого числа блоков за раз не запрашиваем (узел отстал / долгая пауза)
+MAX_LOG_RANGE = 1000
+
+
+def _hex(x: Any) -> str:
+    if isinstance(x, (bytes, bytearray)):
+        return "0x" + bytes(x).hex()
+    s = x.hex() if hasattr(x, "hex") and not isinstance(x, str) else str(x)
+    return s if s.startswith("0x") else "0x" + s
+
+
+def _int(x: Any) -> int:
+    return int(x, 16) if isinstance(x, str) else int(x)
+
+
+def _result(resp: dict[str, Any], what: str) -> Any:
+    if "error" in resp:
+        raise RuntimeError(f"{what} failed: {resp['error']}")
+    return resp["result"]
+
+
+def _word(data: str, i: int) -> int:
+    raw = data[2:] if data.startswith("0x") else data
+    return int(raw[64 * i : 64 * (i + 1)] or "0", 16)
+
+
+def _log(x: dict[str, Any]) -> dict[str, Any]:
+    # лог в виде, пригодном для записи в файл и повторного проигрывания
+    return {
+        "address": Web3.to_checksum_address(x["address"]),
+        "topics": [_hex(t) for t in x["topics"]],
+        "data": _hex(x["data"]),
+        "blockNumber": _int(x["blockNumber"]),
+    }
+
+
+@dataclass
+class WatchedPool:
+    address: str
+    token0: str
+    token1: str
+    dec0: int
+    dec1: int
+    reserve0: int = 0
+    reserve1: int = 0
+    block: int = 0
+
+    def apply(self, log: dict[str, Any]) -> bool:
+        if not log["topics"] or log["topics"][0] not in SYNC_TOPICS:
+            return False
+        self.reserve0, self.reserve1 = _word(log["data"], 0), _word(log["data"], 1)
+        self.block = log["blockNumber"]
+        return True
+
+    def price(self, invert: bool = False) -> float:
+        # token1 за один token0 (invert — token0 за token1), с учетом decimals
+        if not self.reserve0 or not self.reserve1:
+            return 0.0
+        p = (self.reserve1 / 10**self.dec1) / (self.reserve0 / 10**self.dec0)
+        return 1 / p if invert else p
+
+
+def load_pools(w3: Web3, addresses: list[str]) -> tuple[int, dict[str, WatchedPool]]:
+    # токены и резервы всех пулов одним batch-запросом на зафиксированном блоке, decimals — вторым
+    provider = w3.provider
+    head = int(w3.eth.block_number)
+    addrs = [Web3.to_checksum_address(a) for a in addresses]
+    calls = []
+    for a in addrs:
+        for sel in (SEL_TOKEN0, SEL_TOKEN1, SEL_GET_RESERVES):
+            calls.append(("eth_call", [{"to": a, "data": sel}, hex(head)]))
+    out = [_result(r, "pool read") for r in provider.batch(calls)]
+    tokens = sorted({"0x" + out[i][-40:] for i in range(len(out)) if i % 3 != 2})
+    decs = provider.batch([("eth_call", [{"to": Web3.to_checksum_address(t), "data": SEL_DECIMALS}, "latest"]) for t in tokens])
+    decimals = {t: int(_result(r, f"decimals {t}"), 16) for t, r in zip(tokens, decs)}
+
+    pools = {}
+    for k, a in enumerate(addrs):
+        t0, t1, res = out[3 * k], out[3 * k + 1], out[3 * k + 2]
+        t0, t1 = "0x" + t0[-40:], "0x" + t1[-40:]
+        pools[a] = WatchedPool(
+            a, Web3.to_checksum_address(t0), Web3.to_checksum_address(t1), decimals[t0], decimals[t1],
+            _word(res, 0), _word(res, 1), head,
+        )
+    return head, pools
+
+
+class LogSource:
+    # Новые блоки и Sync-логи выбранных пулов опросом: eth_blockNumber и eth_getLogs
+    # одним batch-запросом на интервал. Подписка eth_subscribe требует WebSocket,
+    # а ZKSYNC_RPC — HTTP; с batch-опросом это один round trip на новый блок.
+
+    def __init__(self, w3: Web3, pools: list[str], start: int, poll: float = 0.5, record: str | None = None):
+        self.w3 = w3
+        self.pools = [Web3.to_checksum_address(p) for p in pools]
+        self.last = start
+        self.poll = poll
+        self.record = record
+        if record:
+            open(record, "w", encoding="utf-8").close()
+
+    def write(self, entry: dict[str, Any]) -> None:
+        if self.record:
+            with open(self.record, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def _fetch(self) -> tuple[int, list[dict[str, Any]]]:
+        flt = {
+            "fromBlock": hex(self.last + 1),
+            "toBlock": hex(self.last + MAX_LOG_RANGE),
+            "address": self.pools,
+            "topics": [list(SYNC_TOPICS)],
+        }
+        head, logs = self.w3.provider.batch([("eth_blockNumber", []), ("eth_getLogs", [flt])])
+        head = int(_result(head, "eth_blockNumber"), 16)
+        if head <= self.last:
+            return self.last, []
+        logs = [_log(x) for x in _result(logs, "eth_getLogs") or [] if _int(x["blockNumber"]) <= head]
+        return min(head, self.last + MAX_LOG_RANGE), logs
+
+    async def batches(self) -> AsyncIterator[tuple[int, list[dict[str, Any]], float]]:
+        # (блок, логи с прошлого блока, perf_counter получения)
+        while True:
+            block, logs = await asyncio.to_thread(self._fetch)
+            seen = time.perf_counter()
+            if block > self.last:
+                self.last = block
+                self.write({"block": block, "logs": logs})
+                yield block, logs, seen
+            else:
+                await asyncio.sleep(self.poll)
+
+
+class ReplaySource:
+    # Записанные LogSource(record=...) блоки и логи: тот же вход для WatchedPool
+    # и условий без сети (или против локального узла с форком)
+
+    def __init__(self, path: str, delay: float = 0.0):
+        self.path = path
+        self.delay = delay
+
+    def header(self) -> dict[str, Any]:
+        with open(self.path, encoding="utf-8") as f:
+            return json.loads(f.readline())
+
+    def initial(self) -> tuple[int, dict[str, tuple[int, int]]]:
+        first = self.header()
+        if "reserves" not in first:
+            raise ValueError(f"{self.path}: first line must hold the initial reserves")
+        return first["block"], {Web3.to_checksum_address(a): tuple(r) for a, r in first["reserves"].items()}
+
+    async def batches(self) -> AsyncIterator[tuple[int, list[dict[str, Any]], float]]:
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if "logs" not in entry:
+                    continue
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                yield entry["block"], entry["logs"], time.perf_counter()
+
+
+@dataclass
+class Condition:
+    pool: str
+    op: str  # "above" | "below"
+    price: float
+    invert: bool = False
+
+    def value(self, pools: dict[str, WatchedPool]) -> float:
+        return pools[self.pool].price(self.invert)
+
+    def holds(self, price: float) -> bool:
+        if price <= 0:
+            return False
+        return price >= self.price if self.op == "above" else price <= self.price
+
+    def __str__(self) -> str:
+        return f"{self.pool} price{' (inverted)' if self.invert else ''} {self.op} {self.price}"
+
+
+@dataclass
+class Armed:
+    # tx команды, прогнанные через симуляцию и подписанные заранее
+    sim: Simulation
+    txs: list[dict[str, Any]]
+    signed: list[SignedTx]
+    price: float
+    gas_price: int
+    at: float = field(default_factory=time.monotonic)
+
+
+class PriceWatch:
+    # Зеркалит резервы выбранных пулов по Sync-логам, на каждом новом блоке
+    # проверяет условие и в момент срабатывания отправляет заранее подписанные
+    # tx команды. Подписанный набор обновляется, если цена ушла от цены подписи
+    # больше rearm_pct, вырос gasPrice или набор старше max_age (nonce/балансы).
+
+    def __init__(self, client, pools: dict[str, WatchedPool], condition: Condition,
+                 run: Callable[[], Awaitable[Any]], rearm_pct: float, max_age: float = 30.0,
+                 gas_multiplier: float = 1.15, dry: bool = False):
+        self.client = client
+        self.pools = pools
+        self.condition = condition
+        self.run = run
+        self.rearm_pct = rearm_pct
+        self.max_age = max_age
+        self.gas_multiplier = gas_multiplier
+        self.dry = dry
+        self.armed: Optional[Armed] = None
+        self.rearms = 0
+
+    def price(self) -> float:
+        return self.condition.value(self.pools)
+
+    def drift(self) -> float:
+        if self.armed is None or not self.armed.price:
+            return float("inf")
+        return abs(self.price() / self.armed.price - 1) * 100
+
+    # ---- arm ------------------------------------------------------------
+
+    async def arm(self) -> Armed:
+        client = self.client
+        w3 = client._require_w3()
+        sim = Simulation(owner=client.address)
+        with sim.activate():
+            await self.run()
+        if not sim.txs:
+            raise RuntimeError("command produced no transactions")
+
+        # overrides до каждого шага — для оценки газа, пока предыдущие tx не в блоке
+        def dry_run() -> list[dict[str, Any]]:
+            chain = Simulation(owner=client.address)
+            overrides = []
+            for t in sim.txs:
+                overrides.append(chain.state_override())
+                chain.execute(w3, t.to, t.data, t.value)
+            return overrides
+
+        overrides = await asyncio.to_thread(dry_run)
+        gases, gas_price, nonce = await asyncio.gather(
+            asyncio.gather(*[
+                asyncio.to_thread(client.estimate_gas, t.to, t.data, t.value, o or None)
+                for t, o in zip(sim.txs, overrides)
+            ]),
+            asyncio.to_thread(client.shared.fees.gas_price, True),
+            asyncio.to_thread(client._pending_nonce),
+        )
+        txs = [
+            {
+                "chainId": client.chain_id,
+                "from": client.address,
+                "to": w3.to_checksum_address(t.to),
+                "data": t.data,
+                "value": int(t.value),
+                "gas": int(g * self.gas_multiplier),
+                "gasPrice": int(gas_price),
+                "nonce": nonce + i,
+            }
+            for i, (t, g) in enumerate(zip(sim.txs, gases))
+        ]
+        signed = await client.signer.sign_batch_async(txs)
+        self.armed = Armed(sim, txs, signed, self.price(), int(gas_price))
+        self.rearms += 1
+        return self.armed
+
+    def stale_reason(self) -> Optional[str]:
+        a = self.armed
+        if a is None:
+            return "not armed"
+        if self.drift() > self.rearm_pct:
+            return f"price drift {self.drift():.2f}%"
+        if time.monotonic() - a.at > self.max_age:
+            return "max age"
+        if self.client.shared.fees.gas_price() > a.gas_price:
+            return "gas price"
+        return None
+
+    # ---- fire -----------------------------------------------------------
+
+    def _send(self, armed: Armed, hashes: list[str]) -> list[str]:
+        # hashes заполняется по ходу: при ошибке вызывающий видит, что уже ушло в сеть
+        try:
+            for tx, s in zip(armed.txs, armed.signed):
+                hashes.append(self.client._broadcast(tx, None, None, fresh_nonce=False, signed=s))
+        finally:
+            # локальный счетчик nonce не знал об этих tx
+            self.client.nonces.reset()
+        return hashes
+
+    async def fire(self, seen: float) -> dict[str, Any]:
+        armed = self.armed
+        rearmed = False
+        if armed is None or self.drift() > self.rearm_pct:
+            # цена в блоке срабатывания ушла дальше допуска: amountOutMin подписанного набора устарел
+            armed = await self.arm()
+            rearmed = True
+        if self.dry:
+            return {"hashes": [t.tx_hash for t in armed.sim.txs], "latency_ms": (time.perf_counter() - seen) * 1e3,
+                    "rearmed": rearmed, "fallback": False, "error": None, "sim": armed.sim}
+        hashes: list[str] = []
+        error, fallback = None, False
+        try:
+            await asyncio.to_thread(self._send, armed, hashes)
+        except Exception as e:
+            if hashes:
+                # часть набора уже в сети (например, approve): повтор команды продублировал бы ее
+                error = str(e)
+                print(f"[watch] pre-signed send stopped after {len(hashes)}/{len(armed.txs)} tx: {e}")
+            else:
+                # nonce/баланс изменились вне набора, ничего не ушло: обычная отправка команды
+                print(f"[watch] pre-signed send failed ({e}), sending the command directly")
+                # команда могла ничего не отправить (None) — в hashes только реальные tx
+                hashes = [h for h in [await self.run()] if h]
+                fallback = True
+        self.armed = None
+        return {"hashes": hashes, "latency_ms": (time.perf_counter() - seen) * 1e3,
+                "rearmed": rearmed, "fallback": fallback, "error": error}
+
+    # ---- loop -----------------------------------------------------------
+
+    async def watch(self, source) -> dict[str, Any]:
+        if self.armed is None:
+            await self.arm()
+            print(f"[watch] armed {len(self.armed.txs)} tx at price {self.armed.price:.8g}")
+        async for block, logs, seen in source.batches():
+            changed = False
+            for log in logs:
+                pool = self.pools.get(Web3.to_checksum_address(log["address"]))
+                if pool is not None and pool.apply(log):
+                    changed = True
+            price = self.price()
+            if self.condition.holds(price):
+                result = await self.fire(seen)
+                result.update(block=block, price=price)
+                return result
+            if not changed and self.armed is not None and time.monotonic() - self.armed.at <= self.max_age:
+                continue
+            reason = self.stale_reason()
+            if reason is not None:
+                await self.arm()
+                print(f"[watch] block {block}: re-armed ({reason}) at price {self.armed.price:.8g}")
+        raise RuntimeError("event source ended before the condition held")
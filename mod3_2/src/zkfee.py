@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import rlp
+from eth_utils import keccak
+from web3 import Web3
+
+ZKSYNC_CHAIN_IDS = (324, 300)
+EIP712_TX_TYPE = 0x71
+DEFAULT_GAS_PER_PUBDATA = 50_000
+
+_DOMAIN_TYPEHASH = keccak(text="EIP712Domain(string name,string version,uint256 chainId)")
+_TX_TYPEHASH = keccak(text=(
+    "Transaction(uint256 txType,uint256 from,uint256 to,uint256 gasLimit,uint256 gasPerPubdataByteLimit,"
+    "uint256 maxFeePerGas,uint256 maxPriorityFeePerGas,uint256 paymaster,uint256 nonce,uint256 value,"
+    "bytes data,bytes32[] factoryDeps,bytes paymasterInput)"
+))
+
+
+def _b(x: Any) -> bytes:
+    if x is None:
+        return b""
+    if isinstance(x, (bytes, bytearray)):
+        return bytes(x)
+    s = str(x)
+    return bytes.fromhex(s[2:] if s.startswith("0x") else s)
+
+
+def _u(x: Any) -> bytes:
+    return int(x).to_bytes(32, "big")
+
+
+def _hex(x: Any) -> str:
+    return "0x" + _b(x).hex()
+
+
+@dataclass
+class ZkFee:
+    gas_limit: int
+    max_fee_per_gas: int
+    max_priority_fee_per_gas: int
+    gas_per_pubdata_limit: int
+
+
+@dataclass
+class ZkProfile:
+    # eip712=True — tx типа 0x71 с gasPerPubdata из оценки, иначе legacy с gasPrice = maxFeePerGas
+    # (время жизни кэша цен задает ZkFeeEstimator.ttl, ZK_FEE_TTL_S в config)
+    eip712: bool = False
+
+    def fee_fields(self, fee: ZkFee, gas_multiplier: float) -> dict[str, int]:
+        fields = {"gas": int(fee.gas_limit * gas_multiplier)}
+        if self.eip712:
+            fields.update({
+                "type": EIP712_TX_TYPE,
+                "maxFeePerGas": fee.max_fee_per_gas,
+                "maxPriorityFeePerGas": min(fee.max_priority_fee_per_gas, fee.max_fee_per_gas),
+                "gasPerPubdata": fee.gas_per_pubdata_limit,
+            })
+        else:
+            fields["gasPrice"] = fee.max_fee_per_gas
+        return fields
+
+
+class ZkFeeEstimator:
+    # zks_estimateFee: gas limit, max fee и лимит pubdata одним запросом вместо
+    # eth_gasPrice + eth_estimateGas. По форме маршрута (from, to, selector) на ttl
+    # секунд кэшируются только цены (max fee, priority fee, gasPerPubdata): gas limit
+    # зависит от calldata (сумма, путь, pubdata) и оценивается для каждой tx — при
+    # свежих ценах одним eth_estimateGas. with_gas() — только цены, для tx, газ которых
+    # уже оценен вызывающим кодом. Общий для mod3_1 (src/zksync_fee.py).
+
+    def __init__(self, w3: Web3, ttl: float = 30.0):
+        self.w3 = w3
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._prices: dict[tuple[str, str, str], tuple[tuple[int, int, int], float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(tx: dict[str, Any]) -> tuple[str, str, str]:
+        return (str(tx["from"]).lower(), str(tx["to"]).lower(), _hex(tx.get("data") or "0x")[:10])
+
+    def _request(self, method: str, call: dict[str, Any]) -> Any:
+        resp = self.w3.provider.make_request(method, [call])
+        if "error" in resp or not resp.get("result"):
+            raise ValueError(resp.get("error") or f"empty {method} response")
+        return resp["result"]
+
+    @staticmethod
+    def _call(tx: dict[str, Any]) -> dict[str, Any]:
+        return {"from": tx["from"], "to": tx["to"], "data": _hex(tx.get("data") or "0x"),
+                "value": hex(int(tx.get("value", 0)))}
+
+    def _cached(self, k: tuple[str, str, str]) -> tuple[int, int, int] | None:
+        with self._lock:
+            hit = self._prices.get(k)
+            if hit is not None and time.monotonic() - hit[1] < self.ttl:
+                self.hits += 1
+                return hit[0]
+            self.misses += 1
+        return None
+
+    def _fetch(self, k: tuple[str, str, str], tx: dict[str, Any]) -> ZkFee:
+        r = self._request("zks_estimateFee", self._call(tx))
+        prices = (int(r["max_fee_per_gas"], 16), int(r["max_priority_fee_per_gas"], 16),
+                  int(r["gas_per_pubdata_limit"], 16))
+        with self._lock:
+            self._prices[k] = (prices, time.monotonic())
+        return ZkFee(int(r["gas_limit"], 16), *prices)
+
+    def estimate(self, tx: dict[str, Any]) -> ZkFee:
+        k = self.key(tx)
+        prices = self._cached(k)
+        if prices is not None:
+            return ZkFee(int(self._request("eth_estimateGas", self._call(tx)), 16), *prices)
+        return self._fetch(k, tx)
+
+    def with_gas(self, tx: dict[str, Any], gas: int) -> ZkFee:
+        # газ уже оценен: нужны только цены (max fee, priority fee, gasPerPubdata)
+        k = self.key(tx)
+        prices = self._cached(k)
+        if prices is None:
+            fee = self._fetch(k, tx)
+            prices = (fee.max_fee_per_gas, fee.max_priority_fee_per_gas, fee.gas_per_pubdata_limit)
+        return ZkFee(int(gas), *prices)
+
+    def forget(self, tx: dict[str, Any]) -> None:
+        # tx не прошла — следующая оценка этой формы заново с узла
+        with self._lock:
+            self._prices.pop(self.key(tx), None)
+
+    def report(self) -> str:
+        with self._lock:
+            return f"zks_estimateFee: {self.misses} requests, {self.hits} with cached prices"
+
+
+# ---- EIP-712 (type 0x71) ------------------------------------------------
+
+def eip712_digest(tx: dict[str, Any]) -> bytes:
+    domain = keccak(_DOMAIN_TYPEHASH + keccak(text="zkSync") + keccak(text="2") + _u(tx["chainId"]))
+    struct = keccak(
+        _TX_TYPEHASH
+        + _u(EIP712_TX_TYPE)
+        + _u(int.from_bytes(_b(tx["from"]), "big"))
+        + _u(int.from_bytes(_b(tx["to"]), "big"))
+        + _u(tx["gas"])
+        + _u(tx.get("gasPerPubdata", DEFAULT_GAS_PER_PUBDATA))
+        + _u(tx["maxFeePerGas"])
+        + _u(tx["maxPriorityFeePerGas"])
+        + _u(0)  # paymaster
+        + _u(tx["nonce"])
+        + _u(tx.get("value", 0))
+        + keccak(_b(tx.get("data") or "0x"))
+        + keccak(b"")  # factoryDeps: []
+        + keccak(b"")  # paymasterInput: 0x
+    )
+    return keccak(b"\x19\x01" + domain + struct)
+
+
+def serialize_eip712(tx: dict[str, Any], v: int, r: bytes, s: bytes) -> bytes:
+    chain_id = int(tx["chainId"])
+    fields = [
+        int(tx["nonce"]),
+        int(tx["maxPriorityFeePerGas"]),
+        int(tx["maxFeePerGas"]),
+        int(tx["gas"]),
+        _b(tx["to"]),
+        int(tx.get("value", 0)),
+        _b(tx.get("data") or "0x"),
+        v - 27,
+        int.from_bytes(r, "big"),
+        int.from_bytes(s, "big"),
+        chain_id,
+        _b(tx["from"]),
+        int(tx.get("gasPerPubdata", DEFAULT_GAS_PER_PUBDATA)),
+        [],   # factoryDeps
+        b"",  # customSignature
+        [],   # paymasterParams
+    ]
+    return bytes([EIP712_TX_TYPE]) + rlp.encode(fields)
+
+
+def eip712_tx_hash(digest: bytes, v: int, r: bytes, s: bytes) -> str:
+    # hash 0x71 в zkSync — не keccak(raw), а keccak(digest || keccak(r || s || v))
+    return "0x" + keccak(digest + keccak(r + s + bytes([v]))).hex()
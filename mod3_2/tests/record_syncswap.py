@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+# Снимки пулов SyncSwap для tests/test_syncswap_pool.py:
+#   python tests/record_syncswap.py [--pools 0x... 0x...] [--block N] [--sender 0x...] [--rpc URL]
+# Без --pools — классические и стабильные пулы пар WETH/USDC.e/USDT из фабрик.
+# poolType, токены, множители точности, getReserves, getSwapFee в обе стороны и
+# getAmountOut на лестнице сумм (от 1 wei до половины резерва) — все на одном блоке.
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from web3 import Web3
+
+import config
+from src.spread import KIND_SYNCSWAP, discover
+from src.syncswap_pool import POOL_ABI, POOL_STABLE
+from src.tokens import USDC_E, USDT, WETH, ZERO
+
+from tests.syncswap_fixtures import FIXTURES
+
+
+def record(w3: Web3, address: str, block: int, sender: str) -> dict:
+    f = w3.eth.contract(address=Web3.to_checksum_address(address), abi=POOL_ABI).functions
+    at = {"block_identifier": block}
+    pool_type = int(f.poolType().call(**at))
+    token0, token1 = f.token0().call(**at), f.token1().call(**at)
+    mul0, mul1 = (int(f.token0PrecisionMultiplier().call(**at)), int(f.token1PrecisionMultiplier().call(**at))) \
+        if pool_type == POOL_STABLE else (1, 1)
+    r0, r1 = (int(x) for x in f.getReserves().call(**at))
+    fees, quotes = {}, []
+    for t_in, t_out, r_in in ((token0, token1, r0), (token1, token0, r1)):
+        fees[t_in] = int(f.getSwapFee(sender, t_in, t_out, b"").call(**at))
+        for amount in sorted({1, 10**3, r_in // 10**6, r_in // 10**4, r_in // 100, r_in // 10, r_in // 2} - {0}):
+            out = int(f.getAmountOut(t_in, amount, sender).call(**at))
+            quotes.append({"token_in": t_in, "amount_in": amount, "amount_out": out})
+    return {"pool": Web3.to_checksum_address(address), "block": block, "sender": sender, "pool_type": pool_type,
+            "token0": token0, "token1": token1, "mul0": mul0, "mul1": mul1, "reserves": [r0, r1],
+            "fees": fees, "quotes": quotes}
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--pools", nargs="*", default=None)
+    p.add_argument("--block", type=int, default=None)
+    p.add_argument("--sender", default=ZERO)
+    p.add_argument("--rpc", default=config.ZKSYNC_RPC)
+    args = p.parse_args()
+
+    w3 = Web3(Web3.HTTPProvider(args.rpc))
+    pools = args.pools or [v.pool for v in discover(w3, [WETH, USDC_E, USDT]) if v.kind == KIND_SYNCSWAP]
+    block = args.block if args.block is not None else int(w3.eth.block_number)
+    FIXTURES.mkdir(exist_ok=True)
+    for address in pools:
+        fx = record(w3, address, block, Web3.to_checksum_address(args.sender))
+        path = FIXTURES / f"syncswap_{fx['pool'].lower()}_{block}.json"
+        path.write_text(json.dumps(fx, indent=1) + "\n")
+        kind = "stable" if fx["pool_type"] == POOL_STABLE else "classic"
+        print(f"{path}: {kind}, {len(fx['quotes'])} quotes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+from web3 import Web3
+
+from src.syncswap_pool import PoolInfo, SyncSwapPool
+
+# снимки пулов SyncSwap: резервы, комиссии и ответы getAmountOut на одном блоке (tests/record_syncswap.py)
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def fixture_paths() -> list[Path]:
+    return sorted(FIXTURES.glob("syncswap_*.json"))
+
+
+def load(path: Path) -> dict[str, Any]:
+    return json.loads(path.read_text())
+
+
+def mirror_of(fx: dict[str, Any]) -> SyncSwapPool:
+    # зеркало из снимка без обращений к узлу: info, комиссии и резервы уже известны
+    address = Web3.to_checksum_address(fx["pool"])
+    info = PoolInfo(address, fx["pool_type"], Web3.to_checksum_address(fx["token0"]),
+                    Web3.to_checksum_address(fx["token1"]), fx["mul0"], fx["mul1"])
+    pool = SyncSwapPool(Web3(), address, fx["sender"], info=info, fees=fx["fees"])
+    # без блока зеркало не сверяется с getAmountOut
+    pool.apply_sync(*fx["reserves"])
+    return pool
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from src.broadcast import BroadcastError, Broadcaster
+
+
+def _broadcaster(answers, timeout=0.2):
+    b = Broadcaster(list(answers), timeout=timeout)
+
+    def post(endpoint, raw_hex):
+        outcome, detail, delay = answers[endpoint]
+        time.sleep(delay)
+        return outcome, detail, delay
+
+    b._post = post
+    return b
+
+
+def test_returns_hash_from_endpoint():
+    # 0x71: hash из ответа узла, а не keccak(raw)
+    b = _broadcaster({"http://a": ("ok", "0xnode", 0.0)})
+    assert b.send(b"\x71\x01", "0xsigner") == "0xnode"
+
+
+def test_known_falls_back_to_signer_hash():
+    b = _broadcaster({"http://a": ("known", "already known", 0.0)})
+    assert b.send(b"\x71\x01", "0xsigner") == "0xsigner"
+    with pytest.raises(BroadcastError):
+        b.send(b"\x71\x01")
+
+
+def test_stuck_endpoint_times_out():
+    b = _broadcaster({"http://a": ("error", "nonce too low", 0.0), "http://b": ("ok", "0xlate", 2.0)})
+    t = time.perf_counter()
+    with pytest.raises(BroadcastError, match="no endpoint answered"):
+        b.send(b"\x02\x01", "0xsigner")
+    assert time.perf_counter() - t < 1.0
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import pytest
+
+from src.limiter import is_rate_limited
+
+
+@pytest.mark.parametrize("error", [
+    {"code": 429, "message": "slow down"},
+    {"code": -32005, "message": "limit"},
+    {"code": -32029, "message": ""},
+    {"code": -32000, "message": "Rate limit reached, retry later"},
+    {"code": -32000, "message": "Too Many Requests"},
+])
+def test_rate_limit_errors(error):
+    assert is_rate_limited(error)
+
+
+@pytest.mark.parametrize("error", [
+    {"code": -32000, "message": "gas limit exceeded"},
+    {"code": 3, "message": "execution reverted: max supply exceeded"},
+    {"code": -32000, "message": "insufficient capacity"},
+    {"code": -32000, "message": "nonce too low"},
+])
+def test_real_errors_are_not_throttling(error):
+    assert not is_rate_limited(error)
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+from src.replacer import BumpPolicy, InFlight, ReplacementEngine
+
+
+class _Client:
+    def __init__(self, market: int):
+        self.w3 = SimpleNamespace(eth=SimpleNamespace(gas_price=market))
+        self.sent: list[dict] = []
+
+    def _require_w3(self):
+        return self.w3
+
+    def _broadcast(self, tx, intent, step_key, fresh_nonce=True):
+        self.sent.append(tx)
+        return "0x" + "ab" * 32
+
+
+def _bump(tx: dict, market: int, **policy) -> dict | None:
+    client = _Client(market)
+    ReplacementEngine(client, BumpPolicy(**policy)).maybe_bump(InFlight(dict(tx), ["0x01"]))
+    return client.sent[-1] if client.sent else None
+
+
+def test_bump_raises_priority_fee_by_the_same_factor():
+    tx = {"nonce": 7, "maxFeePerGas": 1000, "maxPriorityFeePerGas": 100, "type": 0x71}
+    sent = _bump(tx, market=1050)
+    assert sent["maxFeePerGas"] == 1101
+    # +10% по обоим полям, иначе узел отклоняет замену как underpriced
+    assert sent["maxPriorityFeePerGas"] == 111
+    assert sent["maxPriorityFeePerGas"] * 10 >= tx["maxPriorityFeePerGas"] * 11
+
+
+def test_bump_priority_fee_stays_within_budget():
+    tx = {"nonce": 7, "maxFeePerGas": 1000, "maxPriorityFeePerGas": 1000}
+    sent = _bump(tx, market=2000, max_gas_price=1200)
+    assert sent["maxFeePerGas"] == 1200 and sent["maxPriorityFeePerGas"] == 1200
+
+
+def test_legacy_bump_touches_gas_price_only():
+    sent = _bump({"nonce": 7, "gasPrice": 1000}, market=1500)
+    assert sent == {"nonce": 7, "gasPrice": 1500}
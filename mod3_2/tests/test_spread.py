@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+from web3 import Web3
+from web3.providers import BaseProvider
+
+from src.spread import KIND_SYNCSWAP, KIND_V2, SpreadMonitor, venues_of
+from src.syncswap_pool import POOL_CLASSIC, SyncSwapPool, classic_amount_out
+from src.v2quote import amounts_out
+from src.watch import TOPIC_SYNC_U256, ReplaySource
+
+WETH = Web3.to_checksum_address("0x" + "01" * 20)
+USDC = Web3.to_checksum_address("0x" + "02" * 20)
+V2 = Web3.to_checksum_address("0x" + "aa" * 20)
+SYNC = Web3.to_checksum_address("0x" + "bb" * 20)
+
+
+class _Offline(BaseProvider):
+    # любое обращение к узлу во время проигрывания — ошибка теста
+    def make_request(self, method, params):
+        raise AssertionError(f"RPC call during replay: {method}")
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        return False
+
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    yield
+    for cache in (SyncSwapPool._INFO, SyncSwapPool._FEES, SyncSwapPool._VERIFIED):
+        cache.clear()
+
+
+def _header() -> dict:
+    pool = {"token0": WETH, "token1": USDC, "dec0": 18, "dec1": 6}
+    return {
+        "block": 100,
+        "reserves": {V2: [10**21, 3 * 10**12], SYNC: [2 * 10**21, 6 * 10**12]},
+        "pools": {
+            V2: {"venue": "spacefi", "kind": KIND_V2, **pool},
+            SYNC: {"venue": "syncswap", "kind": KIND_SYNCSWAP, **pool,
+                   "pool_type": POOL_CLASSIC, "mul0": 1, "mul1": 1, "fees": {WETH: 300, USDC: 200}},
+        },
+    }
+
+
+def _sync(address: str, block: int, r0: int, r1: int) -> dict:
+    return {"address": address, "topics": [TOPIC_SYNC_U256], "data": "0x%064x%064x" % (r0, r1), "blockNumber": block}
+
+
+def test_replay_from_header_makes_no_rpc_calls(tmp_path):
+    path = tmp_path / "spread.jsonl"
+    lines = [_header(), {"block": 101, "logs": [_sync(SYNC, 101, 2 * 10**21, 5 * 10**12)]}]
+    path.write_text("".join(json.dumps(x) + "\n" for x in lines))
+
+    source = ReplaySource(str(path))
+    header = source.header()
+    monitor = SpreadMonitor(Web3(_Offline()), venues_of(header), {USDC: "100"})
+    assert monitor.load(header) == 100
+
+    updates: list[dict] = []
+    assert asyncio.run(monitor.run(source, 100, emit=updates.append)) == 1
+    first, last = updates
+    assert first["venues"]["spacefi"]["out"] == amounts_out([100 * 10**6], 3 * 10**12, 10**21)[0]
+    assert first["venues"]["syncswap"]["out"] == classic_amount_out(100 * 10**6, 6 * 10**12, 2 * 10**21, 200)
+    assert last["block"] == 101
+    assert last["venues"]["syncswap"]["out"] == classic_amount_out(100 * 10**6, 5 * 10**12, 2 * 10**21, 200)
+    assert "spread_bps" in last and "best_round_trip" in last
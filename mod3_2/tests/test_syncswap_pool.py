@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import random
+from decimal import Decimal, localcontext
+
+import pytest
+from web3 import Web3
+
+from src import syncswap_pool
+from src.syncswap_pool import (
+    MAX_FEE, POOL_CLASSIC, POOL_STABLE, STABLE_N_A, PoolInfo, SyncSwapPool, classic_amount_out, stable_amount_out,
+)
+
+from tests.syncswap_fixtures import fixture_paths, load, mirror_of
+
+FIXTURE_PATHS = fixture_paths()
+MISSING = "no recorded pools in tests/fixtures: run tests/record_syncswap.py"
+
+POOL = Web3.to_checksum_address("0x" + "aa" * 20)
+TOKEN0 = Web3.to_checksum_address("0x" + "01" * 20)
+TOKEN1 = Web3.to_checksum_address("0x" + "02" * 20)
+SENDER = Web3.to_checksum_address("0x" + "0f" * 20)
+
+
+@pytest.fixture(params=FIXTURE_PATHS or [None], ids=lambda p: p.stem if p else "missing")
+def fx(request):
+    # сверка с getAmountOut — приемочная проверка математики: без снимков тест падает
+    if request.param is None:
+        pytest.fail(MISSING)
+    return load(request.param)
+
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    yield
+    for cache in (SyncSwapPool._INFO, SyncSwapPool._FEES, SyncSwapPool._VERIFIED):
+        cache.clear()
+
+
+# ---- математика против getAmountOut ---------------------------------------------
+
+def _expected(fx, q) -> int:
+    zero_in = Web3.to_checksum_address(q["token_in"]) == Web3.to_checksum_address(fx["token0"])
+    r0, r1 = fx["reserves"]
+    r_in, r_out = (r0, r1) if zero_in else (r1, r0)
+    fee = fx["fees"][q["token_in"]]
+    if fx["pool_type"] == POOL_STABLE:
+        m_in, m_out = (fx["mul0"], fx["mul1"]) if zero_in else (fx["mul1"], fx["mul0"])
+        return stable_amount_out(q["amount_in"], r_in, r_out, fee, m_in, m_out)
+    return classic_amount_out(q["amount_in"], r_in, r_out, fee)
+
+
+def test_amount_out_matches_get_amount_out(fx):
+    assert fx["quotes"]
+    for q in fx["quotes"]:
+        assert _expected(fx, q) == q["amount_out"], q
+
+
+def test_mirror_quote_ladder_matches_get_amount_out(fx):
+    pool = mirror_of(fx)
+    for token_in in (fx["token0"], fx["token1"]):
+        qs = [q for q in fx["quotes"] if q["token_in"] == token_in]
+        assert pool.quote_ladder(token_in, [q["amount_in"] for q in qs]) == [q["amount_out"] for q in qs]
+
+
+def test_recorded_kinds_cover_classic_and_stable():
+    kinds = {load(p)["pool_type"] for p in FIXTURE_PATHS}
+    if not kinds:
+        pytest.fail(MISSING)
+    assert {POOL_CLASSIC, POOL_STABLE} <= kinds
+
+
+def test_classic_amount_out():
+    # amountIn * (1 - fee) * R_out / (R_in + amountIn * (1 - fee)), округление вниз
+    assert classic_amount_out(10**18, 10**21, 2 * 10**24, 300) == 1992013962079806432986
+    assert classic_amount_out(0, 10**21, 10**21, 300) == 0
+    assert classic_amount_out(10**18, 0, 10**21, 300) == 0
+
+
+def test_stable_amount_out_balanced_pool():
+    # сбалансированный стабильный пул: малый обмен почти 1:1 за вычетом комиссии
+    r, fee = 10**12, 40
+    out = stable_amount_out(10**6, r, r, fee, 10**12, 10**12)
+    after_fee = 10**6 - 10**6 * fee // MAX_FEE
+    assert after_fee - 2 <= out < after_fee
+
+
+def _invariant_out(amount_in, r_in, r_out, fee, m_in, m_out) -> Decimal:
+    # выход по инварианту StableMath в 100 знаках: A*n*(x+y) + D = A*n*D + D^3 / (4xy), D — до обмена
+    x0, y0 = Decimal(r_in * m_in), Decimal(r_out * m_out)
+    s, d = x0 + y0, x0 + y0
+    for _ in range(200):
+        dp = d ** 3 / (4 * x0 * y0)
+        d = (STABLE_N_A * s + 2 * dp) * d / ((STABLE_N_A - 1) * d + 3 * dp)
+    x = x0 + (amount_in - amount_in * fee // MAX_FEE) * m_in
+    lo, hi = Decimal("1e-30"), 4 * d
+    for _ in range(400):
+        y = (lo + hi) / 2
+        if STABLE_N_A * (x + y) + d - STABLE_N_A * d - d ** 3 / (4 * x * y) > 0:
+            hi = y
+        else:
+            lo = y
+    return (y0 - lo) / m_out
+
+
+def test_stable_amount_out_matches_invariant():
+    # итерации Ньютона для D и y сходятся к точному решению инварианта (с точностью до округлений D и y)
+    rnd = random.Random(3)
+    with localcontext() as ctx:
+        ctx.prec = 100
+        for _ in range(200):
+            m_in, m_out = rnd.choice([(1, 1), (10**12, 1), (1, 10**12), (10**12, 10**12)])
+            base = rnd.randrange(10**20, 10**26)
+            r_in = max(1, base * rnd.randrange(50, 200) // 100 // m_in)
+            r_out = max(1, base * rnd.randrange(50, 200) // 100 // m_out)
+            amount, fee = rnd.randrange(1, r_in // 5 + 2), rnd.randrange(0, 500)
+            out = stable_amount_out(amount, r_in, r_out, fee, m_in, m_out)
+            assert abs(_invariant_out(amount, r_in, r_out, fee, m_in, m_out) - out) <= 2, (amount, r_in, r_out, fee)
+
+
+def test_stable_amount_out_precision_multipliers():
+    # тот же пул с токеном 6 decimals (множитель 1e12) и с 18 decimals (множитель 1)
+    out6 = stable_amount_out(5 * 10**6, 10**12, 10**24, 40, 10**12, 1)
+    out18 = stable_amount_out(5 * 10**18, 10**24, 10**24, 40, 1, 1)
+    assert abs(out6 - out18) <= 10**12
+
+
+# ---- кэш комиссии и сверки --------------------------------------------------------
+
+class _Call:
+    def __init__(self, value, log, name):
+        self.value, self.log, self.name = value, log, name
+
+    def call(self, *args, block_identifier="latest", **kwargs):
+        self.log.append(self.name if block_identifier == "latest" else f"{self.name}@{block_identifier}")
+        return self.value
+
+
+class _Functions:
+    def __init__(self, log):
+        self.log = log
+
+    def getSwapFee(self, *args):
+        return _Call(300, self.log, "getSwapFee")
+
+    def getAmountOut(self, token_in, amount, sender):
+        return _Call(classic_amount_out(amount, 10**21, 10**21, 300), self.log, "getAmountOut")
+
+
+class _Contract:
+    def __init__(self, log):
+        self.functions = _Functions(log)
+
+
+def _pool(sender: str, log: list[str], block: int | None = 100) -> SyncSwapPool:
+    SyncSwapPool._INFO[POOL] = PoolInfo(POOL, POOL_CLASSIC, TOKEN0, TOKEN1)
+    p = SyncSwapPool(Web3(), POOL, sender)
+    p.contract = _Contract(log)
+    p.apply_sync(10**21, 10**21, block)
+    return p
+
+
+def test_fee_and_verification_shared_between_mirrors():
+    log: list[str] = []
+    assert _pool(SENDER, log).quote(TOKEN0, 10**18) == classic_amount_out(10**18, 10**21, 10**21, 300)
+    assert log == ["getSwapFee", "getAmountOut@100"]
+    # новое зеркало того же пула и sender: ни комиссии, ни сверки
+    _pool(SENDER, log).quote(TOKEN0, 2 * 10**18)
+    assert log == ["getSwapFee", "getAmountOut@100"]
+    # другой sender или направление — своя запись
+    _pool(TOKEN1, log).quote(TOKEN0, 10**18)
+    _pool(SENDER, log).quote(TOKEN1, 10**18)
+    assert log.count("getSwapFee") == 3 and log.count("getAmountOut@100") == 3
+
+
+def test_cache_expires(monkeypatch):
+    log: list[str] = []
+    _pool(SENDER, log).quote(TOKEN0, 10**18)
+    monkeypatch.setattr(syncswap_pool, "CACHE_TTL", 0.0)
+    _pool(SENDER, log).quote(TOKEN0, 10**18)
+    assert log == ["getSwapFee", "getAmountOut@100"] * 2
+
+
+def test_mirror_without_block_is_not_verified():
+    # резервы из записи не привязаны к блоку узла: сверки нет, итог не кэшируется
+    log: list[str] = []
+    p = _pool(SENDER, log, block=None)
+    assert p.quote(TOKEN0, 10**18) == classic_amount_out(10**18, 10**21, 10**21, 300)
+    assert log == ["getSwapFee"]
+    assert p.verified(TOKEN0) is None
+
+
+def test_pinned_info_and_fees_skip_reads():
+    p = SyncSwapPool(Web3(), POOL, SENDER, info=PoolInfo(POOL, POOL_CLASSIC, TOKEN0, TOKEN1), fees={TOKEN0: 250})
+    log: list[str] = []
+    p.contract = _Contract(log)
+    p.apply_sync(10**21, 10**21)
+    assert p.quote(TOKEN0, 10**18) == classic_amount_out(10**18, 10**21, 10**21, 250)
+    assert log == [] and POOL not in SyncSwapPool._INFO
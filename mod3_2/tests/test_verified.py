@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from src.verified import ContractRegistry
+
+
+class FakeEth:
+    def get_code(self, address):
+        return b"\x60\x80"
+
+
+class FakeW3:
+    eth = FakeEth()
+
+
+def test_parallel_saves_do_not_race(tmp_path):
+    path = tmp_path / "contracts.verified.json"
+    reg = ContractRegistry(path)
+    addresses = [f"0x{i:040x}" for i in range(1, 65)]
+    with ThreadPoolExecutor(16) as pool:
+        list(pool.map(lambda a: reg.ensure(FakeW3(), 324, a), addresses))
+    assert len(json.loads(path.read_text(encoding="utf-8"))["324"]) == len(addresses)
+    assert not path.with_name(path.name + ".tmp").exists()